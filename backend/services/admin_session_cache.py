@@ -0,0 +1,72 @@
+import os
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+import logging
+
+from cachetools import TTLCache
+
+from services.metrics import metrics
+from services.retention_service import as_utc
+
+logger = logging.getLogger(__name__)
+
+
+class AdminSessionCache:
+    def __init__(self):
+        """
+        Short-lived in-process cache of verified admin sessions
+
+        A verified token maps to the admin it belongs to, so repeat checks
+        skip the admin_sessions and admins reads. Entries live for
+        ADMIN_SESSION_CACHE_TTL_SECONDS and never past the session's own
+        expiry. Logout and deactivation invalidate entries in this process;
+        other workers catch up once their entries expire, so keep the TTL short.
+        """
+        self._sessions = TTLCache(
+            maxsize=int(os.getenv('ADMIN_SESSION_CACHE_SIZE', '1000')),
+            ttl=float(os.getenv('ADMIN_SESSION_CACHE_TTL_SECONDS', '60'))
+        )
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the admin for a cached, unexpired session
+
+        Returns:
+            The admin's public details, or None if the token must be checked in Mongo
+        """
+        entry = self._sessions.get(token)
+        if entry is None:
+            metrics.increment("admin_sessions.cache.misses")
+            return None
+        if datetime.now(timezone.utc) > entry["expires_at"]:
+            self._sessions.pop(token, None)
+            metrics.increment("admin_sessions.cache.misses")
+            return None
+        metrics.increment("admin_sessions.cache.hits")
+        return entry["admin"]
+
+    def set(self, token: str, admin: Dict[str, Any], expires_at: datetime):
+        """Cache a session that was just verified against Mongo"""
+        self._sessions[token] = {"admin": admin, "expires_at": as_utc(expires_at)}
+
+    def invalidate(self, token: str):
+        """Forget one session (logout)"""
+        self._sessions.pop(token, None)
+
+    def invalidate_admin(self, admin_id: str) -> int:
+        """
+        Forget every session of an admin (deactivation, permission changes)
+
+        Returns:
+            Number of cached sessions dropped
+        """
+        tokens = [token for token, entry in list(self._sessions.items()) if entry["admin"]["id"] == admin_id]
+        for token in tokens:
+            self._sessions.pop(token, None)
+        return len(tokens)
+
+    def clear(self):
+        self._sessions.clear()
+
+# Global instance
+admin_session_cache = AdminSessionCache()
@@ -0,0 +1,257 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, Tuple, Set
+import logging
+
+from services.metrics import metrics
+from services.retention_service import as_utc
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = "v1"
+
+
+class InvalidAdminTokenError(ValueError):
+    """Raised when a signed admin token is malformed, forged, expired or revoked"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def is_signed_token(token: str) -> bool:
+    """Signed tokens are "v1.<payload>.<signature>"; legacy session tokens are opaque"""
+    return token.startswith(f"{TOKEN_VERSION}.") and token.count(".") == 2
+
+
+class AdminTokenSigner:
+    def __init__(self, secret: Optional[str] = None):
+        """
+        Issue and verify HMAC-SHA256 signed admin tokens
+
+        A token carries the admin's id, name, email, permissions, a unique
+        token id (jti) and its expiry, so it can be checked with CPU alone.
+        Every worker must share ADMIN_TOKEN_SECRET. Only with
+        ADMIN_TOKEN_DEV_MODE=true may it be missing; a random secret is then
+        used and tokens stop working on restart. The secret is checked by
+        configure(), which the app calls at startup, so importing this module
+        never fails.
+
+        Args:
+            secret: Signing key, defaults to ADMIN_TOKEN_SECRET
+        """
+        self._secret = secret
+        self._key: Optional[bytes] = None
+        self.ttl_seconds = int(float(os.getenv('ADMIN_TOKEN_TTL_HOURS', '24')) * 3600)
+
+    def configure(self):
+        """
+        Load the signing secret
+
+        Raises:
+            RuntimeError: If no secret is configured outside dev mode
+        """
+        if self._key is not None:
+            return
+        secret = self._secret or os.getenv('ADMIN_TOKEN_SECRET')
+        if not secret:
+            if os.getenv('ADMIN_TOKEN_DEV_MODE', 'false').lower() != 'true':
+                raise RuntimeError("ADMIN_TOKEN_SECRET is not set (set ADMIN_TOKEN_DEV_MODE=true to run without it locally)")
+            logger.warning("ADMIN_TOKEN_SECRET is not set; admin tokens are only valid in this process")
+            secret = secrets.token_urlsafe(32)
+        self._key = secret.encode("utf-8")
+
+    def _sign(self, message: bytes) -> bytes:
+        self.configure()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def issue(self, admin: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Create a token for an admin
+
+        Args:
+            admin: Admin document (id, email, name, permissions)
+
+        Returns:
+            Tuple of (token, payload)
+        """
+        now = int(time.time())
+        payload = {
+            "sub": admin["id"],
+            "email": admin["email"],
+            "name": admin["name"],
+            "perm": admin.get("permissions", []),
+            "jti": uuid.uuid4().hex,
+            "iat": now,
+            "exp": now + self.ttl_seconds,
+        }
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        signing_input = f"{TOKEN_VERSION}.{body}".encode("ascii")
+        return f"{TOKEN_VERSION}.{body}.{_b64encode(self._sign(signing_input))}", payload
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Check a token's signature and expiry
+
+        Raises:
+            InvalidAdminTokenError: If the token is malformed, forged or expired
+
+        Returns:
+            The token payload
+        """
+        try:
+            version, body, signature = token.split(".")
+            if version != TOKEN_VERSION:
+                raise ValueError("unknown token version")
+            expected = self._sign(f"{version}.{body}".encode("ascii"))
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                raise ValueError("bad signature")
+            payload = json.loads(_b64decode(body))
+        except (ValueError, TypeError, UnicodeError) as e:
+            metrics.increment("admin_tokens.invalid")
+            raise InvalidAdminTokenError("Invalid session") from e
+
+        if time.time() >= payload.get("exp", 0):
+            metrics.increment("admin_tokens.expired")
+            raise InvalidAdminTokenError("Session expired")
+        return payload
+
+
+class TokenRevocationList:
+    def __init__(self, collection, max_token_ttl_seconds: int):
+        """
+        Revoked admin tokens, persisted in Mongo and cached in memory
+
+        Logout revokes one token id (jti); deactivation revokes every token
+        an admin was issued up to that moment. Entries are kept only until the
+        tokens they cover would have expired anyway (TTL index on expires_at),
+        so the list stays small. Each process reloads it every
+        ADMIN_REVOCATION_REFRESH_SECONDS; revocations made in this process
+        apply immediately and survive reloads until Mongo returns them.
+
+        Args:
+            collection: Motor collection holding revocations
+            max_token_ttl_seconds: Lifetime of the longest-lived token
+        """
+        self.collection = collection
+        self.max_token_ttl_seconds = max_token_ttl_seconds
+        self.refresh_seconds = float(os.getenv('ADMIN_REVOCATION_REFRESH_SECONDS', '30'))
+        self._jtis: Set[str] = set()
+        self._revoked_before: Dict[str, float] = {}
+        # Revocations made here that a reload has not yet returned from Mongo
+        self._local_jtis: Dict[str, float] = {}
+        self._local_revoked_before: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        if payload.get("jti") in self._jtis:
+            return True
+        revoked_before = self._revoked_before.get(payload.get("sub"))
+        return revoked_before is not None and payload.get("iat", 0) <= revoked_before
+
+    async def revoke(self, payload: Dict[str, Any]):
+        """Revoke a single token (logout)"""
+        self._jtis.add(payload["jti"])
+        self._local_jtis[payload["jti"]] = payload["exp"]
+        await self.collection.update_one(
+            {"jti": payload["jti"]},
+            {"$set": {
+                "kind": "token",
+                "jti": payload["jti"],
+                "admin_id": payload["sub"],
+                "expires_at": datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+            }},
+            upsert=True
+        )
+        metrics.increment("admin_tokens.revoked")
+
+    async def revoke_admin(self, admin_id: str):
+        """Revoke every token issued to an admin so far (deactivation)"""
+        now = datetime.now(timezone.utc)
+        self._revoked_before[admin_id] = now.timestamp()
+        self._local_revoked_before[admin_id] = now.timestamp()
+        await self.collection.update_one(
+            {"kind": "admin", "admin_id": admin_id},
+            {"$set": {
+                "revoked_before": now,
+                "expires_at": now + timedelta(seconds=self.max_token_ttl_seconds)
+            }},
+            upsert=True
+        )
+        metrics.increment("admin_tokens.admins_revoked")
+
+    async def refresh(self):
+        """
+        Reload the revocation list from Mongo
+
+        Local revocations the snapshot does not contain yet (e.g. a revoke()
+        that ran while the snapshot was being read) are merged back in.
+        """
+        jtis: Set[str] = set()
+        revoked_before: Dict[str, float] = {}
+        now = datetime.now(timezone.utc)
+        async for entry in self.collection.find({}, {"_id": 0}):
+            if as_utc(entry.get("expires_at")) and as_utc(entry["expires_at"]) < now:
+                continue
+            if entry.get("kind") == "admin":
+                revoked_before[entry["admin_id"]] = as_utc(entry["revoked_before"]).timestamp()
+            elif entry.get("jti"):
+                jtis.add(entry["jti"])
+
+        # Read after the snapshot, so revocations made while it was loading are included
+        for jti, exp in list(self._local_jtis.items()):
+            if jti in jtis or exp <= now.timestamp():
+                del self._local_jtis[jti]
+            else:
+                jtis.add(jti)
+        for admin_id, revoked_at in list(self._local_revoked_before.items()):
+            # Mongo keeps milliseconds, so the stored time may be just below the local one
+            if revoked_before.get(admin_id, 0) >= revoked_at - 0.001 or (
+                revoked_at + self.max_token_ttl_seconds <= now.timestamp()
+            ):
+                del self._local_revoked_before[admin_id]
+            else:
+                revoked_before[admin_id] = revoked_at
+        self._jtis, self._revoked_before = jtis, revoked_before
+        metrics.set_gauge("admin_tokens.revocation_list_size", len(jtis) + len(revoked_before))
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.increment("admin_tokens.refresh_errors")
+                logger.error(f"Admin token revocation refresh failed: {str(e)}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        """Start the background refresh loop"""
+        if self.refresh_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the background refresh loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+admin_token_signer = AdminTokenSigner()
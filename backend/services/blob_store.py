@@ -0,0 +1,151 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional, Dict, Any, BinaryIO
+import logging
+
+from services.metrics import metrics
+from services.upload_stream import copy_stream
+
+logger = logging.getLogger(__name__)
+
+BLOB_ID_PATTERN = re.compile(r"^[0-9a-f]{64}\.(jpg|png|gif|webp|heic|bin)$")
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "heic": "image/heic",
+    "bin": "application/octet-stream",
+}
+
+
+def sniff_extension(data: bytes) -> str:
+    """Guess the file extension from magic bytes"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "heic"
+    return "bin"
+
+
+class BlobStore:
+    def __init__(self):
+        """Content-addressed directory for image bytes that used to live inline in documents"""
+        self.root = Path(os.getenv('BLOB_STORE_DIR', Path(__file__).parent.parent / 'blob_store'))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = os.getenv('BLOB_BASE_URL', '/api/blobs').rstrip('/')
+
+    def path(self, blob_id: str) -> Optional[Path]:
+        """
+        Get the on-disk location of a blob
+
+        Returns:
+            Path of the blob, or None for malformed IDs
+        """
+        if not BLOB_ID_PATTERN.match(blob_id):
+            return None
+        return self.root / blob_id[:2] / blob_id
+
+    def url(self, blob_id: str) -> str:
+        return f"{self.base_url}/{blob_id}"
+
+    def content_type(self, blob_id: str) -> str:
+        return CONTENT_TYPES[blob_id.rsplit(".", 1)[-1]]
+
+    @staticmethod
+    def is_inline(value: Any) -> bool:
+        """True for data URLs and bare base64 payloads, False for URLs and references"""
+        if not isinstance(value, str) or not value:
+            return False
+        if value.startswith("data:"):
+            return True
+        return len(value) > 256 and not value.startswith(("http://", "https://", "/"))
+
+    def _write(self, data: bytes) -> Dict[str, Any]:
+        blob_id = f"{hashlib.sha256(data).hexdigest()}.{sniff_extension(data)}"
+        path = self.path(blob_id)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{blob_id}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            metrics.increment("blob_store.writes")
+        return {"blob_id": blob_id, "url": self.url(blob_id), "size": len(data)}
+
+    def _write_stream(self, source: BinaryIO, max_bytes: Optional[int]) -> Dict[str, Any]:
+        # The blob ID is only known once the last byte has been hashed
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".upload.", suffix=".tmp")
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                reader = copy_stream(source, tmp, max_bytes)
+            with open(tmp_path, "rb") as tmp:
+                header = tmp.read(16)
+            blob_id = f"{reader.hexdigest()}.{sniff_extension(header)}"
+            path = self.path(blob_id)
+            if path.exists():
+                tmp_path.unlink()
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+                metrics.increment("blob_store.writes")
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return {"blob_id": blob_id, "url": self.url(blob_id), "size": reader.size}
+
+    def _decode_and_write(self, value: str) -> Dict[str, Any]:
+        payload = value.split(",", 1)[1] if value.startswith("data:") else value
+        try:
+            data = base64.b64decode(payload, validate=False)
+        except (binascii.Error, ValueError):
+            raise ValueError("Invalid base64 image data")
+        return self._write(data)
+
+    async def put_base64(self, value: str) -> Dict[str, Any]:
+        """
+        Store a base64 (or data URL) image payload
+
+        Args:
+            value: Base64 string, with or without a data: URL prefix
+
+        Returns:
+            Dictionary with blob_id, url and size in bytes
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self._decode_and_write, value)
+
+    async def put_bytes(self, data: bytes) -> Dict[str, Any]:
+        """Store raw bytes, returning the same reference dictionary as put_base64"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+
+    async def put_file(self, source: BinaryIO, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Stream a file object into the store in chunks, hashing as it is copied
+
+        Args:
+            source: Readable, seekable file object (e.g. an UploadFile's spooled file)
+            max_bytes: Size limit enforced while copying
+
+        Returns:
+            The same reference dictionary as put_base64
+
+        Raises:
+            UploadTooLargeError: If the source is larger than max_bytes
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self._write_stream, source, max_bytes)
+
+# Global instance
+blob_store = BlobStore()
@@ -0,0 +1,88 @@
+import math
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+BASE83_CHARACTERS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+# Blurhash only needs a handful of pixels per component
+SAMPLE_SIZE = 32
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(
+        BASE83_CHARACTERS[(value // 83 ** (length - i - 1)) % 83]
+        for i in range(length)
+    )
+
+
+def _srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    values = values / 255.0
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value: float) -> int:
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def components_for(width: int, height: int) -> Tuple[int, int]:
+    """Pick 4x3 for landscape and 3x4 for portrait photos"""
+    return (4, 3) if width >= height else (3, 4)
+
+
+def encode_blurhash(image: Image.Image, components_x: int = None, components_y: int = None) -> str:
+    """
+    Encode an image as a blurhash string
+
+    The DCT factors for every component are computed in one NumPy einsum over
+    a small downsample instead of per-pixel Python loops.
+
+    Args:
+        image: Source image (any size or mode)
+        components_x: Horizontal components (1-9), chosen from aspect ratio if omitted
+        components_y: Vertical components (1-9), chosen from aspect ratio if omitted
+
+    Returns:
+        Blurhash string (typically 20-30 characters)
+    """
+    if components_x is None or components_y is None:
+        components_x, components_y = components_for(image.width, image.height)
+
+    sample = image.convert("RGB")
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR)
+    pixels = _srgb_to_linear(np.asarray(sample, dtype=np.float64))
+    height, width = pixels.shape[:2]
+
+    basis_x = np.cos(np.pi * np.outer(np.arange(components_x), np.arange(width)) / width)
+    basis_y = np.cos(np.pi * np.outer(np.arange(components_y), np.arange(height)) / height)
+    factors = np.einsum("jy,ix,yxc->jic", basis_y, basis_x, pixels) / (width * height)
+    normalisation = np.full((components_y, components_x, 1), 2.0)
+    normalisation[0, 0, 0] = 1.0
+    factors = (factors * normalisation).reshape(-1, 3)
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((components_x - 1) + (components_y - 1) * 9, 1)
+
+    if len(ac):
+        quantised_max = int(max(0, min(82, math.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum_value = (quantised_max + 1) / 166
+    else:
+        quantised_max = 0
+        maximum_value = 1
+    result += _base83(quantised_max, 1)
+
+    result += _base83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4
+    )
+
+    if len(ac):
+        scaled = ac / maximum_value
+        quantised = np.floor(np.clip(np.sign(scaled) * np.abs(scaled) ** 0.5 * 9 + 9.5, 0, 18)).astype(int)
+        for r, g, b in quantised:
+            result += _base83(int(r) * 19 * 19 + int(g) * 19 + int(b), 2)
+
+    return result
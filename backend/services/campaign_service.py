@@ -0,0 +1,462 @@
+import asyncio
+import os
+import secrets
+import socket
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List
+import logging
+
+import aiosmtplib
+from bson import ObjectId
+from jinja2 import Template, TemplateError
+from pymongo import ReturnDocument, UpdateOne
+
+from services.email_service import email_service
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CONSENTING_USERS = {"privacy_consent.marketing_consent": True, "email": {"$nin": [None, ""]}}
+
+# Failures that concern one recipient. Anything else (connection, auth, timeouts)
+# means SMTP itself is failing, and the recipient is kept for a retry.
+RECIPIENT_ERRORS = (aiosmtplib.SMTPRecipientRefused, aiosmtplib.SMTPRecipientsRefused, TemplateError)
+
+USER_FIELDS = {"_id": 1, "id": 1, "name": 1, "email": 1, "unsubscribe_token": 1}
+
+# Sample recipient used to render a new campaign once before it is stored
+PREVIEW_CONTEXT = {"user_name": "Priya Raman", "first_name": "Priya", "email": "priya@example.com",
+                   "unsubscribe_url": "https://memoriesngifts.com/api/unsubscribe?token=preview"}
+
+
+class RateLimiter:
+    def __init__(self, rate_per_second: float):
+        """Spread acquisitions evenly so no more than rate_per_second pass per second"""
+        self.interval = 1 / rate_per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class CampaignService:
+    def __init__(self, campaigns_collection, users_collection, sender=email_service):
+        """
+        Send marketing campaigns to users who gave marketing consent
+
+        Recipients are read in _id order a batch at a time, and the last _id
+        sent is checkpointed on the campaign after every batch. A campaign
+        interrupted by a crash or restart therefore resumes from its last
+        checkpoint, repeating at most one batch. Every claim gets its own
+        lease id, renewed at each checkpoint, so only one run sends a
+        campaign, even when it is paused and restarted in the same process.
+
+        Recipients whose send failed because SMTP itself was failing are kept
+        in retry_user_oids and sent first when the campaign resumes; after
+        CAMPAIGN_MAX_TRANSPORT_FAILURES consecutive transport failures the
+        campaign pauses itself instead of burning through the list.
+
+        Subjects and bodies are admin-written, so they are compiled in the
+        sender's sandboxed environment. Every email carries an unsubscribe
+        footer and List-Unsubscribe header with the recipient's token.
+
+        Args:
+            campaigns_collection: Motor collection holding campaign documents
+            users_collection: Motor collection holding users
+            sender: Email service with a pooled send_email() and compile_template()
+        """
+        self.campaigns = campaigns_collection
+        self.users = users_collection
+        self.sender = sender
+        self.batch_size = int(os.getenv('CAMPAIGN_BATCH_SIZE', '100'))
+        self.default_rate = float(os.getenv('CAMPAIGN_MAX_MESSAGES_PER_SECOND', '5'))
+        self.lease_seconds = int(os.getenv('CAMPAIGN_LEASE_SECONDS', '300'))
+        self.poll_seconds = int(os.getenv('CAMPAIGN_POLL_SECONDS', '60'))
+        self.max_transport_failures = int(os.getenv('CAMPAIGN_MAX_TRANSPORT_FAILURES', '10'))
+        self.unsubscribe_url = os.getenv('CAMPAIGN_UNSUBSCRIBE_URL', 'https://memoriesngifts.com/api/unsubscribe')
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._runs: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def create(self, name: str, subject: str, html_template: str,
+                     rate_per_second: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Create a draft campaign
+
+        Args:
+            name: Internal campaign name
+            subject: Email subject (may use the same variables as the body)
+            html_template: Jinja2 HTML body; user_name, first_name, email and
+                unsubscribe_url are available, and an unsubscribe footer is appended
+            rate_per_second: Sending budget, defaults to CAMPAIGN_MAX_MESSAGES_PER_SECOND
+
+        Raises:
+            jinja2.TemplateError: If the subject or body does not compile, or
+                uses something the sandbox forbids (SecurityError)
+
+        Returns:
+            The stored campaign
+        """
+        # Fail on the request rather than in the background run; sandbox
+        # violations only surface when rendering, so render a sample once
+        self.sender.compile_template(subject, html=False).render(**PREVIEW_CONTEXT)
+        self.sender.compile_template(html_template).render(**PREVIEW_CONTEXT)
+
+        now = datetime.now(timezone.utc)
+        campaign = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "subject": subject,
+            "html_template": html_template,
+            "rate_per_second": rate_per_second or self.default_rate,
+            "status": "draft",
+            "last_user_oid": None,
+            "retry_user_oids": [],
+            "total_recipients": None,
+            "sent": 0,
+            "failed": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.campaigns.insert_one(campaign)
+        campaign.pop("_id", None)
+        return campaign
+
+    async def get(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Get a campaign with its progress counters"""
+        campaign = await self.campaigns.find_one({"id": campaign_id}, {"_id": 0, "html_template": 0})
+        if campaign:
+            campaign["retry_pending"] = len(campaign.pop("retry_user_oids", None) or [])
+        return campaign
+
+    async def _claim(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return await self.campaigns.find_one_and_update(
+            query,
+            {"$set": {
+                "status": "running",
+                "lease_owner": self.owner,
+                "lease_id": str(uuid.uuid4()),
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                "updated_at": now
+            },
+             "$unset": {"pause_reason": ""}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def launch(self, campaign_id: str) -> bool:
+        """
+        Start (or resume) a draft or paused campaign in the background
+
+        Returns:
+            False if the campaign does not exist or is already running/completed
+        """
+        campaign = await self._claim({"id": campaign_id, "status": {"$in": ["draft", "paused"]}})
+        if not campaign:
+            return False
+        self._spawn(campaign)
+        return True
+
+    async def pause(self, campaign_id: str) -> bool:
+        """
+        Ask a running campaign to stop after its current batch
+
+        Returns:
+            False if the campaign is not running
+        """
+        result = await self.campaigns.update_one(
+            {"id": campaign_id, "status": "running"},
+            {"$set": {"status": "paused", "updated_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count == 1
+
+    async def _run_after(self, previous: Optional[asyncio.Task], campaign: Dict[str, Any]) -> Dict[str, Any]:
+        if previous:
+            # A paused run in this process finishes its batch first; it then finds its lease gone and stops
+            await asyncio.wait([previous])
+        return await self.run(campaign)
+
+    def _spawn(self, campaign: Dict[str, Any]):
+        task = asyncio.create_task(self._run_after(self._runs.get(campaign["id"]), campaign))
+        self._runs[campaign["id"]] = task
+        # A run superseded by a newer claim must not drop the newer run's entry
+        task.add_done_callback(
+            lambda done: self._runs.pop(campaign["id"]) if self._runs.get(campaign["id"]) is done else None
+        )
+
+    async def _ensure_unsubscribe_tokens(self, users: List[Dict[str, Any]]):
+        """Give recipients without one a random unsubscribe token, filling it in on the user dicts"""
+        missing = [user for user in users if not user.get("unsubscribe_token")]
+        if not missing:
+            return
+        # Guarded so a token another campaign assigned meanwhile is never replaced
+        await self.users.bulk_write([
+            UpdateOne({"_id": user["_id"], "unsubscribe_token": {"$exists": False}},
+                      {"$set": {"unsubscribe_token": secrets.token_urlsafe(24)}})
+            for user in missing
+        ], ordered=False)
+        stored = await self.users.find(
+            {"_id": {"$in": [user["_id"] for user in missing]}}, {"_id": 1, "unsubscribe_token": 1}
+        ).to_list(len(missing))
+        tokens = {doc["_id"]: doc.get("unsubscribe_token") for doc in stored}
+        for user in missing:
+            user["unsubscribe_token"] = tokens.get(user["_id"])
+
+    async def _send_one(self, user: Dict[str, Any], subject: Template, body: Template,
+                        limiter: RateLimiter) -> bool:
+        unsubscribe_url = f"{self.unsubscribe_url}?token={user['unsubscribe_token']}"
+        context = {
+            "user_name": user.get("name") or "there",
+            "first_name": (user.get("name") or "there").split()[0],
+            "email": user["email"],
+            "unsubscribe_url": unsubscribe_url,
+        }
+        html = body.render(**context)
+        footer = self.sender.render("campaign_footer", {"unsubscribe_url": unsubscribe_url})
+        # Inside <body> for full documents, appended for fragments
+        closing = html.lower().rfind("</body>")
+        html = html[:closing] + footer + html[closing:] if closing != -1 else html + footer
+        await limiter.acquire()
+        # strict: SMTP errors are raised so transport failures can be told apart from bad recipients
+        return await self.sender.send_email(
+            user["email"], subject.render(**context), html, strict=True,
+            headers={"List-Unsubscribe": f"<{unsubscribe_url}>", "List-Unsubscribe-Post": "List-Unsubscribe=One-Click"}
+        )
+
+    async def run(self, campaign: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send a claimed campaign: pending retries first, then from its last checkpoint to the end
+
+        Returns:
+            The campaign's final progress counters
+        """
+        campaign_id = campaign["id"]
+        # Every write is conditional on this claim's lease; once another run claims the
+        # campaign (or the lease is lost) this run's writes match nothing and it stops
+        held = {"id": campaign_id, "lease_id": campaign["lease_id"]}
+        release = {"lease_owner": "", "lease_id": "", "lease_expires_at": ""}
+        # Compiled once; only the per-user variables change between recipients
+        subject = self.sender.compile_template(campaign["subject"], html=False)
+        body = self.sender.compile_template(campaign["html_template"])
+        limiter = RateLimiter(campaign["rate_per_second"])
+        # Stay within the SMTP pool so campaign sends do not starve transactional email
+        semaphore = asyncio.Semaphore(max(1, self.sender.smtp_pool.size - 1))
+        # A slow budget must not let the lease lapse in the middle of a batch
+        lease = timedelta(seconds=max(self.lease_seconds, 2 * self.batch_size / campaign["rate_per_second"]))
+        transport = {"consecutive_failures": 0, "last_error": None}
+
+        # Re-read the checkpoint: a previous run may have written one after this claim was made
+        current = await self.campaigns.find_one(held, {"_id": 0, "last_user_oid": 1, "total_recipients": 1})
+        if not current:
+            logger.info(f"Campaign {campaign_id} was claimed again before this run started")
+            return await self.get(campaign_id)
+        last_oid = current.get("last_user_oid")
+
+        started = {"lease_expires_at": datetime.now(timezone.utc) + lease}
+        if current.get("total_recipients") is None:
+            started["total_recipients"] = await self.users.count_documents(CONSENTING_USERS)
+            started["started_at"] = datetime.now(timezone.utc)
+        await self.campaigns.update_one(held, {"$set": started})
+        logger.info(f"Campaign {campaign_id} sending from checkpoint {last_oid}")
+
+        def transport_down() -> bool:
+            return transport["consecutive_failures"] >= self.max_transport_failures
+
+        async def send_limited(user) -> str:
+            async with semaphore:
+                # Once SMTP is known to be down, keep the rest of the batch for the retry
+                if transport_down():
+                    return "retry"
+                try:
+                    await self._send_one(user, subject, body, limiter)
+                    transport["consecutive_failures"] = 0
+                    return "sent"
+                except RECIPIENT_ERRORS as e:
+                    logger.warning(f"Campaign {campaign_id} could not send to {user.get('id')}: {str(e)}")
+                    return "failed"
+                except Exception as e:
+                    transport["consecutive_failures"] += 1
+                    transport["last_error"] = f"{type(e).__name__}: {e}"
+                    logger.error(f"Campaign {campaign_id} transport failure for {user.get('id')}: {transport['last_error']}")
+                    return "retry"
+
+        async def send_batch(users: List[Dict[str, Any]], update: Dict[str, Any],
+                             handover: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            """
+            Send one batch, then checkpoint and renew the lease
+
+            If the campaign was claimed again meanwhile (paused and restarted),
+            the batch's progress is still recorded as long as the campaign is
+            where this batch started (the handover filter), so the new run
+            does not send it again. Returns the campaign, or None if the lease is lost.
+            """
+            await self._ensure_unsubscribe_tokens(users)
+            with metrics.timer("campaigns.batch"):
+                results = await asyncio.gather(*(send_limited(user) for user in users))
+            sent = results.count("sent")
+            failed = results.count("failed")
+            retry = [str(user["_id"]) for user, result in zip(users, results) if result == "retry"]
+            metrics.increment("campaigns.sent", sent)
+            metrics.increment("campaigns.failed", failed)
+            metrics.increment("campaigns.retry_pending", len(retry))
+
+            now = datetime.now(timezone.utc)
+            update.setdefault("$set", {})["updated_at"] = now
+            update["$inc"] = {"sent": sent, "failed": failed}
+            if retry and "$pullAll" not in update:
+                update["$push"] = {"retry_user_oids": {"$each": retry}}
+            elif "$pullAll" in update:
+                update["$pullAll"]["retry_user_oids"] = [
+                    oid for oid in update["$pullAll"]["retry_user_oids"] if oid not in retry
+                ]
+            checkpoint = await self.campaigns.find_one_and_update(
+                held,
+                {**update, "$set": {**update["$set"], "lease_expires_at": now + lease}},
+                projection={"_id": 0, "status": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if checkpoint is None:
+                await self.campaigns.update_one({"id": campaign_id, **handover}, update)
+            return checkpoint
+
+        async def stop_if_needed(checkpoint: Optional[Dict[str, Any]]) -> bool:
+            if checkpoint is None:
+                logger.info(f"Campaign {campaign_id} lease was taken over; stopping this run")
+                return True
+            if checkpoint["status"] != "running":
+                await self.campaigns.update_one(held, {"$unset": release})
+                logger.info(f"Campaign {campaign_id} paused at checkpoint {last_oid}")
+                return True
+            if transport_down():
+                await self.campaigns.update_one(held, {
+                    "$set": {"status": "paused", "pause_reason": "smtp_unavailable",
+                             "last_error": transport["last_error"], "updated_at": datetime.now(timezone.utc)},
+                    "$unset": release
+                })
+                metrics.increment("campaigns.paused_on_transport_failure")
+                logger.error(f"Campaign {campaign_id} paused after {transport['consecutive_failures']} "
+                             f"consecutive SMTP failures: {transport['last_error']}")
+                return True
+            return False
+
+        async def send_retries() -> bool:
+            """Resend recipients kept back by transport failures; returns True if the run must stop"""
+            doc = await self.campaigns.find_one(held, {"_id": 0, "retry_user_oids": 1})
+            oids = (doc or {}).get("retry_user_oids") or []
+            for i in range(0, len(oids), self.batch_size):
+                chunk = oids[i:i + self.batch_size]
+                users = await self.users.find(
+                    {**CONSENTING_USERS, "_id": {"$in": [ObjectId(oid) for oid in chunk]}}, USER_FIELDS
+                ).to_list(len(chunk))
+                # Recipients who withdrew consent meanwhile are simply dropped from the list
+                checkpoint = await send_batch(
+                    users,
+                    {"$pullAll": {"retry_user_oids": list(chunk)}},
+                    {"retry_user_oids": {"$all": list(chunk)}}
+                )
+                if await stop_if_needed(checkpoint):
+                    return True
+            return False
+
+        try:
+            if await send_retries():
+                return await self.get(campaign_id)
+
+            while True:
+                query = dict(CONSENTING_USERS)
+                if last_oid:
+                    query["_id"] = {"$gt": ObjectId(last_oid)}
+                users: List[Dict[str, Any]] = await self.users.find(
+                    query, USER_FIELDS
+                ).sort("_id", 1).limit(self.batch_size).to_list(self.batch_size)
+
+                if not users:
+                    # One more pass over recipients that hit transient SMTP errors on the way
+                    if await send_retries():
+                        break
+                    doc = await self.campaigns.find_one(held, {"_id": 0, "retry_user_oids": 1})
+                    if doc and doc.get("retry_user_oids"):
+                        status = {"status": "paused", "pause_reason": "retry_pending", "last_error": transport["last_error"]}
+                    else:
+                        status = {"status": "completed", "completed_at": datetime.now(timezone.utc)}
+                    await self.campaigns.update_one(
+                        held,
+                        {"$set": {**status, "updated_at": datetime.now(timezone.utc)}, "$unset": release}
+                    )
+                    break
+
+                handover = {"last_user_oid": last_oid}
+                last_oid = str(users[-1]["_id"])
+                # A pause (status change) or a lost lease ends the run after this checkpoint
+                checkpoint = await send_batch(users, {"$set": {"last_user_oid": last_oid}}, handover)
+                if await stop_if_needed(checkpoint):
+                    break
+        except asyncio.CancelledError:
+            # Leave the lease to expire; the next poll (here or elsewhere) resumes it
+            raise
+        except Exception as e:
+            metrics.increment("campaigns.errors")
+            logger.error(f"Campaign {campaign_id} stopped: {str(e)}")
+            await self.campaigns.update_one(
+                held,
+                {"$set": {"status": "failed", "last_error": str(e), "updated_at": datetime.now(timezone.utc)},
+                 "$unset": release}
+            )
+
+        return await self.get(campaign_id)
+
+    async def resume_interrupted(self) -> int:
+        """
+        Pick up running campaigns whose lease expired (their process died)
+
+        Returns:
+            Number of campaigns resumed
+        """
+        resumed = 0
+        while True:
+            campaign = await self._claim({
+                "status": "running",
+                "lease_expires_at": {"$lt": datetime.now(timezone.utc)}
+            })
+            if not campaign:
+                return resumed
+            self._spawn(campaign)
+            resumed += 1
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.resume_interrupted()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Campaign resume check failed: {str(e)}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        """Start the background loop that resumes interrupted campaigns"""
+        if self.poll_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the resume loop and any running sends"""
+        tasks = list(self._runs.values())
+        if self._task:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,347 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Awaitable
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedUploadError(Exception):
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        """Protocol error carrying the HTTP status and, for resumes, the server offset"""
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.offset = offset
+
+
+class ChunkedUploadService:
+    def __init__(self):
+        """Spool resumable uploads to local disk, one data file and one manifest per upload"""
+        self.spool_dir = Path(os.getenv('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'memories_uploads')))
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.max_upload_size = int(os.getenv('MAX_CHUNKED_UPLOAD_SIZE', str(50 * 1024 * 1024)))  # 50MB
+        self.max_chunk_size = int(os.getenv('MAX_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))  # 8MB
+        self.session_ttl_hours = 24
+        # init_upload sweeps the spool at most this often, not on every call
+        self.purge_interval_seconds = int(os.getenv('UPLOAD_PURGE_INTERVAL_SECONDS', '600'))
+        # A completion claim older than this belongs to a worker that died mid-store
+        self.complete_lease_seconds = int(os.getenv('UPLOAD_COMPLETE_LEASE_SECONDS', '900'))
+        self.complete_wait_seconds = 60
+        self._last_purge = 0.0
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _data_path(self, upload_id: str) -> Path:
+        return self.spool_dir / f"{upload_id}.part"
+
+    def _manifest_path(self, upload_id: str) -> Path:
+        return self.spool_dir / f"{upload_id}.json"
+
+    def _marker_path(self, upload_id: str) -> Path:
+        return self.spool_dir / f"{upload_id}.complete"
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        path = self._manifest_path(manifest["upload_id"])
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest))
+        os.replace(tmp_path, path)
+
+    async def _save_manifest(self, manifest: Dict[str, Any]):
+        await asyncio.get_running_loop().run_in_executor(None, self._write_manifest, manifest)
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    def _read_manifest(self, upload_id: str) -> Dict[str, Any]:
+        try:
+            uuid.UUID(upload_id)
+            return json.loads(self._manifest_path(upload_id).read_text())
+        except (ValueError, FileNotFoundError):
+            raise ChunkedUploadError("Upload not found", status_code=404)
+
+    async def get_session(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Load an upload session owned by the user
+
+        Args:
+            upload_id: Upload session identifier
+            user_id: User the upload must belong to
+
+        Returns:
+            Session manifest including the current offset
+        """
+        manifest = await asyncio.to_thread(self._read_manifest, upload_id)
+        if manifest["user_id"] != user_id:
+            raise ChunkedUploadError("Upload not found", status_code=404)
+        return manifest
+
+    def _create(self, manifest: Dict[str, Any]):
+        self._data_path(manifest["upload_id"]).touch()
+        self._write_manifest(manifest)
+
+    async def init_upload(self, user_id: str, filename: str, content_type: str, total_size: int,
+                    sha256: Optional[str] = None, order_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Start a resumable upload
+
+        Args:
+            user_id: Uploading user
+            filename: Original filename
+            content_type: Declared MIME type
+            total_size: Size of the complete file in bytes
+            sha256: Optional hex digest of the complete file, verified on completion
+            order_id: Optional order the photo belongs to
+
+        Returns:
+            New session manifest
+        """
+        if not content_type or not content_type.startswith('image/'):
+            raise ChunkedUploadError("Only image files are allowed")
+        if total_size <= 0 or total_size > self.max_upload_size:
+            raise ChunkedUploadError(f"File size must be between 1 byte and {self.max_upload_size // (1024 * 1024)}MB")
+
+        if time.monotonic() - self._last_purge >= self.purge_interval_seconds:
+            self._last_purge = time.monotonic()
+            await self.purge_stale()
+
+        manifest = {
+            "upload_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "order_id": order_id,
+            "filename": filename,
+            "content_type": content_type,
+            "total_size": total_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "offset": 0,
+            "chunks": [],
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await asyncio.to_thread(self._create, manifest)
+        metrics.increment("chunked_upload.started")
+        return manifest
+
+    async def append_chunk(self, upload_id: str, user_id: str, offset: int,
+                           stream: AsyncIterator[bytes], checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Append one chunk at the given offset, streaming it to the spool file
+
+        The offset must match what the server already holds; otherwise a 409
+        carries the current offset so the client can resume from there.
+
+        Args:
+            upload_id: Upload session identifier
+            user_id: Uploading user
+            offset: Byte offset the chunk starts at
+            stream: Async iterator over the chunk body
+            checksum: Optional hex SHA-256 of the chunk
+
+        Returns:
+            Updated session manifest
+        """
+        async with self._lock(upload_id):
+            manifest = await self.get_session(upload_id, user_id)
+            if manifest.get("completed"):
+                raise ChunkedUploadError("Upload is already complete", status_code=409, offset=manifest["offset"])
+            if offset != manifest["offset"]:
+                raise ChunkedUploadError("Offset mismatch", status_code=409, offset=manifest["offset"])
+
+            hasher = hashlib.sha256()
+            written = 0
+            started = time.perf_counter()
+            # Disk writes go to the default executor so a slow disk never stalls the event loop
+            loop = asyncio.get_running_loop()
+            spool = await loop.run_in_executor(None, open, self._data_path(upload_id), "r+b")
+            try:
+                await loop.run_in_executor(None, spool.seek, offset)
+                try:
+                    async for piece in stream:
+                        written += len(piece)
+                        if written > self.max_chunk_size or offset + written > manifest["total_size"]:
+                            raise ChunkedUploadError("Chunk exceeds the allowed or declared size", status_code=413)
+                        hasher.update(piece)
+                        await loop.run_in_executor(None, spool.write, piece)
+                    digest = hasher.hexdigest()
+                    if checksum and checksum.lower() != digest:
+                        raise ChunkedUploadError("Chunk checksum mismatch", offset=offset)
+                except BaseException:
+                    # Drop the partial chunk so the upload stays resumable at the old offset
+                    await loop.run_in_executor(None, spool.truncate, offset)
+                    raise
+                await loop.run_in_executor(None, spool.truncate, offset + written)
+            finally:
+                await loop.run_in_executor(None, spool.close)
+
+            manifest["chunks"].append({"offset": offset, "length": written, "sha256": digest})
+            manifest["offset"] = offset + written
+            await self._save_manifest(manifest)
+            metrics.observe("chunked_upload.append", time.perf_counter() - started)
+            return manifest
+
+    def _file_digest(self, upload_id: str) -> str:
+        hasher = hashlib.sha256()
+        with open(self._data_path(upload_id), "rb") as spool:
+            for block in iter(lambda: spool.read(1024 * 1024), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    async def verify_complete(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Check that every byte arrived and matches the declared checksum
+
+        Returns:
+            Session manifest with "data_path" set to the finished spool file
+        """
+        manifest = await self.get_session(upload_id, user_id)
+        if manifest["offset"] != manifest["total_size"]:
+            raise ChunkedUploadError("Upload is incomplete", status_code=409, offset=manifest["offset"])
+
+        if manifest["sha256"]:
+            digest = await asyncio.get_running_loop().run_in_executor(None, self._file_digest, upload_id)
+            if digest != manifest["sha256"]:
+                raise ChunkedUploadError("File checksum mismatch", status_code=422)
+
+        manifest["data_path"] = str(self._data_path(upload_id))
+        return manifest
+
+    def _claim_completion(self, upload_id: str) -> bool:
+        """
+        Atomically claim the right to store an upload, across workers sharing the spool
+
+        The claim is a marker file created with O_EXCL, so exactly one caller
+        wins. It stays in place once the upload is stored. A claim older than
+        the lease is taken over by renaming it away first. Only one caller's
+        rename succeeds.
+        """
+        marker = self._marker_path(upload_id)
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        try:
+            if time.time() - marker.stat().st_mtime < self.complete_lease_seconds:
+                return False
+            abandoned = marker.with_name(f"{marker.name}.{uuid.uuid4().hex}")
+            os.rename(marker, abandoned)
+        except FileNotFoundError:
+            return False
+        abandoned.unlink()
+        logger.warning(f"Taking over abandoned completion of upload {upload_id}")
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def _release_completion(self, upload_id: str):
+        try:
+            self._marker_path(upload_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    async def complete(self, upload_id: str, user_id: str,
+                       store: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Verify a finished upload and hand it to store() exactly once
+
+        Completion is claimed with a marker file next to the manifest, so
+        concurrent or repeated completes never store the upload twice, even
+        when they reach different workers. The first caller stores it. The
+        others wait for its result and get the same answer, now or later,
+        until the session is purged. If store() fails, the claim is released
+        so completion can be retried.
+
+        Args:
+            upload_id: Upload session identifier
+            user_id: Uploading user
+            store: Coroutine taking the verified manifest (with "data_path")
+                and returning the JSON-serialisable result to remember
+
+        Returns:
+            The stored result
+
+        Raises:
+            ChunkedUploadError: 409 if another worker is still storing the upload
+        """
+        async with self._lock(upload_id):
+            deadline = time.monotonic() + self.complete_wait_seconds
+            while True:
+                manifest = await self.get_session(upload_id, user_id)
+                if manifest.get("completed"):
+                    metrics.increment("chunked_upload.duplicate_complete")
+                    return manifest["result"]
+                if await asyncio.to_thread(self._claim_completion, upload_id):
+                    break
+                if time.monotonic() >= deadline:
+                    raise ChunkedUploadError("Upload is still being completed, retry shortly", status_code=409)
+                await asyncio.sleep(0.25)
+
+            try:
+                # A claimant whose lease we took over may have finished after all
+                manifest = await self.get_session(upload_id, user_id)
+                if manifest.get("completed"):
+                    return manifest["result"]
+                manifest = await self.verify_complete(upload_id, user_id)
+                result = await store(manifest)
+            except BaseException:
+                await asyncio.to_thread(self._release_completion, upload_id)
+                raise
+
+            manifest.pop("data_path")
+            manifest.update({"completed": True, "result": result, "completed_at": datetime.now(timezone.utc).isoformat()})
+            await self._save_manifest(manifest)
+            # The data is in storage now; the manifest stays until purge_stale so retries stay idempotent
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._data_path(upload_id).unlink)
+            except FileNotFoundError:
+                pass
+            metrics.increment("chunked_upload.completed")
+            return result
+
+    def _discard(self, upload_id: str):
+        for path in (self._data_path(upload_id), self._manifest_path(upload_id), self._marker_path(upload_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._locks.pop(upload_id, None)
+
+    async def discard(self, upload_id: str):
+        """Remove an upload's spool file, manifest and completion marker"""
+        await asyncio.to_thread(self._discard, upload_id)
+
+    def _purge_stale(self) -> int:
+        cutoff = time.time() - self.session_ttl_hours * 3600
+        removed = 0
+        for manifest_path in self.spool_dir.glob("*.json"):
+            try:
+                if manifest_path.stat().st_mtime < cutoff:
+                    self._discard(manifest_path.stem)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    async def purge_stale(self) -> int:
+        """
+        Delete uploads that have not been touched within the session TTL
+
+        Returns:
+            Number of uploads removed
+        """
+        removed = await asyncio.to_thread(self._purge_stale)
+        if removed:
+            logger.info(f"Purged {removed} stale chunked uploads")
+        return removed
+
+# Global instance
+chunked_upload_service = ChunkedUploadService()
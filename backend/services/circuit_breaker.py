@@ -0,0 +1,108 @@
+import time
+from collections import deque
+from typing import Dict, Any
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, error_rate_threshold: float = 0.5, window: int = 20,
+                 min_calls: int = 5, reset_seconds: float = 30.0):
+        """
+        Stop calling a failing dependency for a while
+
+        The outcome of the last `window` calls is kept. Once at least
+        `min_calls` have been seen and the share of failures reaches
+        `error_rate_threshold`, the circuit opens and allow() returns False
+        for `reset_seconds`. After that a single probe call is let through
+        (half open): success closes the circuit, failure opens it again.
+
+        Args:
+            name: Metric prefix (e.g. "gift_suggestions.llm")
+            error_rate_threshold: Failure share (0-1) that opens the circuit
+            window: Number of recent calls the error rate is computed over
+            min_calls: Calls needed before the circuit may open
+            reset_seconds: How long the circuit stays open before probing
+        """
+        self.name = name
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.reset_seconds = reset_seconds
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go ahead
+
+        Returns:
+            False while open, or while a half-open probe is already in flight
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        metrics.increment(f"{self.name}.rejected")
+        return False
+
+    def _publish(self):
+        metrics.set_gauge(f"{self.name}.error_rate", round(self.error_rate, 3))
+        metrics.set_gauge(f"{self.name}.circuit_open", 0 if self._opened_at is None else 1)
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info(f"Circuit {self.name} closed after a successful probe")
+            self._opened_at = None
+            self._outcomes.clear()
+        self._probing = False
+        self._outcomes.append(True)
+        self._publish()
+
+    def record_failure(self):
+        self._outcomes.append(False)
+        if self._probing or (
+            self._opened_at is None
+            and len(self._outcomes) >= self.min_calls
+            and self.error_rate >= self.error_rate_threshold
+        ):
+            if self._opened_at is None:
+                logger.warning(f"Circuit {self.name} opened at {self.error_rate:.0%} errors")
+            metrics.increment(f"{self.name}.circuit_opened")
+            self._opened_at = time.monotonic()
+        self._probing = False
+        self._publish()
+
+    def release_probe(self):
+        """Give up a half-open probe that ended without a verdict (e.g. cancelled)"""
+        self._probing = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "recent_calls": len(self._outcomes),
+        }
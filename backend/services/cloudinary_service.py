@@ -1,12 +1,22 @@
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
+import functools
 import os
+import time
 import uuid
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Union, BinaryIO
 import logging
 
+from cachetools import LRUCache
+
+from services.metrics import metrics
+from services.single_flight import SingleFlight
+from services.upload_stream import HashingReader
+
 logger = logging.getLogger(__name__)
 
 class CloudinaryService:
@@ -26,17 +36,66 @@ class CloudinaryService:
             api_secret="asHKc2dnS_Ys2AHqwNCkEkH2nBM"
         )
         
+        # Optional override so uploads can be pointed at a local fake server
+        upload_prefix = os.getenv('CLOUDINARY_UPLOAD_PREFIX')
+        if upload_prefix:
+            cloudinary.config(upload_prefix=upload_prefix)
+        
         self.cloud_name = "dgniboqvx"
         self.auto_delete_days = 30  # Auto-delete photos after 30 days unless saved
         
-    async def upload_user_photo(self, user_id: str, file_data: bytes, filename: str, 
+        # The SDK is synchronous, so every network call runs on a dedicated,
+        # bounded thread pool instead of blocking the event loop
+        self.max_workers = int(os.getenv('CLOUDINARY_MAX_WORKERS', '8'))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="cloudinary"
+        )
+        
+        # File uploads are sent in parts so only one part is in memory at a time
+        # (Cloudinary requires parts of at least 5MB)
+        self.upload_chunk_size = max(int(os.getenv('CLOUDINARY_UPLOAD_CHUNK_SIZE', str(6 * 1024 * 1024))), 5 * 1024 * 1024)
+        
+        # Signed URLs keyed by (public_id, lifetime, expiry bucket)
+        self._signed_url_cache = LRUCache(maxsize=int(os.getenv('SIGNED_URL_CACHE_SIZE', '10000')))
+        
+        self._listings = SingleFlight("cloudinary.listings")
+    
+    async def _call(self, operation: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking Cloudinary SDK call on the service executor
+        
+        Args:
+            operation: Metric name for the call (e.g. "upload", "resources")
+            func: SDK function to invoke
+            
+        Returns:
+            Whatever the SDK function returns
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+        except Exception:
+            metrics.increment(f"cloudinary.{operation}.errors")
+            raise
+        finally:
+            metrics.observe(f"cloudinary.{operation}", time.perf_counter() - started)
+    
+    def shutdown(self):
+        """Release the SDK worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        
+    async def upload_user_photo(self, user_id: str, file_data: Union[bytes, BinaryIO], filename: str, 
                                order_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Upload photo to user's private folder with proper organization
         
         Args:
             user_id: Unique user identifier
-            file_data: Photo file bytes
+            file_data: Photo file bytes or a readable file object
             filename: Original filename
             order_id: Optional order ID for order-specific photos
             
@@ -56,9 +115,21 @@ class CloudinaryService:
             clean_filename = filename.split('.')[0][:20]  # Limit filename length
             public_id = f"{timestamp}_{unique_id}_{clean_filename}"
             
+            # Stream file objects in parts instead of encoding the whole file
+            # into one multipart body; upload_large closes what it is given,
+            # so it gets a view and the caller keeps ownership of the file
+            if isinstance(file_data, (bytes, bytearray)):
+                upload_func, upload_source, upload_options = cloudinary.uploader.upload, file_data, {}
+            else:
+                upload_func, upload_source = cloudinary.uploader.upload_large, HashingReader(file_data)
+                upload_options = {"chunk_size": self.upload_chunk_size, "filename": filename}
+            
             # Upload with optimization and security
-            result = cloudinary.uploader.upload(
-                file_data,
+            result = await self._call(
+                "upload",
+                upload_func,
+                upload_source,
+                **upload_options,
                 folder=folder,
                 public_id=public_id,
                 resource_type="image",
@@ -66,13 +137,6 @@ class CloudinaryService:
                 fetch_format="auto",
                 secure=True,
                 overwrite=False,
-                # Auto-generate thumbnails
-                eager=[
-                    {"width": 150, "height": 150, "crop": "fill", "quality": "auto:eco"},
-                    {"width": 300, "height": 300, "crop": "fill", "quality": "auto:good"},
-                    {"width": 600, "height": 600, "crop": "limit", "quality": "auto:good"},
-                    {"width": 1200, "height": 1200, "crop": "limit", "quality": "auto:best"}
-                ],
                 # Add metadata
                 context={
                     "user_id": user_id,
@@ -93,12 +157,8 @@ class CloudinaryService:
                 "height": result["height"],
                 "format": result["format"],
                 "bytes": result["bytes"],
-                "thumbnails": {
-                    "small": result["eager"][0]["secure_url"] if result.get("eager") else None,
-                    "medium": result["eager"][1]["secure_url"] if len(result.get("eager", [])) > 1 else None,
-                    "large": result["eager"][2]["secure_url"] if len(result.get("eager", [])) > 2 else None,
-                    "xlarge": result["eager"][3]["secure_url"] if len(result.get("eager", [])) > 3 else None,
-                },
+                # Thumbnails are rendered locally by the derivative service
+                "thumbnails": {},
                 "metadata": {
                     "user_id": user_id,
                     "order_id": order_id,
@@ -134,8 +194,20 @@ class CloudinaryService:
                 logger.warning(f"Unauthorized access attempt: user {user_id} tried to access {public_id}")
                 return None
             
-            # Generate signed URL with expiration
-            expires_at = int((datetime.now() + timedelta(hours=expires_in_hours)).timestamp())
+            # Align expiry to a bucket so the same URL is reused (and stays
+            # browser/CDN cacheable) until only the last quarter of its life remains
+            lifetime = expires_in_hours * 3600
+            refresh_every = max(int(lifetime * 0.75), 1)
+            bucket = int(time.time()) // refresh_every
+            cache_key = (public_id, expires_in_hours, bucket)
+            
+            url = self._signed_url_cache.get(cache_key)
+            if url is not None:
+                metrics.increment("cloudinary.signed_url.cache_hits")
+                return url
+            
+            metrics.increment("cloudinary.signed_url.cache_misses")
+            expires_at = bucket * refresh_every + lifetime
             
             url, options = cloudinary.utils.cloudinary_url(
                 public_id,
@@ -145,7 +217,8 @@ class CloudinaryService:
                 type="authenticated"  # Require authentication
             )
             
-            logger.info(f"Generated signed URL for user {user_id}: {public_id}")
+            self._signed_url_cache[cache_key] = url
+            logger.debug(f"Generated signed URL for user {user_id}: {public_id}")
             return url
             
         except Exception as e:
@@ -165,7 +238,9 @@ class CloudinaryService:
         """
         try:
             # Search for photos in user's folder
-            result = cloudinary.api.resources(
+            result = await self._call(
+                "resources",
+                cloudinary.api.resources,
                 type="upload",
                 prefix=f"users/{user_id}/",
                 max_results=limit,
@@ -198,6 +273,36 @@ class CloudinaryService:
             logger.error(f"Failed to get photos for user {user_id}: {str(e)}")
             return []
     
+    async def list_resources(self, prefix: str = "users/", next_cursor: Optional[str] = None,
+                             max_results: int = 500) -> Dict[str, Any]:
+        """
+        List one page of uploaded resources under a prefix
+        
+        Args:
+            prefix: Public ID prefix to list
+            next_cursor: Cursor returned by the previous page, if any
+            max_results: Page size (Cloudinary allows up to 500)
+            
+        Returns:
+            Dictionary with "resources" and "next_cursor"
+        """
+        # Concurrent listings of the same page (reconciler passes, admin views) share one API call
+        return await self._listings.do(
+            (prefix, next_cursor, max_results),
+            lambda: self._list_resources(prefix, next_cursor, max_results)
+        )
+    
+    async def _list_resources(self, prefix: str, next_cursor: Optional[str], max_results: int) -> Dict[str, Any]:
+        options = {"type": "upload", "prefix": prefix, "max_results": max_results, "context": True}
+        if next_cursor:
+            options["next_cursor"] = next_cursor
+        
+        result = await self._call("resources", cloudinary.api.resources, **options)
+        return {
+            "resources": result.get("resources", []),
+            "next_cursor": result.get("next_cursor")
+        }
+    
     async def delete_user_photo(self, public_id: str, user_id: str) -> bool:
         """
         Delete a user's photo with authorization check
@@ -216,7 +321,12 @@ class CloudinaryService:
                 return False
             
             # Delete photo and all its transformations
-            result = cloudinary.uploader.destroy(public_id, invalidate=True)
+            result = await self._call(
+                "destroy",
+                cloudinary.uploader.destroy,
+                public_id,
+                invalidate=True
+            )
             
             if result.get("result") == "ok":
                 logger.info(f"Photo deleted successfully: {public_id}")
@@ -229,25 +339,36 @@ class CloudinaryService:
             logger.error(f"Failed to delete photo {public_id}: {str(e)}")
             return False
     
-    async def cleanup_expired_photos(self) -> int:
+    async def delete_photos(self, public_ids: List[str]) -> List[str]:
         """
-        Cleanup photos that have exceeded the retention period
+        Delete up to 100 photos with a single Admin API call
         
+        Args:
+            public_ids: Photos to delete (Cloudinary caps a request at 100)
+            
         Returns:
-            Number of photos deleted
+            Public IDs that are gone from storage (deleted or already missing)
         """
+        if len(public_ids) > 100:
+            raise ValueError("Cloudinary bulk delete accepts at most 100 public IDs")
+        if not public_ids:
+            return []
+        
         try:
-            cutoff_date = datetime.now() - timedelta(days=self.auto_delete_days)
-            deleted_count = 0
-            
-            # This would typically be run as a scheduled job
-            # For now, return 0 as we need a more sophisticated cleanup system
-            logger.info(f"Cleanup job would delete photos older than {cutoff_date}")
-            return deleted_count
+            result = await self._call(
+                "delete_resources",
+                cloudinary.api.delete_resources,
+                public_ids,
+                invalidate=True
+            )
+            deleted = result.get("deleted", {})
+            gone = [public_id for public_id in public_ids if deleted.get(public_id) in ("deleted", "not_found")]
+            logger.info(f"Bulk deleted {len(gone)} of {len(public_ids)} photos")
+            return gone
             
         except Exception as e:
-            logger.error(f"Failed to cleanup expired photos: {str(e)}")
-            return 0
+            logger.error(f"Failed to bulk delete photos: {str(e)}")
+            return []
     
     async def generate_product_mockup(self, user_photo_public_id: str, frame_template: str, 
                                     user_id: str) -> Optional[str]:
@@ -0,0 +1,288 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, Union, BinaryIO, Tuple
+import logging
+
+from PIL import Image, ImageOps
+
+from services.blob_store import sniff_extension
+from services.blurhash import encode_blurhash
+from services.metrics import metrics
+from services.single_flight import SingleFlight
+from services.upload_stream import copy_stream, UploadTooLargeError
+
+logger = logging.getLogger(__name__)
+
+# iPhone photos arrive as HEIC, which Pillow only decodes through the pillow-heif plugin.
+# Registered at import, so render worker processes pick it up too.
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIF_SUPPORTED = True
+except ImportError:
+    HEIF_SUPPORTED = False
+    logger.warning("pillow-heif is not installed; HEIC photos are stored without local thumbnails")
+
+PLACEHOLDER_FILENAME = "blurhash.txt"
+
+# Same sizes the Cloudinary eager transformations used to produce
+VARIANTS: Dict[str, Dict[str, Any]] = {
+    "small": {"width": 150, "height": 150, "crop": "fill", "quality": 70},
+    "medium": {"width": 300, "height": 300, "crop": "fill", "quality": 82},
+    "large": {"width": 600, "height": 600, "crop": "limit", "quality": 82},
+    "xlarge": {"width": 1200, "height": 1200, "crop": "limit", "quality": 90},
+}
+
+
+def _resize_variant(base: Image.Image, width: int, height: int, crop: str) -> Image.Image:
+    """Shrink with a cheap integer reduce() first, then finish with a high-quality resample"""
+    if crop == "fill":
+        scale = max(width / base.width, height / base.height)
+    else:
+        scale = min(width / base.width, height / base.height)
+
+    image = base
+    if scale < 1:
+        factor = int(1 / scale)
+        if factor > 1:
+            image = image.reduce(factor)
+
+    if crop == "fill":
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    if image.width > width or image.height > height:
+        image = image.copy()
+        image.thumbnail((width, height), Image.LANCZOS)
+    return image
+
+
+def render_derivatives(source_path: str, output_dir: str, variants: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Decode a photo once, write every variant as JPEG and a blurhash
+    placeholder (runs in a worker process)
+
+    Args:
+        source_path: Path of the original image
+        output_dir: Directory receiving "<variant>.jpg" files
+        variants: Variant name to size/crop/quality settings
+
+    Returns:
+        Render time in milliseconds per variant, plus "decode" and "placeholder"
+    """
+    timings = {}
+    started = time.perf_counter()
+    with Image.open(source_path) as source:
+        # JPEG draft mode decodes at 1/2, 1/4 or 1/8 scale, never below the largest variant
+        largest = max(max(v["width"], v["height"]) for v in variants.values())
+        source.draft("RGB", (largest, largest))
+        base = ImageOps.exif_transpose(source)
+        if base.mode != "RGB":
+            base = base.convert("RGB")
+    timings["decode"] = (time.perf_counter() - started) * 1000
+
+    for name, variant in variants.items():
+        started = time.perf_counter()
+        image = _resize_variant(base, variant["width"], variant["height"], variant["crop"])
+        tmp_path = os.path.join(output_dir, f".{name}.{os.getpid()}.tmp")
+        image.save(tmp_path, "JPEG", quality=variant["quality"], optimize=True, progressive=True)
+        os.replace(tmp_path, os.path.join(output_dir, f"{name}.jpg"))
+        timings[name] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with open(os.path.join(output_dir, PLACEHOLDER_FILENAME), "w") as placeholder:
+        placeholder.write(encode_blurhash(base))
+    timings["placeholder"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+class DerivativeService:
+    def __init__(self):
+        """
+        Render thumbnails locally into a content-addressed disk cache
+
+        The cache lives next to the app by default rather than in /tmp, and
+        a variant missing from it (cleanup, new host) is rendered again from
+        the stored original with regenerate().
+        """
+        self.cache_dir = Path(os.getenv('DERIVATIVE_CACHE_DIR', Path(__file__).parent.parent / 'derivative_cache'))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.base_url = os.getenv('DERIVATIVE_BASE_URL', '/api/derivatives').rstrip('/')
+        self.max_workers = int(os.getenv('DERIVATIVE_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._regenerations = SingleFlight("derivatives.regenerations")
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the service never forks
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def variant_dir(self, content_hash: str) -> Path:
+        return self.cache_dir / content_hash[:2] / content_hash
+
+    @staticmethod
+    def is_variant(content_hash: str, variant: str) -> bool:
+        """Check that a hash and variant name could name a cached file"""
+        return variant in VARIANTS and len(content_hash) == 64 and all(c in "0123456789abcdef" for c in content_hash)
+
+    def variant_path(self, content_hash: str, variant: str) -> Optional[Path]:
+        """
+        Get the cached file for a variant
+
+        Returns:
+            Path of the rendered JPEG, or None for unknown hashes/variants
+            and variants that are not cached
+        """
+        if not self.is_variant(content_hash, variant):
+            return None
+        path = self.variant_dir(content_hash) / f"{variant}.jpg"
+        return path if path.exists() else None
+
+    def variant_urls(self, content_hash: str) -> Dict[str, str]:
+        return {name: f"{self.base_url}/{content_hash}/{name}.jpg" for name in VARIANTS}
+
+    def _spool_source(self, source: Union[bytes, BinaryIO], max_bytes: Optional[int] = None) -> Tuple[str, str]:
+        """Copy the source to a temp file while hashing it, without loading it whole"""
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".src")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                reader = copy_stream(source, tmp, max_bytes)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return reader.hexdigest(), tmp_path
+
+    @staticmethod
+    def _source_format(path: str) -> str:
+        with open(path, "rb") as f:
+            return sniff_extension(f.read(16))
+
+    async def generate(self, source: Union[bytes, BinaryIO], max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Produce the small/medium/large/xlarge variants for a photo
+
+        Args:
+            source: Photo bytes or a readable, seekable file object
+            max_bytes: Size limit enforced while the source is spooled
+
+        Raises:
+            UploadTooLargeError: If the source is larger than max_bytes
+
+        Returns:
+            Dictionary with success flag, content_hash, thumbnail URLs and blurhash
+        """
+        loop = asyncio.get_running_loop()
+        tmp_path = None
+        try:
+            content_hash, tmp_path = await loop.run_in_executor(None, self._spool_source, source, max_bytes)
+            output_dir = self.variant_dir(content_hash)
+
+            placeholder_path = output_dir / PLACEHOLDER_FILENAME
+            if placeholder_path.exists() and all((output_dir / f"{name}.jpg").exists() for name in VARIANTS):
+                metrics.increment("derivatives.cache_hits")
+            else:
+                metrics.increment("derivatives.cache_misses")
+                output_dir.mkdir(parents=True, exist_ok=True)
+                timings = await loop.run_in_executor(
+                    self.pool, render_derivatives, tmp_path, str(output_dir), VARIANTS
+                )
+                for name, elapsed_ms in timings.items():
+                    metrics.observe(f"derivatives.render.{name}", elapsed_ms / 1000)
+
+            return {
+                "success": True,
+                "content_hash": content_hash,
+                "thumbnails": self.variant_urls(content_hash),
+                "blurhash": placeholder_path.read_text()
+            }
+
+        except UploadTooLargeError:
+            raise
+        except Exception as e:
+            if tmp_path and await loop.run_in_executor(None, self._source_format, tmp_path) == "heic":
+                # A valid photo we cannot decode here; store it anyway and let the backend render thumbnails
+                logger.warning(f"Could not render derivatives for a HEIC photo, storing original only: {str(e)}")
+                metrics.increment("derivatives.undecodable_heic")
+                return {
+                    "success": True,
+                    "content_hash": content_hash,
+                    "thumbnails": {},
+                    "blurhash": None
+                }
+            logger.error(f"Failed to generate derivatives: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "Invalid image file. Please upload JPG, PNG, or HEIC format."
+            }
+        finally:
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+
+    async def _render_again(self, content_hash: str, source_path: Path) -> bool:
+        output_dir = self.variant_dir(content_hash)
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            timings = await asyncio.get_running_loop().run_in_executor(
+                self.pool, render_derivatives, str(source_path), str(output_dir), VARIANTS
+            )
+        except Exception as e:
+            logger.error(f"Failed to regenerate derivatives for {content_hash}: {str(e)}")
+            return False
+        metrics.increment("derivatives.regenerated")
+        for name, elapsed_ms in timings.items():
+            metrics.observe(f"derivatives.render.{name}", elapsed_ms / 1000)
+        return True
+
+    async def regenerate(self, content_hash: str, source_path: Path) -> bool:
+        """
+        Render a photo's variants again from its stored original
+
+        Concurrent requests for the same photo share one render.
+
+        Args:
+            content_hash: Hash the variants are cached under
+            source_path: Local path of the original photo
+
+        Returns:
+            True if the variants are cached again
+        """
+        return await self._regenerations.do(content_hash, lambda: self._render_again(content_hash, source_path))
+
+    def _remove_dir(self, content_hash: str) -> bool:
+        try:
+            shutil.rmtree(self.variant_dir(content_hash))
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def purge(self, content_hash: str) -> bool:
+        """
+        Delete every cached variant and placeholder of a photo
+
+        Returns:
+            True if anything was cached
+        """
+        if len(content_hash) != 64 or not all(c in "0123456789abcdef" for c in content_hash):
+            return False
+        return await asyncio.get_running_loop().run_in_executor(None, self._remove_dir, content_hash)
+
+    def shutdown(self):
+        """Stop the render worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# Global instance
+derivative_service = DerivativeService()
@@ -0,0 +1,301 @@
+import asyncio
+import functools
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+import logging
+
+from pymongo import ReturnDocument
+
+from services.email_service import email_service
+from services.metrics import metrics
+from services.retention_service import as_utc
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_STATUSES = ("pending", "sending", "sent", "failed")
+
+
+class EmailOutbox:
+    def __init__(self, collection, sender=email_service):
+        """
+        Mongo-backed queue of outgoing email, delivered by background workers
+
+        Endpoints enqueue a message and return straight away. Workers claim
+        messages with a lease (status "sending" + available_at in the future),
+        so a message held by a crashed worker becomes claimable again once
+        its lease runs out. Failed sends are retried with exponential backoff.
+
+        Args:
+            collection: Motor collection holding outbox messages
+            sender: Email service whose send_* methods deliver each kind
+        """
+        self.collection = collection
+        self.worker_count = int(os.getenv('EMAIL_OUTBOX_WORKERS', '2'))
+        self.lease_seconds = int(os.getenv('EMAIL_OUTBOX_LEASE_SECONDS', '120'))
+        self.max_attempts = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+        self.retry_base_seconds = int(os.getenv('EMAIL_OUTBOX_RETRY_BASE_SECONDS', '30'))
+        self.retry_max_seconds = int(os.getenv('EMAIL_OUTBOX_RETRY_MAX_SECONDS', '3600'))
+        self.poll_seconds = float(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', '5'))
+        self.stats_seconds = float(os.getenv('EMAIL_OUTBOX_STATS_SECONDS', '60'))
+        # Sent and failed messages are removed by a TTL index on finished_at after this long
+        self.retention_seconds = int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', '7')) * 86400
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        # strict=True makes the sender raise, so the real SMTP error lands in last_error
+        self._senders: Dict[str, Callable[[Dict[str, Any]], Awaitable[bool]]] = {
+            "order_confirmation": functools.partial(sender.send_order_confirmation, strict=True),
+            "shipping_notification": functools.partial(sender.send_shipping_notification, strict=True),
+            "admin_notification": functools.partial(sender.send_admin_notification, strict=True),
+            "welcome": functools.partial(sender.send_welcome_email, strict=True),
+            "date_reminder": functools.partial(sender.send_date_reminder, strict=True),
+        }
+        self._on_sent: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._gauges_refreshed_at = 0.0
+
+    def register(self, kind: str, send: Callable[[Dict[str, Any]], Awaitable[bool]]):
+        """
+        Add a message kind
+
+        Args:
+            kind: Message kind used with enqueue()
+            send: Coroutine taking the payload and returning True once delivered
+        """
+        self._senders[kind] = send
+
+    def on_sent(self, kind: str, callback: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Run a callback (e.g. mark the order as emailed) after a message of this kind is delivered"""
+        self._on_sent[kind] = callback
+
+    def _new_message(self, kind: str, payload: Dict[str, Any], available_at: datetime) -> Dict[str, Any]:
+        if kind not in self._senders:
+            raise ValueError(f"Unknown email kind: {kind}")
+        now = datetime.now(timezone.utc)
+        return {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "available_at": available_at,
+            "created_at": now,
+            "updated_at": now,
+            "last_error": None,
+        }
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], delay_seconds: int = 0) -> Dict[str, Any]:
+        """
+        Queue a message for delivery
+
+        Args:
+            kind: Registered message kind (e.g. "order_confirmation")
+            payload: Template variables passed to the sender
+            delay_seconds: Hold the message back this long before the first attempt
+
+        Returns:
+            The stored outbox message
+        """
+        message = self._new_message(kind, payload, datetime.now(timezone.utc) + timedelta(seconds=delay_seconds))
+        await self.collection.insert_one(message)
+        message.pop("_id", None)
+        metrics.increment("email_outbox.enqueued")
+        self._wakeup.set()
+        return message
+
+    async def enqueue_many(self, kind: str, payloads: List[Dict[str, Any]]) -> int:
+        """
+        Queue a batch of messages with a single insert
+
+        Returns:
+            Number of messages queued
+        """
+        if not payloads:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        await self.collection.insert_many([self._new_message(kind, payload, now) for payload in payloads], ordered=False)
+        metrics.increment("email_outbox.enqueued", len(payloads))
+        self._wakeup.set()
+        return len(payloads)
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next message that is due, or whose previous lease expired
+
+        Returns:
+            The claimed message, or None if nothing is due
+        """
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"status": {"$in": ["pending", "sending"]}, "available_at": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "sending",
+                    "lease_owner": self.owner,
+                    "lease_id": str(uuid.uuid4()),
+                    "available_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("available_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _retry_delay(self, attempts: int) -> int:
+        return min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+
+    async def deliver(self, message: Dict[str, Any]) -> bool:
+        """
+        Send a claimed message and record the outcome
+
+        Returns:
+            True if the message was delivered
+        """
+        error = None
+        started = time.perf_counter()
+        try:
+            delivered = await self._senders[message["kind"]](message["payload"])
+            if not delivered:
+                error = "Sender reported failure"
+        except Exception as e:
+            delivered = False
+            # Keep the exception type; some SMTP errors have an empty message
+            error = f"{type(e).__name__}: {e}"
+        metrics.observe(f"email_outbox.send.{message['kind']}", time.perf_counter() - started)
+
+        now = datetime.now(timezone.utc)
+        # Only the current lease holder may settle the message
+        lease = {"id": message["id"], "status": "sending", "lease_id": message["lease_id"]}
+
+        if delivered:
+            await self.collection.update_one(
+                lease,
+                {"$set": {"status": "sent", "sent_at": now, "finished_at": now, "updated_at": now, "last_error": None},
+                 "$unset": {"available_at": "", "lease_owner": "", "lease_id": ""}}
+            )
+            metrics.increment("email_outbox.sent")
+            metrics.observe("email_outbox.delivery_latency", (now - as_utc(message["created_at"])).total_seconds())
+            callback = self._on_sent.get(message["kind"])
+            if callback:
+                try:
+                    await callback(message)
+                except Exception as e:
+                    logger.error(f"Email outbox on_sent hook failed for {message['id']}: {str(e)}")
+            return True
+
+        if message["attempts"] >= self.max_attempts:
+            await self.collection.update_one(
+                lease,
+                {"$set": {"status": "failed", "failed_at": now, "finished_at": now, "updated_at": now, "last_error": error},
+                 "$unset": {"available_at": "", "lease_owner": "", "lease_id": ""}}
+            )
+            metrics.increment("email_outbox.failed")
+            logger.error(f"Email {message['id']} ({message['kind']}) failed permanently: {error}")
+        else:
+            retry_at = now + timedelta(seconds=self._retry_delay(message["attempts"]))
+            await self.collection.update_one(
+                lease,
+                {"$set": {"status": "pending", "available_at": retry_at, "updated_at": now, "last_error": error},
+                 "$unset": {"lease_owner": "", "lease_id": ""}}
+            )
+            metrics.increment("email_outbox.retried")
+            logger.warning(f"Email {message['id']} ({message['kind']}) attempt {message['attempts']} failed, retrying at {retry_at.isoformat()}: {error}")
+        return False
+
+    async def ensure_indexes(self):
+        """Create the claim index and the TTL index that expires finished messages"""
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("status", 1), ("available_at", 1)])
+        await self.collection.create_index("finished_at", expireAfterSeconds=self.retention_seconds)
+        # Messages finished before finished_at existed would never expire otherwise
+        await self.collection.update_many(
+            {"status": {"$in": ["sent", "failed"]}, "finished_at": {"$exists": False}},
+            [{"$set": {"finished_at": "$updated_at"}}]
+        )
+
+    async def get_message(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Get one outbox message (delivery status, attempts, last error)"""
+        return await self.collection.find_one({"id": message_id}, {"_id": 0, "payload": 0})
+
+    async def _oldest_pending_seconds(self) -> float:
+        oldest = await self.collection.find_one(
+            {"status": "pending", "available_at": {"$lte": datetime.now(timezone.utc)}},
+            {"_id": 0, "available_at": 1},
+            sort=[("available_at", 1)]
+        )
+        if not oldest:
+            return 0.0
+        return round((datetime.now(timezone.utc) - as_utc(oldest["available_at"])).total_seconds(), 1)
+
+    async def refresh_gauges(self):
+        """
+        Update the depth gauges from the (status, available_at) index
+
+        Only counts unfinished messages, so the cost does not grow with the
+        number of sent and failed rows kept for inspection.
+        """
+        depth = await self.collection.count_documents({"status": {"$in": ["pending", "sending"]}})
+        metrics.set_gauge("email_outbox.depth", depth)
+        metrics.set_gauge("email_outbox.oldest_pending_seconds", await self._oldest_pending_seconds())
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Get the message count per status and the age of the oldest due message (on demand)
+
+        Returns:
+            Dictionary with counts per status and oldest_pending_seconds
+        """
+        counts = {status: 0 for status in OUTBOX_STATUSES}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+
+        oldest_pending_seconds = await self._oldest_pending_seconds()
+        metrics.set_gauge("email_outbox.depth", counts["pending"] + counts["sending"])
+        metrics.set_gauge("email_outbox.oldest_pending_seconds", oldest_pending_seconds)
+        return {"counts": counts, "oldest_pending_seconds": oldest_pending_seconds}
+
+    async def _worker(self, index: int):
+        while True:
+            # Cleared before claiming so an enqueue during delivery is not missed
+            self._wakeup.clear()
+            try:
+                message = await self.claim()
+                if message:
+                    await self.deliver(message)
+                    continue
+                # Only one worker refreshes the depth gauges, at most every stats_seconds
+                if index == 0 and time.monotonic() - self._gauges_refreshed_at >= self.stats_seconds:
+                    self._gauges_refreshed_at = time.monotonic()
+                    await self.refresh_gauges()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.increment("email_outbox.errors")
+                logger.error(f"Email outbox worker error: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the background delivery workers"""
+        if self.worker_count > 0 and not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+
+    async def stop(self):
+        """Stop the delivery workers; in-flight leases expire and are retried elsewhere"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
@@ -1,7 +1,7 @@
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Environment, BaseLoader
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache, Template
+from jinja2.sandbox import SandboxedEnvironment
 from datetime import datetime
 import os
 import logging
@@ -9,28 +9,355 @@ from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 from pathlib import Path
 
+from services.smtp_pool import SMTPConnectionPool
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
 
 logger = logging.getLogger(__name__)
 
+# Compiled once into the service's template registry
+EMAIL_TEMPLATES: Dict[str, str] = {
+    "order_confirmation": """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .header { background: #e11d48; color: white; padding: 20px; text-align: center; }
+        .content { padding: 20px; }
+        .order-details { background: #f9fafb; padding: 15px; border-radius: 8px; margin: 20px 0; }
+        .footer { background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; }
+        .button { background: #e11d48; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>📸 Order Confirmed!</h1>
+        <p>Thank you for choosing Memories Photo Frames</p>
+    </div>
+
+    <div class="content">
+        <h2>Dear {{ customer_name }},</h2>
+        <p>Your order has been confirmed and we're preparing it with care! 🎉</p>
+
+        <div class="order-details">
+            <h3>Order Details</h3>
+            <p><strong>Order ID:</strong> #{{ order_id }}</p>
+            <p><strong>Order Date:</strong> {{ order_date }}</p>
+            <p><strong>Total Amount:</strong> ₹{{ total_amount }}</p>
+            <p><strong>Payment Method:</strong> {{ payment_method }}</p>
+            <p><strong>Expected Delivery:</strong> {{ delivery_date }}</p>
+        </div>
+
+        <h3>Items Ordered:</h3>
+        <ul>
+        {% for item in items %}
+            <li>{{ item.name }} - Quantity: {{ item.quantity }} - ₹{{ item.price }}</li>
+        {% endfor %}
+        </ul>
+
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="https://memoriesngifts.com/track/{{ order_id }}" class="button">Track Your Order</a>
+        </div>
+
+        <p><strong>Delivery Address:</strong><br>
+        {{ delivery_address }}</p>
+
+        <p>We'll send you updates as your order progresses. If you have any questions, feel free to reach out!</p>
+
+        <p>WhatsApp: <a href="https://wa.me/918148040148">+91 81480 40148</a><br>
+        Email: <a href="mailto:support@memoriesngifts.com">support@memoriesngifts.com</a></p>
+    </div>
+
+    <div class="footer">
+        <p>Memories - Photo Frames & Custom Gifts<br>
+        19B Kani Illam, Keeranatham Road, Coimbatore<br>
+        <a href="https://memoriesngifts.com">memoriesngifts.com</a></p>
+    </div>
+</body>
+</html>
+""",
+    "shipping_notification": """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .header { background: #059669; color: white; padding: 20px; text-align: center; }
+        .content { padding: 20px; }
+        .tracking-box { background: #f0fdf4; border: 2px solid #059669; padding: 15px; border-radius: 8px; margin: 20px 0; text-align: center; }
+        .footer { background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; }
+        .button { background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>📦 Your Order is Shipped!</h1>
+    </div>
+
+    <div class="content">
+        <h2>Dear {{ customer_name }},</h2>
+        <p>Great news! Your order #{{ order_id }} is on its way to you! 🚚</p>
+
+        <div class="tracking-box">
+            <h3>Tracking Information</h3>
+            <p><strong>Courier Partner:</strong> {{ courier_name }}</p>
+            <p><strong>Tracking Number:</strong> {{ tracking_number }}</p>
+            <p><strong>Expected Delivery:</strong> {{ expected_delivery }}</p>
+
+            <div style="margin: 20px 0;">
+                <a href="{{ tracking_url }}" class="button">Track Package</a>
+            </div>
+        </div>
+
+        <p>Your package is carefully packed and will reach you soon. You can track its progress using the tracking number above.</p>
+
+        <p>For any queries:<br>
+        WhatsApp: <a href="https://wa.me/918148040148">+91 81480 40148</a><br>
+        Email: <a href="mailto:support@memoriesngifts.com">support@memoriesngifts.com</a></p>
+    </div>
+
+    <div class="footer">
+        <p>Memories - Photo Frames & Custom Gifts<br>
+        <a href="https://memoriesngifts.com">memoriesngifts.com</a></p>
+    </div>
+</body>
+</html>
+""",
+    "admin_notification": """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .header { background: #1f2937; color: white; padding: 20px; text-align: center; }
+        .content { padding: 20px; }
+        .alert-box { background: #fef3c7; border: 2px solid #f59e0b; padding: 15px; border-radius: 8px; margin: 20px 0; }
+        .info-box { background: #e0f2fe; border: 2px solid #0284c7; padding: 15px; border-radius: 8px; margin: 20px 0; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>🔔 Admin Notification</h1>
+    </div>
+
+    <div class="content">
+        <h2>{{ notification_title }}</h2>
+        <p>{{ notification_message }}</p>
+
+        {% if notification_type == 'new_order' %}
+        <div class="info-box">
+            <h3>New Order Details</h3>
+            <p><strong>Order ID:</strong> #{{ order_id }}</p>
+            <p><strong>Customer:</strong> {{ customer_name }}</p>
+            <p><strong>Amount:</strong> ₹{{ amount }}</p>
+            <p><strong>Payment:</strong> {{ payment_method }}</p>
+            <p><strong>Time:</strong> {{ order_time }}</p>
+        </div>
+        {% endif %}
+
+        {% if notification_type == 'alert' %}
+        <div class="alert-box">
+            <h3>Alert Details</h3>
+            <p><strong>Type:</strong> {{ alert_type }}</p>
+            <p><strong>Details:</strong> {{ alert_details }}</p>
+            <p><strong>Time:</strong> {{ alert_time }}</p>
+        </div>
+        {% endif %}
+
+        <p>Login to admin panel: <a href="https://memoriesngifts.com/admin">memoriesngifts.com/admin</a></p>
+    </div>
+</body>
+</html>
+""",
+    "welcome": """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .header { background: #e11d48; color: white; padding: 20px; text-align: center; }
+        .content { padding: 20px; }
+        .welcome-box { background: #fef2f2; border: 2px solid #e11d48; padding: 15px; border-radius: 8px; margin: 20px 0; }
+        .footer { background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; }
+        .button { background: #e11d48; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>🎉 Welcome to Memories!</h1>
+    </div>
+
+    <div class="content">
+        <h2>Hello {{ user_name }}!</h2>
+        <p>Welcome to Memories - Photo Frames & Custom Gifts! We're thrilled to have you join our family. 📸</p>
+
+        <div class="welcome-box">
+            <h3>What You Can Do:</h3>
+            <ul>
+                <li>Upload your photos securely to your personal gallery</li>
+                <li>Create custom photo frames with our design tools</li>
+                <li>Get AI-powered gift recommendations</li>
+                <li>Track your orders and delivery status</li>
+                <li>Manage important dates for reminders</li>
+            </ul>
+        </div>
+
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="https://memoriesngifts.com/profile" class="button">Complete Your Profile</a>
+        </div>
+
+        <p><strong>Need Help?</strong><br>
+        Our team is here to help you create beautiful memories!</p>
+
+        <p>WhatsApp: <a href="https://wa.me/918148040148">+91 81480 40148</a><br>
+        Email: <a href="mailto:support@memoriesngifts.com">support@memoriesngifts.com</a><br>
+        Hours: Mon-Sat 9:30 AM - 9:00 PM</p>
+    </div>
+
+    <div class="footer">
+        <p>Memories - Photo Frames & Custom Gifts<br>
+        19B Kani Illam, Keeranatham Road, Coimbatore<br>
+        <a href="https://memoriesngifts.com">memoriesngifts.com</a></p>
+    </div>
+</body>
+</html>
+""",
+    "date_reminder": """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .header { background: #7c3aed; color: white; padding: 20px; text-align: center; }
+        .content { padding: 20px; }
+        .reminder-box { background: #f5f3ff; border: 2px solid #7c3aed; padding: 15px; border-radius: 8px; margin: 20px 0; text-align: center; }
+        .footer { background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; }
+        .button { background: #7c3aed; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>⏰ A Special Day is Coming Up!</h1>
+    </div>
+
+    <div class="content">
+        <h2>Hello {{ user_name }}!</h2>
+        <p>Just a friendly reminder so you have time to plan something memorable. 💝</p>
+
+        <div class="reminder-box">
+            <h3>{{ date_name }}</h3>
+            <p><strong>Date:</strong> {{ event_date }}</p>
+            <p><strong>{% if days_before == 0 %}It's today!{% elif days_before == 1 %}Tomorrow{% else %}In {{ days_before }} days{% endif %}</strong></p>
+        </div>
+
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="https://memoriesngifts.com" class="button">Find the Perfect Gift</a>
+        </div>
+
+        <p>You can change your reminder settings anytime from your <a href="https://memoriesngifts.com/profile">profile</a>.</p>
+    </div>
+
+    <div class="footer">
+        <p>Memories - Photo Frames & Custom Gifts<br>
+        19B Kani Illam, Keeranatham Road, Coimbatore<br>
+        <a href="https://memoriesngifts.com">memoriesngifts.com</a></p>
+    </div>
+</body>
+</html>
+""",
+    # Appended to every marketing campaign email
+    "campaign_footer": """
+<div style="background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; color: #6b7280;">
+    <p>Memories - Photo Frames & Custom Gifts<br>
+    19B Kani Illam, Keeranatham Road, Coimbatore</p>
+    <p>You are receiving this because you agreed to marketing emails from Memories.<br>
+    <a href="{{ unsubscribe_url }}">Unsubscribe</a></p>
+</div>
+""",
+}
+
+
 class HostingerEmailService:
     def __init__(self):
         """Initialize Hostinger email service with SMTP configuration"""
-        self.smtp_server = "smtp.hostinger.com"
-        self.smtp_port = 587
+        self.smtp_server = os.getenv("SMTP_HOST", "smtp.hostinger.com")
+        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.username = "admin@memoriesngifts.com"
         # Password will be set via environment variable
         self.password = os.getenv("EMAIL_PASSWORD", "")
         self.from_email = "admin@memoriesngifts.com"
         self.from_name = "Memories Photo Frames"
         
-        # Jinja2 template environment
-        self.template_env = Environment(loader=BaseLoader())
+        # Authenticated sessions are reused across sends instead of a new
+        # connect + STARTTLS + AUTH per message
+        self.smtp_pool = SMTPConnectionPool(
+            hostname=self.smtp_server,
+            port=self.smtp_port,
+            username=self.username,
+            password=self.password,
+            start_tls=os.getenv("SMTP_START_TLS", "true").lower() == "true"
+        )
+        
+        # Jinja2 template environment; user-supplied values (names, addresses)
+        # are escaped, and compiled bytecode can be shared across restarts
+        bytecode_cache_dir = os.getenv("EMAIL_TEMPLATE_CACHE_DIR")
+        if bytecode_cache_dir:
+            Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+        self.template_env = Environment(
+            loader=DictLoader(EMAIL_TEMPLATES),
+            autoescape=True,
+            bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir) if bytecode_cache_dir else None
+        )
+        
+        # Every template is compiled once here instead of on each send
+        self.templates: Dict[str, Template] = {
+            name: self.template_env.get_template(name) for name in EMAIL_TEMPLATES
+        }
         
-    async def _send_email(self, to_email: str, subject: str, html_content: str, 
-                         text_content: Optional[str] = None) -> bool:
+        # Ad-hoc templates (campaigns) are written by admins, so they are
+        # sandboxed: no access to Python internals from template code
+        self.sandbox_env = SandboxedEnvironment(autoescape=True)
+        # Subjects are a plain-text header, not HTML
+        self.plain_sandbox_env = SandboxedEnvironment(autoescape=False)
+    
+    def render(self, template_name: str, context: Dict[str, Any]) -> str:
+        """
+        Render a registered email template
+        
+        Args:
+            template_name: Key in EMAIL_TEMPLATES
+            context: Template variables
+            
+        Returns:
+            Rendered HTML
+        """
+        return self.templates[template_name].render(**context)
+    
+    def compile_template(self, source: str, html: bool = True) -> Template:
+        """
+        Compile an ad-hoc template (e.g. a campaign body) in a sandboxed environment
+        
+        Args:
+            source: Template source
+            html: Autoescape variables (False for plain text such as subjects)
+            
+        Raises:
+            jinja2.TemplateSyntaxError: If the source is not a valid template
+        """
+        env = self.sandbox_env if html else self.plain_sandbox_env
+        return env.from_string(source)
+    
+    async def send_email(self, to_email: str, subject: str, html_content: str, 
+                        text_content: Optional[str] = None, strict: bool = False,
+                        headers: Optional[Dict[str, str]] = None) -> bool:
         """
         Send email using Hostinger SMTP
         
@@ -39,6 +366,9 @@ class HostingerEmailService:
             subject: Email subject
             html_content: HTML email content
             text_content: Optional plain text content
+            strict: Re-raise the SMTP error instead of returning False, so
+                queues can record and classify it
+            headers: Extra message headers (e.g. List-Unsubscribe)
             
         Returns:
             True if sent successfully, False otherwise
@@ -49,6 +379,8 @@ class HostingerEmailService:
             message["Subject"] = subject
             message["From"] = f"{self.from_name} <{self.from_email}>"
             message["To"] = to_email
+            for name, value in (headers or {}).items():
+                message[name] = value
             
             # Add text content if provided
             if text_content:
@@ -59,341 +391,170 @@ class HostingerEmailService:
             html_part = MIMEText(html_content, "html")
             message.attach(html_part)
             
-            # Send email
-            await aiosmtplib.send(
-                message,
-                hostname=self.smtp_server,
-                port=self.smtp_port,
-                start_tls=True,
-                username=self.username,
-                password=self.password,
-            )
+            # Send email over a pooled connection
+            await self.smtp_pool.send(message)
             
             logger.info(f"Email sent successfully to {to_email}: {subject}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
+            if strict:
+                raise
             return False
     
-    async def send_order_confirmation(self, order_data: Dict[str, Any]) -> bool:
+    async def send_order_confirmation(self, order_data: Dict[str, Any], strict: bool = False) -> bool:
         """
         Send order confirmation email to customer
         
         Args:
             order_data: Dictionary containing order information
+            strict: Re-raise the error instead of returning False
             
         Returns:
             True if sent successfully
         """
-        template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #e11d48; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; }
-                .order-details { background: #f9fafb; padding: 15px; border-radius: 8px; margin: 20px 0; }
-                .footer { background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; }
-                .button { background: #e11d48; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>📸 Order Confirmed!</h1>
-                <p>Thank you for choosing Memories Photo Frames</p>
-            </div>
-            
-            <div class="content">
-                <h2>Dear {{ customer_name }},</h2>
-                <p>Your order has been confirmed and we're preparing it with care! 🎉</p>
-                
-                <div class="order-details">
-                    <h3>Order Details</h3>
-                    <p><strong>Order ID:</strong> #{{ order_id }}</p>
-                    <p><strong>Order Date:</strong> {{ order_date }}</p>
-                    <p><strong>Total Amount:</strong> ₹{{ total_amount }}</p>
-                    <p><strong>Payment Method:</strong> {{ payment_method }}</p>
-                    <p><strong>Expected Delivery:</strong> {{ delivery_date }}</p>
-                </div>
-                
-                <h3>Items Ordered:</h3>
-                <ul>
-                {% for item in items %}
-                    <li>{{ item.name }} - Quantity: {{ item.quantity }} - ₹{{ item.price }}</li>
-                {% endfor %}
-                </ul>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="https://memoriesngifts.com/track/{{ order_id }}" class="button">Track Your Order</a>
-                </div>
-                
-                <p><strong>Delivery Address:</strong><br>
-                {{ delivery_address }}</p>
-                
-                <p>We'll send you updates as your order progresses. If you have any questions, feel free to reach out!</p>
-                
-                <p>WhatsApp: <a href="https://wa.me/918148040148">+91 81480 40148</a><br>
-                Email: <a href="mailto:support@memoriesngifts.com">support@memoriesngifts.com</a></p>
-            </div>
-            
-            <div class="footer">
-                <p>Memories - Photo Frames & Custom Gifts<br>
-                19B Kani Illam, Keeranatham Road, Coimbatore<br>
-                <a href="https://memoriesngifts.com">memoriesngifts.com</a></p>
-            </div>
-        </body>
-        </html>
-        """
-        
         try:
-            # Render template
-            template_obj = self.template_env.from_string(template)
-            html_content = template_obj.render(**order_data)
+            html_content = self.render("order_confirmation", order_data)
             
             subject = f"Order Confirmed - #{order_data['order_id']} 📸"
             
-            return await self._send_email(
+            return await self.send_email(
                 order_data['customer_email'],
                 subject,
-                html_content
+                html_content,
+                strict=strict
             )
             
         except Exception as e:
             logger.error(f"Failed to send order confirmation: {str(e)}")
+            if strict:
+                raise
             return False
     
-    async def send_shipping_notification(self, shipping_data: Dict[str, Any]) -> bool:
+    async def send_shipping_notification(self, shipping_data: Dict[str, Any], strict: bool = False) -> bool:
         """
         Send shipping notification to customer
         
         Args:
             shipping_data: Dictionary containing shipping information
+            strict: Re-raise the error instead of returning False
             
         Returns:
             True if sent successfully
         """
-        template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #059669; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; }
-                .tracking-box { background: #f0fdf4; border: 2px solid #059669; padding: 15px; border-radius: 8px; margin: 20px 0; text-align: center; }
-                .footer { background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; }
-                .button { background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>📦 Your Order is Shipped!</h1>
-            </div>
-            
-            <div class="content">
-                <h2>Dear {{ customer_name }},</h2>
-                <p>Great news! Your order #{{ order_id }} is on its way to you! 🚚</p>
-                
-                <div class="tracking-box">
-                    <h3>Tracking Information</h3>
-                    <p><strong>Courier Partner:</strong> {{ courier_name }}</p>
-                    <p><strong>Tracking Number:</strong> {{ tracking_number }}</p>
-                    <p><strong>Expected Delivery:</strong> {{ expected_delivery }}</p>
-                    
-                    <div style="margin: 20px 0;">
-                        <a href="{{ tracking_url }}" class="button">Track Package</a>
-                    </div>
-                </div>
-                
-                <p>Your package is carefully packed and will reach you soon. You can track its progress using the tracking number above.</p>
-                
-                <p>For any queries:<br>
-                WhatsApp: <a href="https://wa.me/918148040148">+91 81480 40148</a><br>
-                Email: <a href="mailto:support@memoriesngifts.com">support@memoriesngifts.com</a></p>
-            </div>
-            
-            <div class="footer">
-                <p>Memories - Photo Frames & Custom Gifts<br>
-                <a href="https://memoriesngifts.com">memoriesngifts.com</a></p>
-            </div>
-        </body>
-        </html>
-        """
-        
         try:
-            template_obj = self.template_env.from_string(template)
-            html_content = template_obj.render(**shipping_data)
+            html_content = self.render("shipping_notification", shipping_data)
             
             subject = f"📦 Order #{shipping_data['order_id']} Shipped - Track Your Package"
             
-            return await self._send_email(
+            return await self.send_email(
                 shipping_data['customer_email'],
                 subject,
-                html_content
+                html_content,
+                strict=strict
             )
             
         except Exception as e:
             logger.error(f"Failed to send shipping notification: {str(e)}")
+            if strict:
+                raise
             return False
     
-    async def send_admin_notification(self, notification_data: Dict[str, Any]) -> bool:
+    async def send_admin_notification(self, notification_data: Dict[str, Any], strict: bool = False) -> bool:
         """
         Send notification to admin about new orders, issues, etc.
         
         Args:
             notification_data: Dictionary containing notification information
+            strict: Re-raise the error instead of returning False
             
         Returns:
             True if sent successfully
         """
-        template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #1f2937; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; }
-                .alert-box { background: #fef3c7; border: 2px solid #f59e0b; padding: 15px; border-radius: 8px; margin: 20px 0; }
-                .info-box { background: #e0f2fe; border: 2px solid #0284c7; padding: 15px; border-radius: 8px; margin: 20px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🔔 Admin Notification</h1>
-            </div>
-            
-            <div class="content">
-                <h2>{{ notification_title }}</h2>
-                <p>{{ notification_message }}</p>
-                
-                {% if notification_type == 'new_order' %}
-                <div class="info-box">
-                    <h3>New Order Details</h3>
-                    <p><strong>Order ID:</strong> #{{ order_id }}</p>
-                    <p><strong>Customer:</strong> {{ customer_name }}</p>
-                    <p><strong>Amount:</strong> ₹{{ amount }}</p>
-                    <p><strong>Payment:</strong> {{ payment_method }}</p>
-                    <p><strong>Time:</strong> {{ order_time }}</p>
-                </div>
-                {% endif %}
-                
-                {% if notification_type == 'alert' %}
-                <div class="alert-box">
-                    <h3>Alert Details</h3>
-                    <p><strong>Type:</strong> {{ alert_type }}</p>
-                    <p><strong>Details:</strong> {{ alert_details }}</p>
-                    <p><strong>Time:</strong> {{ alert_time }}</p>
-                </div>
-                {% endif %}
-                
-                <p>Login to admin panel: <a href="https://memoriesngifts.com/admin">memoriesngifts.com/admin</a></p>
-            </div>
-        </body>
-        </html>
-        """
-        
         try:
-            template_obj = self.template_env.from_string(template)
-            html_content = template_obj.render(**notification_data)
+            html_content = self.render("admin_notification", notification_data)
             
             subject = f"[Admin] {notification_data.get('notification_title', 'System Notification')}"
             
-            return await self._send_email(
+            return await self.send_email(
                 self.from_email,  # Send to admin email
                 subject,
-                html_content
+                html_content,
+                strict=strict
             )
             
         except Exception as e:
             logger.error(f"Failed to send admin notification: {str(e)}")
+            if strict:
+                raise
             return False
     
-    async def send_welcome_email(self, user_data: Dict[str, Any]) -> bool:
+    async def send_welcome_email(self, user_data: Dict[str, Any], strict: bool = False) -> bool:
         """
         Send welcome email to new users
         
         Args:
             user_data: Dictionary containing user information
+            strict: Re-raise the error instead of returning False
             
         Returns:
             True if sent successfully
         """
-        template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #e11d48; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; }
-                .welcome-box { background: #fef2f2; border: 2px solid #e11d48; padding: 15px; border-radius: 8px; margin: 20px 0; }
-                .footer { background: #f3f4f6; padding: 20px; text-align: center; font-size: 12px; }
-                .button { background: #e11d48; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎉 Welcome to Memories!</h1>
-            </div>
+        try:
+            html_content = self.render("welcome", user_data)
             
-            <div class="content">
-                <h2>Hello {{ user_name }}!</h2>
-                <p>Welcome to Memories - Photo Frames & Custom Gifts! We're thrilled to have you join our family. 📸</p>
-                
-                <div class="welcome-box">
-                    <h3>What You Can Do:</h3>
-                    <ul>
-                        <li>Upload your photos securely to your personal gallery</li>
-                        <li>Create custom photo frames with our design tools</li>
-                        <li>Get AI-powered gift recommendations</li>
-                        <li>Track your orders and delivery status</li>
-                        <li>Manage important dates for reminders</li>
-                    </ul>
-                </div>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="https://memoriesngifts.com/profile" class="button">Complete Your Profile</a>
-                </div>
-                
-                <p><strong>Need Help?</strong><br>
-                Our team is here to help you create beautiful memories!</p>
-                
-                <p>WhatsApp: <a href="https://wa.me/918148040148">+91 81480 40148</a><br>
-                Email: <a href="mailto:support@memoriesngifts.com">support@memoriesngifts.com</a><br>
-                Hours: Mon-Sat 9:30 AM - 9:00 PM</p>
-            </div>
+            subject = "🎉 Welcome to Memories - Let's Create Beautiful Memories Together!"
             
-            <div class="footer">
-                <p>Memories - Photo Frames & Custom Gifts<br>
-                19B Kani Illam, Keeranatham Road, Coimbatore<br>
-                <a href="https://memoriesngifts.com">memoriesngifts.com</a></p>
-            </div>
-        </body>
-        </html>
+            return await self.send_email(
+                user_data['email'],
+                subject,
+                html_content,
+                strict=strict
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to send welcome email: {str(e)}")
+            if strict:
+                raise
+            return False
+    
+    async def send_date_reminder(self, reminder_data: Dict[str, Any], strict: bool = False) -> bool:
         """
+        Send an upcoming important date reminder
         
+        Args:
+            reminder_data: Dictionary with email, user_name, date_name, event_date and days_before
+            strict: Re-raise the error instead of returning False
+            
+        Returns:
+            True if sent successfully
+        """
         try:
-            template_obj = self.template_env.from_string(template)
-            html_content = template_obj.render(**user_data)
+            html_content = self.render("date_reminder", reminder_data)
             
-            subject = "🎉 Welcome to Memories - Let's Create Beautiful Memories Together!"
+            subject = f"⏰ Reminder: {reminder_data['date_name']} is coming up!"
             
-            return await self._send_email(
-                user_data['email'],
+            return await self.send_email(
+                reminder_data['email'],
                 subject,
-                html_content
+                html_content,
+                strict=strict
             )
             
         except Exception as e:
-            logger.error(f"Failed to send welcome email: {str(e)}")
+            logger.error(f"Failed to send date reminder: {str(e)}")
+            if strict:
+                raise
             return False
+    
+    def start(self):
+        """Start closing idle pooled SMTP connections in the background"""
+        self.smtp_pool.start()
+    
+    async def shutdown(self):
+        """Close pooled SMTP connections"""
+        await self.smtp_pool.close()
 
 # Global instance
-email_service = HostingerEmailService()
\ No newline at end of file
+email_service = HostingerEmailService()
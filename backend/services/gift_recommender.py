@@ -0,0 +1,347 @@
+import asyncio
+import functools
+import math
+import os
+import re
+import time
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+
+import numpy as np
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Answer values used by the gift finder quiz
+OCCASIONS = ("birthday", "anniversary", "wedding", "graduation", "corporate", "just_because")
+RECIPIENTS = ("romantic_partner", "family_parent", "family_sibling", "close_friend", "colleague", "child")
+BUDGET_BANDS: Tuple[Tuple[str, float, float], ...] = (
+    ("budget_conscious", 0, 500),
+    ("mid_range", 500, 1000),
+    ("premium", 1000, 2000),
+    ("luxury", 2000, math.inf),
+)
+
+# Free-text answers (legacy clients, admin-entered tags) mapped onto the quiz values
+OCCASION_KEYWORDS = {
+    "birthday": ("birthday", "bday"),
+    "anniversary": ("anniversary",),
+    "wedding": ("wedding", "marriage", "engagement"),
+    "graduation": ("graduation", "convocation", "exam"),
+    "corporate": ("corporate", "business", "office", "client", "diwali bonus"),
+    "just_because": ("just_because", "just because", "surprise", "thank"),
+}
+RECIPIENT_KEYWORDS = {
+    "romantic_partner": ("romantic", "partner", "wife", "husband", "girlfriend", "boyfriend", "spouse", "fiance"),
+    "family_parent": ("parent", "mother", "father", "mom", "dad", "amma", "appa",
+                      "grandma", "grandpa", "grandmother", "grandfather", "grandparent"),
+    "family_sibling": ("sibling", "brother", "sister", "cousin"),
+    "close_friend": ("friend", "bestie"),
+    "colleague": ("colleague", "coworker", "boss", "manager", "employee", "team", "client"),
+    "child": ("child", "kid", "son", "daughter", "baby", "teen"),
+}
+
+# Interest features and the words that signal them in product text or quiz answers
+INTEREST_KEYWORDS = {
+    "photography": ("photo", "photograph", "camera", "picture", "memories", "frame"),
+    "romance": ("romantic", "romance", "love", "heart", "couple"),
+    "family": ("family", "parent", "home", "kids"),
+    "professional": ("corporate", "business", "office", "professional", "branding", "work"),
+    "art": ("art", "artistic", "creative", "design", "colorful", "colourful", "painting"),
+    "fashion": ("fashion", "t-shirt", "tshirt", "apparel", "clothing", "style"),
+    "coffee": ("coffee", "tea", "mug", "drink"),
+    "modern": ("modern", "acrylic", "led", "contemporary", "trendy", "crystal"),
+    "classic": ("classic", "traditional", "wood", "wooden", "teak", "handcrafted", "elegant", "timeless"),
+    "minimal": ("minimal", "clean", "simple"),
+    "luxury": ("luxury", "premium", "exclusive"),
+}
+INTERESTS = tuple(INTEREST_KEYWORDS)
+
+RECIPIENT_LABELS = {
+    "romantic_partner": "your partner",
+    "family_parent": "a parent",
+    "family_sibling": "a sibling",
+    "close_friend": "a close friend",
+    "colleague": "a colleague",
+    "child": "a child",
+}
+
+# How well each shop category suits an occasion / recipient when a product has no explicit tags
+CATEGORY_PROFILES: Dict[str, Dict[str, Dict[str, float]]] = {
+    "frames": {
+        "occasions": {"anniversary": 1.0, "wedding": 1.0, "birthday": 0.8, "graduation": 0.8, "just_because": 0.6},
+        "recipients": {"family_parent": 1.0, "romantic_partner": 0.9, "family_sibling": 0.7, "close_friend": 0.7, "child": 0.4},
+    },
+    "acrylic": {
+        "occasions": {"wedding": 1.0, "anniversary": 0.9, "graduation": 0.8, "birthday": 0.7, "corporate": 0.5},
+        "recipients": {"romantic_partner": 1.0, "family_parent": 0.7, "close_friend": 0.7, "colleague": 0.5},
+    },
+    "mugs": {
+        "occasions": {"birthday": 1.0, "just_because": 1.0, "corporate": 0.6, "graduation": 0.5},
+        "recipients": {"close_friend": 1.0, "family_sibling": 0.9, "colleague": 0.8, "family_parent": 0.6, "child": 0.5},
+    },
+    "t-shirts": {
+        "occasions": {"birthday": 0.9, "just_because": 0.8, "graduation": 0.6},
+        "recipients": {"close_friend": 1.0, "family_sibling": 1.0, "child": 0.9, "romantic_partner": 0.5},
+    },
+    "corporate": {
+        "occasions": {"corporate": 1.0, "graduation": 0.3},
+        "recipients": {"colleague": 1.0},
+    },
+}
+
+# Relative importance of each answer when scoring
+BLOCK_WEIGHTS = {"occasion": 3.0, "recipient": 2.0, "budget": 2.5, "interests": 1.5}
+
+# Column layout of the feature vectors
+OCCASION_SLICE = slice(0, len(OCCASIONS))
+RECIPIENT_SLICE = slice(OCCASION_SLICE.stop, OCCASION_SLICE.stop + len(RECIPIENTS))
+BUDGET_SLICE = slice(RECIPIENT_SLICE.stop, RECIPIENT_SLICE.stop + len(BUDGET_BANDS))
+INTEREST_SLICE = slice(BUDGET_SLICE.stop, BUDGET_SLICE.stop + len(INTERESTS))
+FEATURE_COUNT = INTEREST_SLICE.stop
+
+PRODUCT_FIELDS = {
+    "_id": 0, "id": 1, "name": 1, "description": 1, "category": 1, "base_price": 1, "image_url": 1,
+    "is_active": 1, "stock_quantity": 1, "tags": 1, "occasions": 1, "recipients": 1,
+}
+
+def _fold(value: Any) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+@functools.lru_cache(maxsize=None)
+def _word_pattern(keyword: str) -> re.Pattern:
+    return re.compile(rf"(?<![a-z0-9]){re.escape(keyword)}(?:s|es)?(?![a-z0-9])")
+
+
+def _has_word(text: str, keyword: str) -> bool:
+    """Whole-word (or plural) match, so that son does not match inside person or exam inside example"""
+    return _word_pattern(keyword).search(text) is not None
+
+
+def _match(value: Any, keywords: Dict[str, Tuple[str, ...]]) -> Optional[str]:
+    """Map a free-text answer onto a known value (exact value first, then keywords)"""
+    text = _fold(value)
+    if text in keywords:
+        return text
+    for name, words in keywords.items():
+        if any(_has_word(text, word) for word in words):
+            return name
+    return None
+
+
+def budget_band(value: Any) -> int:
+    """
+    Index into BUDGET_BANDS for a quiz budget answer
+
+    Accepts the quiz values, loose words ("low", "high") or amounts such as
+    "500-1000" (the upper amount decides the band). Defaults to mid range.
+    """
+    text = _fold(value)
+    for index, (name, _, _) in enumerate(BUDGET_BANDS):
+        if name in text.replace(" ", "_"):
+            return index
+    amounts = [float(amount) for amount in re.findall(r"\d+(?:\.\d+)?", text.replace(",", ""))]
+    if amounts:
+        return price_band(max(amounts) - 0.01)
+    if _has_word(text, "low") or _has_word(text, "cheap"):
+        return 0
+    if _has_word(text, "high"):
+        return 2
+    return 1
+
+
+def price_band(price: float) -> int:
+    for index, (_, low, high) in enumerate(BUDGET_BANDS):
+        if low <= price < high:
+            return index
+    return 0
+
+
+def _interest_features(text: str) -> np.ndarray:
+    features = np.zeros(len(INTERESTS), dtype=np.float32)
+    for index, interest in enumerate(INTERESTS):
+        if _has_word(text, interest) or any(_has_word(text, keyword) for keyword in INTEREST_KEYWORDS[interest]):
+            features[index] = 1.0
+    return features
+
+
+def encode_product(product: Dict[str, Any]) -> np.ndarray:
+    """
+    Feature vector for a product, every entry in [0, 1]
+
+    Occasion and recipient affinity come from explicit "occasions" /
+    "recipients" lists on the product when present, otherwise from its
+    category's profile. The price band is one-hot with some weight on the
+    neighbouring bands; interests are keywords found in the product's text.
+    """
+    vector = np.zeros(FEATURE_COUNT, dtype=np.float32)
+    profile = CATEGORY_PROFILES.get(_fold(product.get("category")), {})
+
+    occasions = {_match(value, OCCASION_KEYWORDS): 1.0 for value in product.get("occasions") or []}
+    occasions = occasions or profile.get("occasions", {})
+    for index, occasion in enumerate(OCCASIONS):
+        vector[OCCASION_SLICE.start + index] = occasions.get(occasion, 0.0)
+
+    recipients = {_match(value, RECIPIENT_KEYWORDS): 1.0 for value in product.get("recipients") or []}
+    recipients = recipients or profile.get("recipients", {})
+    for index, recipient in enumerate(RECIPIENTS):
+        vector[RECIPIENT_SLICE.start + index] = recipients.get(recipient, 0.0)
+
+    # An unpriced product gets no budget score rather than looking like the cheapest band
+    if product.get("base_price") is not None:
+        band = price_band(float(product["base_price"]))
+        vector[BUDGET_SLICE.start + band] = 1.0
+        for neighbour in (band - 1, band + 1):
+            if 0 <= neighbour < len(BUDGET_BANDS):
+                vector[BUDGET_SLICE.start + neighbour] = 0.4
+
+    text = _fold(" ".join([
+        str(product.get("name") or ""), str(product.get("description") or ""),
+        str(product.get("category") or ""), *map(str, product.get("tags") or [])
+    ]))
+    vector[INTEREST_SLICE] = _interest_features(text)
+    return vector
+
+
+def encode_quiz(quiz: Dict[str, Any]) -> np.ndarray:
+    """
+    Weighted feature vector for quiz answers
+
+    Each answered block sums to its BLOCK_WEIGHTS entry, so a product's
+    score is at most the sum of the vector.
+    """
+    vector = np.zeros(FEATURE_COUNT, dtype=np.float32)
+
+    occasion = _match(quiz.get("occasion"), OCCASION_KEYWORDS)
+    if occasion:
+        vector[OCCASION_SLICE.start + OCCASIONS.index(occasion)] = BLOCK_WEIGHTS["occasion"]
+    recipient = _match(quiz.get("recipient"), RECIPIENT_KEYWORDS) or _match(quiz.get("relationship"), RECIPIENT_KEYWORDS)
+    if recipient:
+        vector[RECIPIENT_SLICE.start + RECIPIENTS.index(recipient)] = BLOCK_WEIGHTS["recipient"]
+    vector[BUDGET_SLICE.start + budget_band(quiz.get("budget"))] = BLOCK_WEIGHTS["budget"]
+
+    answers = [*(quiz.get("interests") or []), quiz.get("style_preference") or ""]
+    interests = _interest_features(_fold(" ".join(map(str, answers))).replace("_", " "))
+    if interests.any():
+        vector[INTEREST_SLICE] = interests / interests.sum() * BLOCK_WEIGHTS["interests"]
+    return vector
+
+
+class GiftRecommender:
+    def __init__(self, products_collection):
+        """
+        Rank the real product catalog against gift quiz answers
+
+        Active, in-stock products are encoded once into a feature matrix,
+        reloaded every GIFT_RECOMMENDER_REFRESH_SECONDS or after invalidate().
+        A quiz is encoded into a weighted vector and the whole catalog is
+        scored with one matrix-vector product, so ranking is deterministic
+        and needs no LLM call.
+
+        Args:
+            products_collection: Motor collection holding products
+        """
+        self.products = products_collection
+        self.refresh_seconds = float(os.getenv('GIFT_RECOMMENDER_REFRESH_SECONDS', '300'))
+        self._catalog: List[Dict[str, Any]] = []
+        self._matrix = np.zeros((0, FEATURE_COUNT), dtype=np.float32)
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def build(self, products: List[Dict[str, Any]]):
+        """Encode a list of products as the catalog to rank"""
+        catalog = [
+            product for product in products
+            if product.get("id") and product.get("is_active", True) is not False
+            and (product.get("stock_quantity") is None or product["stock_quantity"] > 0)
+        ]
+        matrix = np.zeros((len(catalog), FEATURE_COUNT), dtype=np.float32)
+        for row, product in enumerate(catalog):
+            matrix[row] = encode_product(product)
+        self._catalog, self._matrix = catalog, matrix
+        self._loaded_at = time.monotonic()
+        metrics.set_gauge("gift_recommender.catalog_size", len(catalog))
+
+    async def load(self):
+        """Reload the catalog from Mongo"""
+        with metrics.timer("gift_recommender.load"):
+            products = await self.products.find({}, PRODUCT_FIELDS).to_list(None)
+            self.build(products)
+        logger.info(f"Gift recommender loaded {len(self._catalog)} products")
+
+    def invalidate(self):
+        """Reload the catalog on the next request (after a product is added, edited or removed)"""
+        self._loaded_at = None
+
+    async def _ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                await self.load()
+
+    def _reasons(self, product_vector: np.ndarray, quiz_vector: np.ndarray, product: Dict[str, Any]) -> List[str]:
+        reasons = []
+        if (product_vector[OCCASION_SLICE] @ quiz_vector[OCCASION_SLICE]) >= 0.5 * BLOCK_WEIGHTS["occasion"]:
+            occasion = OCCASIONS[int(np.argmax(quiz_vector[OCCASION_SLICE]))]
+            reasons.append(f"Suited to {occasion.replace('_', ' ')} gifting")
+        if (product_vector[RECIPIENT_SLICE] @ quiz_vector[RECIPIENT_SLICE]) >= 0.5 * BLOCK_WEIGHTS["recipient"]:
+            recipient = RECIPIENTS[int(np.argmax(quiz_vector[RECIPIENT_SLICE]))]
+            reasons.append(f"A good fit for {RECIPIENT_LABELS[recipient]}")
+        price = product.get("base_price")
+        if price is not None and (product_vector[BUDGET_SLICE] @ quiz_vector[BUDGET_SLICE]) >= BLOCK_WEIGHTS["budget"]:
+            reasons.append(f"₹{float(price):.0f} is within your budget")
+        matched = [INTERESTS[i] for i in np.flatnonzero(product_vector[INTEREST_SLICE] * quiz_vector[INTEREST_SLICE])]
+        if matched:
+            reasons.append(f"Matches interests: {', '.join(matched)}")
+        return reasons
+
+    def rank(self, quiz: Dict[str, Any], top_k: int = 4) -> List[Dict[str, Any]]:
+        """
+        Score the loaded catalog against quiz answers (CPU only)
+
+        Args:
+            quiz: Quiz answers (occasion, recipient, relationship, budget, interests, style_preference)
+            top_k: Number of products to return
+
+        Returns:
+            Best products first, each with product_id, score, confidence (0-100) and reasons
+        """
+        if not self._catalog or top_k <= 0:
+            return []
+
+        quiz_vector = encode_quiz(quiz)
+        scores = self._matrix @ quiz_vector
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        # Ties (e.g. same category and price band) fall back to catalog order for stable results
+        top = top[np.lexsort((top, -scores[top]))]
+        max_score = float(quiz_vector.sum()) or 1.0
+
+        recommendations = []
+        for row in top:
+            product = self._catalog[row]
+            recommendations.append({
+                "product_id": product["id"],
+                "name": product.get("name"),
+                "category": product.get("category"),
+                "base_price": product.get("base_price"),
+                "image_url": product.get("image_url"),
+                "score": round(float(scores[row]), 3),
+                "confidence": int(round(100 * float(scores[row]) / max_score)),
+                "reasons": self._reasons(self._matrix[row], quiz_vector, product),
+            })
+        return recommendations
+
+    async def recommend(self, quiz: Dict[str, Any], top_k: int = 4) -> List[Dict[str, Any]]:
+        """
+        Top products for quiz answers, loading or refreshing the catalog when due
+
+        Returns:
+            Same as rank()
+        """
+        await self._ensure_loaded()
+        with metrics.timer("gift_recommender.rank"):
+            return self.rank(quiz, top_k)
@@ -0,0 +1,660 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+import logging
+
+import litellm
+from cachetools import TTLCache
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.llm_telemetry import llm_telemetry
+from services.metrics import metrics
+from services.retention_service import as_utc
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER = "openai"
+LLM_MODEL = "gpt-4o-mini"
+
+SHOP_INFO = {
+    "name": "Memories - Photo Frames & Customized Gift Shop",
+    "phone": "+91 81480 40148",
+    "address": "19B Kani Illam, Keeranatham Road, Coimbatore",
+    "specialties": ["Photo Frames", "Sublimation Printing", "Corporate Gifts"]
+}
+
+SYSTEM_MESSAGE = """You are a gifting expert for "Memories - Photo Frames & Customized Gift Shop" located in Coimbatore.
+        We specialize in:
+        - Premium Photo Frames (wooden, acrylic, LED)
+        - Sublimation Printing (mugs, t-shirts)
+        - Corporate Gifts & Bulk Orders
+        - Personalized Memory Products
+
+        Based on the user's preferences, suggest 3-4 specific gift recommendations with:
+        1. Product name with personalization ideas
+        2. Why it's perfect for this recipient/occasion (detailed reasoning)
+        3. Estimated price range
+        4. Customization suggestions
+        5. Confidence score (1-100) for each recommendation
+
+        Keep suggestions warm, personal, and focused on creating lasting memories. Always mention we're located in Keeranatham Road, Coimbatore and offer free home delivery."""
+
+QUIZ_FIELDS = ("recipient", "occasion", "age_group", "budget", "relationship")
+
+
+def _fold(value: Any) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def normalize_answers(quiz: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Canonical form of quiz answers: trimmed, case folded, interests de-duplicated and sorted
+
+    Answers that differ only in case, spacing or interest order normalize
+    to the same dict, and therefore share a cache key.
+    """
+    normalized = {field: _fold(quiz.get(field)) for field in QUIZ_FIELDS}
+    normalized["interests"] = sorted({_fold(interest) for interest in quiz.get("interests") or [] if _fold(interest)})
+    return normalized
+
+
+def answers_key(normalized: Dict[str, Any], enhanced: bool = False) -> str:
+    """Stable hash of normalized answers (the enhanced flag changes the prompt, so it is part of the key)"""
+    canonical = json.dumps({**normalized, "enhanced": bool(enhanced)}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_prompt(quiz: Dict[str, Any], enhanced: bool = False,
+                 photo_data: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """
+    Build the system message and user message text for a quiz
+
+    Returns:
+        Tuple of (system_message, user_text)
+    """
+    system_message = SYSTEM_MESSAGE
+    if enhanced and photo_data:
+        system_message += f"""
+
+            PHOTO ANALYSIS CONTEXT:
+            The user has uploaded a preview photo with dimensions {photo_data.get('dimensions', {})} and analysis: {photo_data.get('analysis', 'No analysis available')}.
+            Consider the photo's aspect ratio and style when making frame recommendations.
+            """
+
+    quiz_text = f"""
+        Gift recipient: {quiz['recipient']}
+        Occasion: {quiz['occasion']}
+        Age group: {quiz['age_group']}
+        Interests: {', '.join(quiz['interests']) if quiz['interests'] else 'Not specified'}
+        Budget: {quiz['budget']}
+        Relationship: {quiz['relationship']}
+        """
+
+    if enhanced and photo_data:
+        quiz_text += f"""
+            Photo Context: User uploaded a preview photo ({photo_data.get('dimensions', {}).get('width', 'unknown')}x{photo_data.get('dimensions', {}).get('height', 'unknown')}px)
+            Photo Analysis: {photo_data.get('analysis', 'No analysis available')}
+            """
+
+    if enhanced:
+        quiz_text += "\nPlease provide enhanced recommendations with confidence scores and detailed reasoning for each suggestion."
+
+    return system_message, f"Based on this information, suggest personalized gifts from Memories shop: {quiz_text}"
+
+
+def _price_text(item: Dict[str, Any]) -> Optional[str]:
+    """Price text such as "from ₹499", or None when the product has no price"""
+    return f"from ₹{float(item['base_price']):.0f}" if item.get("base_price") is not None else None
+
+
+def build_explanation_prompt(quiz: Dict[str, Any], recommendations: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    Build the prompt asking the LLM to explain already-chosen products
+
+    Returns:
+        Tuple of (system_message, user_text)
+    """
+    system_message = """You are a gifting expert for "Memories - Photo Frames & Customized Gift Shop" in Coimbatore.
+        The products below were picked from our catalog for the customer. Explain in a warm, personal tone why
+        each one suits the recipient and occasion and suggest how to personalize it. Only talk about the listed
+        products and keep to the listed prices."""
+    products = "\n".join(
+        f"- {item['name']} ({', '.join(filter(None, [item['category'], _price_text(item)]))}): "
+        f"{'; '.join(item['reasons']) or 'good all-round gift'}"
+        for item in recommendations
+    )
+    return system_message, f"""Gift recipient: {quiz['recipient']}
+        Occasion: {quiz['occasion']}
+        Budget: {quiz['budget']}
+        Interests: {', '.join(quiz['interests']) if quiz['interests'] else 'Not specified'}
+
+        Products:
+{products}"""
+
+
+def fallback_explanation(recommendations: List[Dict[str, Any]]) -> str:
+    """Plain explanation built from the ranking reasons"""
+    lines = [
+        f"{index}. **{item['name']}**{f' ({_price_text(item)})' if _price_text(item) else ''} - "
+        f"{'; '.join(item['reasons']) or 'A lovely all-round gift'}"
+        for index, item in enumerate(recommendations, start=1)
+    ]
+    return "🎁 **Picked for you from Memories:**\n\n" + "\n".join(lines)
+
+
+def fallback_suggestions(quiz: Dict[str, Any], enhanced: bool = False,
+                         photo_data: Optional[Dict[str, Any]] = None) -> str:
+    """Templated suggestions served when the LLM is unavailable"""
+    suggestions = f"""Based on your preferences for {quiz['recipient']} on {quiz['occasion']}:
+
+🎁 **AI-Recommended Gifts from Memories:**
+
+1. **Premium Photo Frame Set** (₹899-1599) - **Confidence: 95%**
+   - Perfect for showcasing precious memories
+   - Available in wooden, acrylic, and LED options
+   - Ideal for {quiz['occasion']} celebrations
+   - **Why AI chose this:** Frames are universally appreciated and perfect for creating lasting memories
+
+2. **Custom Photo Mug** (₹299-499) - **Confidence: 88%**
+   - Personalized with favorite photos
+   - Great for daily use and memories
+   - Sublimation printing for durability
+   - **Why AI chose this:** Practical gift that brings joy every day, perfect for {quiz['relationship']} relationship
+
+3. **Personalized T-Shirt** (₹399-599) - **Confidence: 82%**
+   - Custom design with photos or text
+   - High-quality sublimation printing
+   - Perfect casual gift
+   - **Why AI chose this:** Trendy and personal, great for expressing creativity"""
+
+    if enhanced and photo_data:
+        suggestions += f"""
+
+4. **Custom Frame for Your Photo** (₹899-1899) - **Confidence: 92%**
+   - Specifically designed for your uploaded photo ({photo_data.get('dimensions', {}).get('width', 'unknown')}x{photo_data.get('dimensions', {}).get('height', 'unknown')}px)
+   - Perfect aspect ratio match
+   - **Why AI chose this:** Your photo analysis shows {photo_data.get('analysis', 'great potential')} - ideal for framing"""
+
+    suggestions += """
+
+📍 **Visit Us:** 19B Kani Illam, Keeranatham Road, Coimbatore
+📞 **Call:** +91 81480 40148
+🚚 **Free Home Delivery Available!**
+
+*We specialize in creating lasting memories through quality craftsmanship.*"""
+    return suggestions
+
+
+class GiftSuggestionCache:
+    def __init__(self, collection=None):
+        """
+        Two-tier cache of LLM gift suggestions keyed by normalized answers
+
+        An in-process LRU with a TTL answers repeat quizzes without any I/O.
+        When a Mongo collection is given (and GIFT_SUGGESTION_CACHE_MONGO is
+        not "false"), entries are also written there so they survive restarts
+        and are shared between workers; a TTL index on expires_at removes them.
+
+        Args:
+            collection: Optional Motor collection for the persistent tier
+        """
+        self.ttl_seconds = int(os.getenv('GIFT_SUGGESTION_CACHE_TTL_SECONDS', '86400'))
+        self._memory = TTLCache(
+            maxsize=int(os.getenv('GIFT_SUGGESTION_CACHE_SIZE', '1000')),
+            ttl=self.ttl_seconds
+        )
+        use_mongo = os.getenv('GIFT_SUGGESTION_CACHE_MONGO', 'true').lower() == 'true'
+        self.collection = collection if use_mongo else None
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up cached suggestions, memory first, then Mongo
+
+        Returns:
+            The cached suggestions text, or None on a miss
+        """
+        suggestions = self._memory.get(key)
+        if suggestions is not None:
+            metrics.increment("gift_suggestions.cache.memory_hits")
+            return suggestions
+
+        if self.collection is not None:
+            try:
+                entry = await self.collection.find_one({"key": key}, {"_id": 0, "suggestions": 1, "expires_at": 1})
+            except Exception as e:
+                logger.warning(f"Gift suggestion cache lookup failed: {str(e)}")
+                entry = None
+            # The TTL monitor only runs once a minute, so check expiry here too
+            if entry and as_utc(entry["expires_at"]) > datetime.now(timezone.utc):
+                self._memory[key] = entry["suggestions"]
+                metrics.increment("gift_suggestions.cache.mongo_hits")
+                return entry["suggestions"]
+
+        metrics.increment("gift_suggestions.cache.misses")
+        return None
+
+    async def set(self, key: str, suggestions: str):
+        """Store suggestions in both tiers"""
+        self._memory[key] = suggestions
+        if self.collection is None:
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {"key": key},
+                {"$set": {"suggestions": suggestions, "created_at": now,
+                          "expires_at": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Gift suggestion cache write failed: {str(e)}")
+
+    def clear(self):
+        """Drop the in-process tier"""
+        self._memory.clear()
+
+
+class LLMNotConfiguredError(RuntimeError):
+    """Raised when no LLM API key is configured"""
+
+
+class LLMOverloadedError(Exception):
+    """Raised when no LLM call slot frees up before the request's deadline"""
+
+
+def fallback_reason(error: BaseException) -> str:
+    """Short label for why an LLM call ended up on the fallback path"""
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, LLMOverloadedError):
+        return "overloaded"
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, LLMNotConfiguredError):
+        return "not_configured"
+    return "provider_error"
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the token count of text for the configured model"""
+    try:
+        return litellm.token_counter(model=LLM_MODEL, text=text)
+    except Exception:
+        # Roughly four characters per token for English text
+        return len(text) // 4
+
+
+class ChunkFeed:
+    def __init__(self):
+        """
+        Text chunks of one streamed completion, replayed to every stream following it
+
+        A follower that joins late first gets the chunks produced so far,
+        then each new chunk as it is pushed, until the feed is closed.
+        """
+        self.parts: List[str] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def push(self, text: str):
+        self.parts.append(text)
+        self._notify()
+
+    def close(self):
+        self.closed = True
+        self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            while index < len(self.parts):
+                yield self.parts[index]
+                index += 1
+            if self.closed:
+                return
+            await self._changed.wait()
+
+
+class GiftSuggestionService:
+    def __init__(self, cache: Optional[GiftSuggestionCache] = None):
+        """
+        Gift quiz suggestions from the LLM, with caching and a templated fallback
+
+        Every LLM call has a deadline (LLM_TIMEOUT_SECONDS, including time
+        spent waiting for a slot), at most LLM_MAX_CONCURRENCY calls are in
+        flight, and a circuit breaker serves the fallback straight away while
+        the provider's recent error rate is above LLM_BREAKER_ERROR_RATE.
+        Concurrent cache misses for the same answers share a single call,
+        whether they stream or not: streams follow the shared call's chunks.
+        Each request, call and fallback is recorded in llm_telemetry.
+
+        Args:
+            cache: Suggestion cache; quizzes with photo context are never cached
+        """
+        self.cache = cache or GiftSuggestionCache()
+        self.flights = SingleFlight("gift_suggestions.flights")
+        # Chunk feeds of the streamed calls in self.flights, by cache key
+        self._feeds: Dict[str, ChunkFeed] = {}
+        # LlmChat only returns whole completions, so streaming talks to an
+        # OpenAI-compatible endpoint through litellm directly; it is off
+        # unless that endpoint is configured
+        self.stream_api_base = os.getenv('LLM_STREAM_API_BASE') or None
+        self.streaming = os.getenv(
+            'GIFT_SUGGESTION_STREAMING', 'true' if self.stream_api_base else 'false'
+        ).lower() == 'true'
+        self.timeout = float(os.getenv('LLM_TIMEOUT_SECONDS', '20'))
+        self.max_concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self.breaker = self._new_breaker("gift_suggestions.llm")
+        # The streaming endpoint fails independently of LlmChat, so it trips its own circuit
+        self.stream_breaker = self._new_breaker("gift_suggestions.llm_stream")
+
+    @staticmethod
+    def _new_breaker(name: str) -> CircuitBreaker:
+        return CircuitBreaker(
+            name,
+            error_rate_threshold=float(os.getenv('LLM_BREAKER_ERROR_RATE', '0.5')),
+            window=int(os.getenv('LLM_BREAKER_WINDOW', '20')),
+            min_calls=int(os.getenv('LLM_BREAKER_MIN_CALLS', '5')),
+            reset_seconds=float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """LLM calls currently holding a slot"""
+        return self._in_flight
+
+    def _api_key(self) -> str:
+        api_key = os.environ.get('EMERGENT_LLM_KEY', '')
+        if not api_key:
+            raise LLMNotConfiguredError("EMERGENT_LLM_KEY is not configured")
+        return api_key
+
+    @asynccontextmanager
+    async def _llm_call(self, operation: str, breaker: Optional[CircuitBreaker] = None):
+        """
+        Admit one LLM call: circuit check, then a concurrency slot within the deadline
+
+        Calls go through the LlmChat breaker unless another one is given.
+
+        Yields a dict holding the loop time by which the call must finish;
+        the caller fills in tokens_in/tokens_out. The call's latency, outcome
+        and tokens are recorded on exit.
+        """
+        breaker = breaker or self.breaker
+        if not breaker.allow():
+            raise CircuitOpenError("LLM circuit is open")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # Shed while queued: an overload signal, not a provider failure
+            breaker.release_probe()
+            metrics.increment("gift_suggestions.llm.shed")
+            raise LLMOverloadedError(f"No LLM slot free within {self.timeout:.0f}s")
+        except BaseException:
+            breaker.release_probe()
+            raise
+
+        call = {"deadline": deadline, "tokens_in": 0, "tokens_out": 0, "estimated_tokens": True}
+        outcome = "ok"
+        self._in_flight += 1
+        metrics.set_gauge("gift_suggestions.llm.in_flight", self._in_flight)
+        started = time.perf_counter()
+        try:
+            yield call
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            breaker.record_failure()
+            raise
+        except Exception:
+            outcome = "error"
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or closed by the client: no verdict on the provider
+            outcome = "cancelled"
+            breaker.release_probe()
+            raise
+        else:
+            breaker.record_success()
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("gift_suggestions.llm.in_flight", self._in_flight)
+            self._slots.release()
+            llm_telemetry.record_call(
+                operation, LLM_MODEL, time.perf_counter() - started, outcome,
+                call["tokens_in"], call["tokens_out"], call["estimated_tokens"]
+            )
+
+    async def _ask_llm(self, system_message: str, text: str, operation: str) -> str:
+        api_key = self._api_key()
+        chat = LlmChat(
+            api_key=api_key,
+            session_id=f"memories_gift_quiz_{uuid.uuid4()}",
+            system_message=system_message
+        ).with_model(LLM_PROVIDER, LLM_MODEL)
+        async with self._llm_call(operation) as call:
+            # LlmChat does not report usage, so the prompt is counted locally
+            call["tokens_in"] = count_tokens(system_message) + count_tokens(text)
+            remaining = call["deadline"] - asyncio.get_running_loop().time()
+            reply = await asyncio.wait_for(chat.send_message(UserMessage(text=text)), timeout=remaining)
+            call["tokens_out"] = count_tokens(reply or "")
+            return reply
+
+    async def _stream_llm(self, system_message: str, text: str) -> AsyncIterator[str]:
+        if not self.streaming:
+            yield await self._ask_llm(system_message, text, "stream")
+            return
+        api_key = os.getenv('LLM_STREAM_API_KEY') or self._api_key()
+        loop = asyncio.get_running_loop()
+        async with self._llm_call("stream", self.stream_breaker) as call:
+            response = await asyncio.wait_for(litellm.acompletion(
+                model=f"{LLM_PROVIDER}/{LLM_MODEL}",
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": text}
+                ],
+                api_key=api_key,
+                api_base=self.stream_api_base,
+                stream=True,
+                stream_options={"include_usage": True}
+            ), timeout=call["deadline"] - loop.time())
+            chunks = response.__aiter__()
+            parts = []
+            usage = None
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=call["deadline"] - loop.time())
+                except StopAsyncIteration:
+                    break
+                usage = getattr(chunk, "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            if usage and getattr(usage, "prompt_tokens", None) is not None:
+                call.update(tokens_in=usage.prompt_tokens, tokens_out=usage.completion_tokens or 0,
+                            estimated_tokens=False)
+            else:
+                call.update(tokens_in=count_tokens(system_message) + count_tokens(text),
+                            tokens_out=count_tokens("".join(parts)))
+
+    async def suggest(self, quiz: Dict[str, Any], enhanced: bool = False,
+                      photo_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Get suggestions for a quiz
+
+        Args:
+            quiz: Quiz answers (recipient, occasion, age_group, interests, budget, relationship)
+            enhanced: Ask for confidence scores and detailed reasoning
+            photo_data: Optional preview photo dimensions/analysis
+
+        Returns:
+            Dictionary with the suggestions text and its source ("cache", "llm" or "fallback")
+        """
+        normalized = normalize_answers(quiz)
+        # Photo context makes the prompt unique to the upload, so it is not worth caching
+        key = None if enhanced and photo_data else answers_key(normalized, enhanced)
+
+        if key:
+            cached = await self.cache.get(key)
+            llm_telemetry.record_request("suggest", cache_hit=cached is not None)
+            if cached is not None:
+                return {"suggestions": cached, "source": "cache"}
+            # Identical quizzes arriving while this one is with the LLM share its answer
+            return await self.flights.do(key, lambda: self._generate(quiz, normalized, enhanced, photo_data, key))
+        llm_telemetry.record_request("suggest")
+        return await self._generate(quiz, normalized, enhanced, photo_data, None)
+
+    async def _generate(self, quiz: Dict[str, Any], normalized: Dict[str, Any], enhanced: bool,
+                        photo_data: Optional[Dict[str, Any]], key: Optional[str]) -> Dict[str, Any]:
+        # Prompted with the normalized answers so a cached reply fits every quiz with the same key
+        system_message, text = build_prompt(normalized, enhanced, photo_data)
+        try:
+            suggestions = await self._ask_llm(system_message, text, "suggest")
+        except Exception as e:
+            llm_telemetry.record_fallback("suggest", fallback_reason(e))
+            if not isinstance(e, CircuitOpenError):
+                logger.warning(f"Gift suggestion LLM call failed, using fallback: {e!r}")
+            return {"suggestions": fallback_suggestions(quiz, enhanced, photo_data), "source": "fallback"}
+
+        if key and suggestions:
+            await self.cache.set(key, suggestions)
+        return {"suggestions": suggestions, "source": "llm"}
+
+    async def stream(self, quiz: Dict[str, Any], enhanced: bool = False,
+                     photo_data: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream suggestions for a quiz as they are generated
+
+        Yields "token" events carrying the next piece of text. If the LLM
+        fails part way, a "replace" event carries the templated fallback the
+        client should show instead of the partial text. The last event is
+        "done" with the source ("cache", "llm" or "fallback").
+
+        Identical quizzes share one LLM call: a stream arriving while another
+        stream is generating replays its chunks, and one arriving during a
+        suggest() call gets that call's reply as a single token. A shared
+        call finishes (and is cached) even if the client that started it leaves.
+
+        Args:
+            quiz: Quiz answers (recipient, occasion, age_group, interests, budget, relationship)
+            enhanced: Ask for confidence scores and detailed reasoning
+            photo_data: Optional preview photo dimensions/analysis
+        """
+        normalized = normalize_answers(quiz)
+        key = None if enhanced and photo_data else answers_key(normalized, enhanced)
+
+        if key:
+            cached = await self.cache.get(key)
+            llm_telemetry.record_request("stream", cache_hit=cached is not None)
+            if cached is not None:
+                yield {"event": "token", "text": cached}
+                yield {"event": "done", "source": "cache"}
+                return
+
+            def start():
+                self._feeds[key] = new_feed
+                return self._generate_stream(quiz, normalized, enhanced, photo_data, key, new_feed)
+
+            new_feed = ChunkFeed()
+            task = self.flights.task(key, start)
+            # None when joining a suggest() call, which has no chunks to follow
+            feed = self._feeds.get(key)
+            owned = False
+        else:
+            llm_telemetry.record_request("stream")
+            feed = ChunkFeed()
+            task = asyncio.create_task(self._generate_stream(quiz, normalized, enhanced, photo_data, None, feed))
+            owned = True
+
+        streamed = 0
+        try:
+            if feed is not None:
+                async for delta in feed.follow():
+                    streamed += 1
+                    yield {"event": "token", "text": delta}
+            result = await asyncio.shield(task)
+        finally:
+            # Only a call nobody else shares stops with its client
+            if owned and not task.done():
+                task.cancel()
+
+        if result["source"] == "fallback" or feed is None:
+            yield {"event": "replace" if streamed else "token", "text": result["suggestions"]}
+        yield {"event": "done", "source": result["source"]}
+
+    async def _generate_stream(self, quiz: Dict[str, Any], normalized: Dict[str, Any], enhanced: bool,
+                               photo_data: Optional[Dict[str, Any]], key: Optional[str],
+                               feed: ChunkFeed) -> Dict[str, Any]:
+        system_message, text = build_prompt(normalized, enhanced, photo_data)
+        try:
+            async for delta in self._stream_llm(system_message, text):
+                feed.push(delta)
+        except Exception as e:
+            llm_telemetry.record_fallback("stream", fallback_reason(e))
+            if not isinstance(e, CircuitOpenError):
+                logger.warning(f"Gift suggestion stream failed after {len(feed.parts)} chunks, using fallback: {e!r}")
+            return {"suggestions": fallback_suggestions(quiz, enhanced, photo_data), "source": "fallback"}
+        finally:
+            feed.close()
+            if key and self._feeds.get(key) is feed:
+                del self._feeds[key]
+
+        suggestions = "".join(feed.parts)
+        if key and suggestions:
+            await self.cache.set(key, suggestions)
+        return {"suggestions": suggestions, "source": "llm"}
+
+    async def explain(self, quiz: Dict[str, Any], recommendations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Phrase an explanation for products the recommender already picked
+
+        Args:
+            quiz: Quiz answers the products were ranked for
+            recommendations: GiftRecommender results
+
+        Returns:
+            Dictionary with the explanation text and its source ("cache", "llm" or "fallback")
+        """
+        if not recommendations:
+            return {"explanation": "", "source": "fallback"}
+
+        normalized = normalize_answers(quiz)
+        products = ",".join(item["product_id"] for item in recommendations)
+        key = hashlib.sha256(f"explain:{answers_key(normalized)}:{products}".encode("utf-8")).hexdigest()
+        cached = await self.cache.get(key)
+        llm_telemetry.record_request("explain", cache_hit=cached is not None)
+        if cached is not None:
+            return {"explanation": cached, "source": "cache"}
+        return await self.flights.do(key, lambda: self._generate_explanation(normalized, recommendations, key))
+
+    async def _generate_explanation(self, normalized: Dict[str, Any], recommendations: List[Dict[str, Any]],
+                                    key: str) -> Dict[str, Any]:
+        system_message, text = build_explanation_prompt(normalized, recommendations)
+        try:
+            explanation = await self._ask_llm(system_message, text, "explain")
+        except Exception as e:
+            llm_telemetry.record_fallback("explain", fallback_reason(e))
+            if not isinstance(e, CircuitOpenError):
+                logger.warning(f"Gift recommendation explanation failed, using reasons: {e!r}")
+            return {"explanation": fallback_explanation(recommendations), "source": "fallback"}
+
+        if explanation:
+            await self.cache.set(key, explanation)
+        return {"explanation": explanation, "source": "llm"}
@@ -0,0 +1,60 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JobLease:
+    def __init__(self, collection, name: str):
+        """
+        Mongo lease that lets exactly one process run a periodic job
+
+        Every worker runs the same background loops; each pass first tries to
+        take (or renew) the lease and skips the pass if another process holds
+        it. A holder that dies stops renewing and the lease passes to another
+        worker once it runs out.
+
+        Args:
+            collection: Motor collection holding one lease document per job
+            name: Job name, used as the lease document _id
+        """
+        self.collection = collection
+        self.name = name
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self, ttl_seconds: float) -> bool:
+        """
+        Take the lease if it is free or expired, or extend it if already held
+
+        Args:
+            ttl_seconds: How long the lease stays held without another acquire
+
+        Returns:
+            True if this process holds the lease
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=ttl_seconds), "renewed_at": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lease, so the upsert collided with their document
+            metrics.increment(f"job_lease.{self.name}.skipped")
+            return False
+        return True
+
+    async def release(self):
+        """Give the lease up early (e.g. on shutdown) so another worker can take over"""
+        await self.collection.update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.now(timezone.utc)}}
+        )
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Tuple
+import logging
+
+from services.metrics import metrics, LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in seconds; completions take far longer than Mongo or Cloudinary calls
+LLM_BUCKETS: Tuple[float, ...] = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0)
+
+# USD per 1K (input, output) tokens, for the cost estimate only
+MODEL_PRICES_PER_1K: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+}
+
+
+def _new_model_stats() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "outcomes": {},
+        "tokens_in": 0,
+        "tokens_out": 0,
+        "estimated_token_calls": 0,
+        "latency": LatencyHistogram(LLM_BUCKETS),
+    }
+
+
+def _new_operation_stats() -> Dict[str, Any]:
+    return {"requests": 0, "cache_hits": 0, "cache_misses": 0, "llm_calls": 0, "fallbacks": {}}
+
+
+class LLMTelemetry:
+    def __init__(self, recent_calls: int = None):
+        """
+        In-process record of every LLM call: model, latency, tokens and outcome
+
+        Calls are aggregated per model and per operation (e.g. "suggest",
+        "stream", "explain"), together with cache hits/misses and the reason
+        for each fallback, so concurrency limits can be sized and spend
+        tracked. The last LLM_TELEMETRY_RECENT_CALLS calls are kept verbatim.
+        Headline counters are mirrored into the shared metrics registry.
+        """
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._operations: Dict[str, Dict[str, Any]] = {}
+        self._recent = deque(maxlen=recent_calls or int(os.getenv('LLM_TELEMETRY_RECENT_CALLS', '50')))
+
+    def _operation(self, operation: str) -> Dict[str, Any]:
+        stats = self._operations.get(operation)
+        if stats is None:
+            stats = self._operations[operation] = _new_operation_stats()
+        return stats
+
+    def record_request(self, operation: str, cache_hit: bool = None):
+        """
+        Count a request for an operation
+
+        Args:
+            operation: What the LLM is used for (e.g. "suggest")
+            cache_hit: True/False if a cache was consulted, None if it was bypassed
+        """
+        with self._lock:
+            stats = self._operation(operation)
+            stats["requests"] += 1
+            if cache_hit is True:
+                stats["cache_hits"] += 1
+            elif cache_hit is False:
+                stats["cache_misses"] += 1
+        if cache_hit is not None:
+            metrics.increment(f"llm.cache.{'hits' if cache_hit else 'misses'}")
+
+    def record_call(self, operation: str, model: str, seconds: float, outcome: str,
+                    tokens_in: int = 0, tokens_out: int = 0, estimated_tokens: bool = False):
+        """
+        Record one call that reached the provider
+
+        Args:
+            operation: What the LLM was used for
+            model: Model name
+            seconds: Wall time of the call
+            outcome: "ok", "timeout", "error" or "cancelled"
+            tokens_in: Prompt tokens
+            tokens_out: Completion tokens
+            estimated_tokens: Token counts were estimated locally rather than reported by the provider
+        """
+        with self._lock:
+            stats = self._models.get(model)
+            if stats is None:
+                stats = self._models[model] = _new_model_stats()
+            stats["calls"] += 1
+            stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + 1
+            stats["tokens_in"] += tokens_in
+            stats["tokens_out"] += tokens_out
+            if estimated_tokens:
+                stats["estimated_token_calls"] += 1
+            stats["latency"].observe(seconds)
+            self._operation(operation)["llm_calls"] += 1
+            self._recent.append({
+                "at": time.time(),
+                "operation": operation,
+                "model": model,
+                "latency_ms": round(seconds * 1000, 1),
+                "outcome": outcome,
+                "tokens_in": tokens_in,
+                "tokens_out": tokens_out,
+                "estimated_tokens": estimated_tokens,
+            })
+
+        metrics.observe(f"llm.{operation}", seconds)
+        metrics.increment("llm.calls")
+        if outcome != "ok":
+            metrics.increment(f"llm.{outcome}")
+        metrics.increment("llm.tokens_in", tokens_in)
+        metrics.increment("llm.tokens_out", tokens_out)
+        logger.info(
+            f"LLM call operation={operation} model={model} outcome={outcome} "
+            f"latency_ms={seconds * 1000:.0f} tokens_in={tokens_in} tokens_out={tokens_out}"
+        )
+
+    def record_fallback(self, operation: str, reason: str):
+        """Count a response served from the fallback path, by reason (e.g. "timeout", "circuit_open")"""
+        with self._lock:
+            fallbacks = self._operation(operation)["fallbacks"]
+            fallbacks[reason] = fallbacks.get(reason, 0) + 1
+        metrics.increment(f"llm.fallbacks.{reason}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a JSON-serialisable summary of all LLM usage so far
+
+        Returns:
+            Dictionary with per-model and per-operation stats and the most recent calls
+        """
+        with self._lock:
+            models = {}
+            for model, stats in self._models.items():
+                price_in, price_out = MODEL_PRICES_PER_1K.get(model, (0.0, 0.0))
+                failed = stats["calls"] - stats["outcomes"].get("ok", 0)
+                models[model] = {
+                    "calls": stats["calls"],
+                    "outcomes": dict(stats["outcomes"]),
+                    "error_rate": round(failed / stats["calls"], 3) if stats["calls"] else 0.0,
+                    "tokens_in": stats["tokens_in"],
+                    "tokens_out": stats["tokens_out"],
+                    "estimated_token_calls": stats["estimated_token_calls"],
+                    "estimated_cost_usd": round(
+                        stats["tokens_in"] / 1000 * price_in + stats["tokens_out"] / 1000 * price_out, 6
+                    ),
+                    "latency": stats["latency"].to_dict(),
+                }
+
+            operations = {}
+            for operation, stats in self._operations.items():
+                lookups = stats["cache_hits"] + stats["cache_misses"]
+                operations[operation] = {
+                    **stats,
+                    "fallbacks": dict(stats["fallbacks"]),
+                    "cache_hit_rate": round(stats["cache_hits"] / lookups, 3) if lookups else 0.0,
+                }
+
+            return {"models": models, "operations": operations, "recent_calls": list(self._recent)}
+
+    def reset(self):
+        """Drop all recorded telemetry"""
+        with self._lock:
+            self._models.clear()
+            self._operations.clear()
+            self._recent.clear()
+
+# Global instance
+llm_telemetry = LLMTelemetry()
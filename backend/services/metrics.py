@@ -0,0 +1,131 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Cumulative latency histogram with fixed bucket boundaries"""
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Approximate percentile using the bucket upper bound"""
+        if not self.count:
+            return 0.0
+        target = self.count * fraction
+        seen = 0
+        for index, bound in enumerate(self.buckets):
+            seen += self.bucket_counts[index]
+            if seen >= target:
+                return bound
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+            "p50_ms": round(self.percentile(0.50) * 1000, 2),
+            "p95_ms": round(self.percentile(0.95) * 1000, 2),
+            "p99_ms": round(self.percentile(0.99) * 1000, 2),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.buckets, self.bucket_counts)},
+                "le_inf": self.bucket_counts[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """In-process registry for counters, gauges and latency histograms"""
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self.started_at = time.time()
+
+    def increment(self, name: str, amount: float = 1):
+        """
+        Increase a counter
+
+        Args:
+            name: Metric name, dotted by component (e.g. "cloudinary.upload.errors")
+            amount: Value to add
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float):
+        """Record the current value of a gauge"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """
+        Record a latency observation
+
+        Args:
+            name: Histogram name
+            seconds: Elapsed time in seconds
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block into the named histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a JSON-serialisable copy of every metric
+
+        Returns:
+            Dictionary with counters, gauges and latency summaries
+        """
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "latency": {name: histogram.to_dict() for name, histogram in self._histograms.items()},
+            }
+
+    def reset(self):
+        """Drop all recorded metrics"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+# Global instance
+metrics = MetricsRegistry()
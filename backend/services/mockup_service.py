@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+import logging
+
+from PIL import Image, ImageOps
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_NAME_PATTERN = re.compile(r"^[a-z0-9_-]{1,64}$")
+TEMPLATE_VERSION_PATTERN = re.compile(r"^[0-9a-f]{12}$")
+ALLOWED_SIZES = (400, 800, 1200)
+
+# Per worker process: (template name, version) -> (overlay RGBA, photo window box)
+_TEMPLATES: Dict[Tuple[str, str], Tuple[Image.Image, Tuple[int, int, int, int]]] = {}
+
+
+def _load_template(template_dir: str, template: str, version: str) -> Tuple[Image.Image, Tuple[int, int, int, int]]:
+    """Load a frame overlay once per worker and version, and locate its transparent photo window"""
+    cached = _TEMPLATES.get((template, version))
+    if cached is None:
+        overlay = Image.open(os.path.join(template_dir, f"{template}.png")).convert("RGBA")
+        # The window is wherever the frame is see-through
+        window = overlay.getchannel("A").point(lambda alpha: 255 if alpha < 128 else 0).getbbox()
+        cached = _TEMPLATES[(template, version)] = (overlay, window or (0, 0, overlay.width, overlay.height))
+    return cached
+
+
+def composite_mockup(template_dir: str, template: str, version: str, photo_path: str, size: int, output_path: str) -> float:
+    """
+    Place a photo behind a frame overlay and save the mockup (runs in a worker process)
+
+    Returns:
+        Render time in milliseconds
+    """
+    started = time.perf_counter()
+    overlay, (left, top, right, bottom) = _load_template(template_dir, template, version)
+
+    with Image.open(photo_path) as photo:
+        fitted = ImageOps.fit(photo.convert("RGB"), (right - left, bottom - top), Image.LANCZOS)
+
+    canvas = Image.new("RGBA", overlay.size, (255, 255, 255, 255))
+    canvas.paste(fitted, (left, top))
+    canvas.alpha_composite(overlay)
+
+    mockup = canvas.convert("RGB")
+    mockup.thumbnail((size, size), Image.LANCZOS)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    mockup.save(tmp_path, "JPEG", quality=85, optimize=True, progressive=True)
+    os.replace(tmp_path, output_path)
+    return (time.perf_counter() - started) * 1000
+
+
+class MockupService:
+    def __init__(self):
+        """
+        Composite frame mockups locally and cache them by (photo hash, template version, size)
+
+        The cache lives next to the app by default rather than in /tmp; the
+        serving route renders a missing mockup again on request.
+        """
+        # backend/frames ships the stock templates; point this elsewhere to use your own artwork
+        self.template_dir = Path(os.getenv('FRAME_TEMPLATE_DIR', Path(__file__).parent.parent / 'frames'))
+        self.cache_dir = Path(os.getenv('MOCKUP_CACHE_DIR', Path(__file__).parent.parent / 'mockup_cache'))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.base_url = os.getenv('MOCKUP_BASE_URL', '/api/mockups').rstrip('/')
+        self.max_workers = int(os.getenv('MOCKUP_WORKERS', '2'))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Path, asyncio.Task] = {}
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def template_version(self, template: str) -> Optional[str]:
+        """
+        Fingerprint a template file by its modification time and size
+
+        Part of every cache key and URL, so editing a template renders fresh
+        mockups instead of serving ones made with the old artwork.
+
+        Returns:
+            12 hex characters, or None if the template does not exist
+        """
+        if not TEMPLATE_NAME_PATTERN.match(template):
+            return None
+        try:
+            stat = (self.template_dir / f"{template}.png").stat()
+        except FileNotFoundError:
+            return None
+        return hashlib.sha256(f"{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()[:12]
+
+    def mockup_path(self, content_hash: str, template: str, version: str, size: int) -> Optional[Path]:
+        """
+        Get the cache path for a mockup, validating every key component
+
+        Returns:
+            Path inside the cache directory, or None if a component is invalid
+        """
+        if (len(content_hash) != 64 or not all(c in "0123456789abcdef" for c in content_hash)
+                or not TEMPLATE_NAME_PATTERN.match(template) or not TEMPLATE_VERSION_PATTERN.match(version)
+                or size not in ALLOWED_SIZES):
+            return None
+        return self.cache_dir / content_hash[:2] / content_hash / f"{template}_{version}_{size}.jpg"
+
+    def mockup_url(self, content_hash: str, template: str, version: str, size: int) -> str:
+        return f"{self.base_url}/{content_hash}/{template}/{version}/{size}.jpg"
+
+    async def _render(self, template: str, version: str, photo_path: Path, size: int, output_path: Path):
+        try:
+            elapsed_ms = await asyncio.get_running_loop().run_in_executor(
+                self.pool, composite_mockup, str(self.template_dir), template, version,
+                str(photo_path), size, str(output_path)
+            )
+            metrics.observe("mockups.render", elapsed_ms / 1000)
+        finally:
+            self._pending.pop(output_path, None)
+
+    async def generate(self, content_hash: str, photo_path: Path, template: str, size: int = 800) -> Optional[str]:
+        """
+        Composite a photo into a frame template, reusing any cached result
+
+        Args:
+            content_hash: SHA-256 of the original photo
+            photo_path: Local rendition of the photo to composite
+            template: Frame template name (file stem in the template directory)
+            size: Longest side of the mockup in pixels
+
+        Returns:
+            URL of the mockup, or None if it cannot be rendered locally
+        """
+        version = self.template_version(template)
+        output_path = self.mockup_path(content_hash, template, version, size) if version else None
+        if output_path is None:
+            return None
+
+        if output_path.exists():
+            metrics.increment("mockups.cache_hits")
+            return self.mockup_url(content_hash, template, version, size)
+
+        # Share a render already in flight for the same key. The render is its own task and
+        # every caller awaits it through shield(), so a caller that disconnects cancels only its own wait.
+        task = self._pending.get(output_path)
+        if task is None:
+            metrics.increment("mockups.cache_misses")
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            task = asyncio.create_task(self._render(template, version, photo_path, size, output_path))
+            self._pending[output_path] = task
+            # Retrieve a failure even if every caller has gone, so it is not logged as unhandled
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to composite mockup {template} for {content_hash}: {str(e)}")
+            return None
+
+        logger.info(f"Generated local mockup: {template} ({size}px)")
+        return self.mockup_url(content_hash, template, version, size)
+
+    def _remove_dir(self, content_hash: str) -> bool:
+        try:
+            shutil.rmtree(self.cache_dir / content_hash[:2] / content_hash)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def purge(self, content_hash: str) -> bool:
+        """
+        Delete every cached mockup of a photo
+
+        Returns:
+            True if anything was cached
+        """
+        if len(content_hash) != 64 or not all(c in "0123456789abcdef" for c in content_hash):
+            return False
+        return await asyncio.get_running_loop().run_in_executor(None, self._remove_dir, content_hash)
+
+    def shutdown(self):
+        """Stop the compositing worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# Global instance
+mockup_service = MockupService()
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from services.storage_backends import storage_backend
+from services.metrics import metrics
+from services.retention_service import as_utc
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoReconciler:
+    def __init__(self, collection, storage=storage_backend, lease=None):
+        """
+        Periodically sync user_photos metadata with what is actually in storage
+
+        Args:
+            collection: Motor collection holding user_photos records
+            storage: Storage backend to compare against
+            lease: Optional JobLease so only one process runs the pass
+        """
+        self.collection = collection
+        self.storage = storage
+        self.lease = lease
+        self.interval_seconds = int(os.getenv('PHOTO_RECONCILE_INTERVAL_SECONDS', '3600'))
+        # Uploads are stored before their record is inserted; leave fresh resources to the upload
+        self.adopt_grace_seconds = int(os.getenv('PHOTO_RECONCILE_ADOPT_GRACE_SECONDS', '900'))
+        self._task: Optional[asyncio.Task] = None
+
+    async def reconcile(self) -> Dict[str, Any]:
+        """
+        Run one full pass over storage, a page at a time
+
+        Matched records get fresh dimensions/format/bytes, resources with no
+        record are adopted, and active records no longer in storage are flagged.
+        Every record seen is stamped with the pass id, so the missing check is
+        one indexed query however large the library is. Deleted photos keep
+        their (inactive) record, so their resources are never re-adopted.
+
+        Returns:
+            Summary counts for the pass
+        """
+        started_at = datetime.now(timezone.utc)
+        pass_id = str(uuid.uuid4())
+        adopt_before = started_at - timedelta(seconds=self.adopt_grace_seconds)
+        summary = {"pages": 0, "updated": 0, "adopted": 0, "missing": 0, "skipped_recent": 0}
+        next_cursor = None
+
+        with metrics.timer("photo_reconciler.pass"):
+            while True:
+                page = await self.storage.list(prefix="users/", next_cursor=next_cursor)
+                resources = {resource["public_id"]: resource for resource in page["resources"]}
+                summary["pages"] += 1
+
+                if resources:
+                    existing = await self.collection.find(
+                        {"public_id": {"$in": list(resources)}},
+                        {"_id": 0, "public_id": 1}
+                    ).to_list(len(resources))
+                    known = {doc["public_id"] for doc in existing}
+
+                    operations = []
+                    for public_id, resource in resources.items():
+                        # Backends do not all report every field; never overwrite with blanks
+                        fields = {
+                            key: resource[key]
+                            for key in ("width", "height", "format", "bytes")
+                            if resource.get(key) is not None
+                        }
+                        fields.update({"storage_synced_at": started_at, "storage_pass": pass_id, "storage_missing": False})
+                        if public_id in known:
+                            operations.append(UpdateOne({"public_id": public_id}, {"$set": fields}))
+                        elif (as_utc(resource.get("created_at")) or started_at) > adopt_before:
+                            summary["skipped_recent"] += 1
+                        else:
+                            operations.append(UpdateOne(
+                                {"public_id": public_id},
+                                {"$setOnInsert": self._adopted_document(resource), "$set": fields},
+                                upsert=True
+                            ))
+                            summary["adopted"] += 1
+                    if operations:
+                        try:
+                            await self.collection.bulk_write(operations, ordered=False)
+                        except BulkWriteError as e:
+                            # An upload inserted its record between our read and write; the unique index keeps one
+                            logger.warning(f"Photo reconciliation page had {len(e.details.get('writeErrors', []))} write conflicts")
+                    summary["updated"] += len(known)
+
+                next_cursor = page["next_cursor"]
+                if not next_cursor:
+                    break
+
+            # Anything active that storage did not list in this pass has gone missing
+            result = await self.collection.update_many(
+                {
+                    "is_active": True,
+                    "public_id": {"$type": "string"},
+                    "storage_pass": {"$ne": pass_id},
+                    "created_at": {"$lt": started_at}
+                },
+                {"$set": {"storage_missing": True, "storage_synced_at": started_at}}
+            )
+            summary["missing"] = result.modified_count
+
+        metrics.increment("photo_reconciler.adopted", summary["adopted"])
+        logger.info(f"Photo reconciliation finished: {summary}")
+        return summary
+
+    def _adopted_document(self, resource: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a user_photos record for a resource that has no DB record"""
+        public_id = resource["public_id"]
+        # Public IDs look like users/{user_id}/photos/... or users/{user_id}/orders/{order_id}/...
+        parts = public_id.split("/")
+        context = resource.get("context", {}).get("custom", {})
+        return {
+            "id": str(uuid.uuid4()),
+            "user_id": parts[1] if len(parts) > 1 else context.get("user_id"),
+            "order_id": parts[3] if len(parts) > 3 and parts[2] == "orders" else None,
+            "public_id": public_id,
+            "secure_url": resource.get("secure_url"),
+            "folder": resource.get("folder", "/".join(parts[:-1])),
+            "thumbnails": {},
+            "metadata": context,
+            "created_at": datetime.now(timezone.utc),
+            "is_active": True
+        }
+
+    async def _run_forever(self):
+        while True:
+            try:
+                # The lease outlives one interval so the holder keeps it between passes
+                if not self.lease or await self.lease.acquire(self.interval_seconds * 2):
+                    await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.increment("photo_reconciler.errors")
+                logger.error(f"Photo reconciliation failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the background reconciliation loop"""
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the background reconciliation loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            if self.lease:
+                await self.lease.release()
@@ -0,0 +1,253 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Optional, Dict, Any, List
+from zoneinfo import ZoneInfo
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Furthest ahead a reminder can be scheduled
+MAX_REMINDER_DAYS_BEFORE = 60
+
+
+def parse_event_date(value: Any) -> Optional[date]:
+    """Parse a stored YYYY-MM-DD important date, returning None if malformed"""
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def month_day(value: date) -> str:
+    return value.strftime("%m-%d")
+
+
+class ReminderService:
+    def __init__(self, reminders_collection, users_collection, outbox):
+        """
+        Send reminders ahead of users' important dates
+
+        users.important_dates is flattened into one reminders entry per
+        (date, days_before), keyed by the event's month-day. The daily run
+        then looks up only the entries falling due with a single query on
+        the (month_day, days_before) index instead of scanning every user.
+
+        Args:
+            reminders_collection: Motor collection holding the flattened index
+            users_collection: Motor collection holding users
+            outbox: EmailOutbox the reminders are queued on
+        """
+        self.reminders = reminders_collection
+        self.users = users_collection
+        self.outbox = outbox
+        self.timezone = ZoneInfo(os.getenv('REMINDER_TIMEZONE', 'Asia/Kolkata'))
+        self.interval_seconds = int(os.getenv('REMINDER_CHECK_INTERVAL_SECONDS', '3600'))
+        self._task: Optional[asyncio.Task] = None
+
+    def _entries(self, user_id: str, important_date: Dict[str, Any]) -> List[Dict[str, Any]]:
+        event_date = parse_event_date(important_date.get("date"))
+        if not event_date or not important_date.get("reminder_enabled", True):
+            return []
+        days_before = set()
+        for days in important_date.get("reminder_days_before") or []:
+            try:
+                days = int(days)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= days <= MAX_REMINDER_DAYS_BEFORE:
+                days_before.add(days)
+        return [
+            {
+                "id": f"{important_date['id']}:{days}",
+                "user_id": user_id,
+                "date_id": important_date["id"],
+                "month_day": month_day(event_date),
+                "days_before": days,
+                "name": important_date.get("name"),
+                "type": important_date.get("type"),
+                "date": event_date.isoformat(),
+            }
+            for days in sorted(days_before)
+        ]
+
+    async def index_date(self, user_id: str, important_date: Dict[str, Any]) -> int:
+        """
+        Replace the index entries for one important date (after add or edit)
+
+        Returns:
+            Number of entries now indexed for the date
+        """
+        entries = self._entries(user_id, important_date)
+        await self.reminders.delete_many({"user_id": user_id, "date_id": important_date["id"]})
+        if entries:
+            await self.reminders.insert_many(entries, ordered=False)
+        return len(entries)
+
+    async def index_user(self, user_id: str, important_dates: List[Dict[str, Any]]) -> int:
+        """
+        Replace every index entry for a user (after important_dates is rewritten wholesale)
+
+        Returns:
+            Number of entries now indexed for the user
+        """
+        entries = [
+            entry
+            for important_date in important_dates if important_date.get("id")
+            for entry in self._entries(user_id, important_date)
+        ]
+        await self.reminders.delete_many({"user_id": user_id})
+        if entries:
+            await self.reminders.insert_many(entries, ordered=False)
+        return len(entries)
+
+    async def remove_date(self, user_id: str, date_id: str):
+        """Drop the index entries for a deleted important date"""
+        await self.reminders.delete_many({"user_id": user_id, "date_id": date_id})
+
+    async def rebuild(self) -> int:
+        """
+        Rebuild the whole index from users.important_dates
+
+        Returns:
+            Number of entries indexed
+        """
+        indexed = 0
+        cursor = self.users.find(
+            {"important_dates.0": {"$exists": True}},
+            {"_id": 0, "id": 1, "important_dates": 1}
+        )
+        async for user in cursor:
+            indexed += await self.index_user(user["id"], user.get("important_dates", []))
+        logger.info(f"Reminder index rebuilt with {indexed} entries")
+        return indexed
+
+    def today(self) -> date:
+        return datetime.now(self.timezone).date()
+
+    async def due_entries(self, today: date) -> List[Dict[str, Any]]:
+        """
+        Get the entries whose reminder falls on the given day
+
+        Each entry is due when today + days_before is the event's month-day.
+        Feb 29 events are reminded on Feb 28 in other years.
+        """
+        targets = []
+        for days in await self.reminders.distinct("days_before"):
+            event_day = today + timedelta(days=days)
+            month_days = [month_day(event_day)]
+            if month_days[0] == "02-28" and (event_day + timedelta(days=1)).month == 3:
+                month_days.append("02-29")
+            targets.append({"month_day": {"$in": month_days}, "days_before": days})
+        if not targets:
+            return []
+        return await self.reminders.find(
+            {"$or": targets, "last_sent_on": {"$ne": today.isoformat()}},
+            {"_id": 0}
+        ).to_list(None)
+
+    async def run(self, today: Optional[date] = None) -> Dict[str, int]:
+        """
+        Queue today's reminders on the email outbox
+
+        Users must have reminder_consent and email reminders enabled. The due
+        entries are claimed for the day (last_sent_on) with one conditional
+        update_many tagged with this run's claim id, and only the entries
+        carrying that id are queued, so concurrent runs in several workers
+        never queue the same reminder twice.
+
+        Returns:
+            Summary counts for the run
+        """
+        today = today or self.today()
+        summary = {"due": 0, "queued": 0, "skipped": 0}
+
+        with metrics.timer("reminders.run"):
+            entries = await self.due_entries(today)
+            summary["due"] = len(entries)
+            if not entries:
+                return summary
+
+            # Skipped entries are claimed too; consent given later applies from the next occurrence
+            claim_id = uuid.uuid4().hex
+            claim = await self.reminders.update_many(
+                {"id": {"$in": [entry["id"] for entry in entries]}, "last_sent_on": {"$ne": today.isoformat()}},
+                {"$set": {"last_sent_on": today.isoformat(), "claim_id": claim_id}}
+            )
+            if not claim.modified_count:
+                return summary
+            claimed = {
+                entry["id"]
+                for entry in await self.reminders.find({"claim_id": claim_id}, {"_id": 0, "id": 1}).to_list(None)
+            }
+            entries = [entry for entry in entries if entry["id"] in claimed]
+
+            user_ids = list({entry["user_id"] for entry in entries})
+            users = await self.users.find(
+                {"id": {"$in": user_ids}},
+                {"_id": 0, "id": 1, "name": 1, "email": 1, "reminder_preferences": 1, "privacy_consent": 1}
+            ).to_list(len(user_ids))
+            users = {user["id"]: user for user in users}
+
+            payloads = []
+            for entry in entries:
+                user = users.get(entry["user_id"])
+                if (
+                    not user or not user.get("email")
+                    or not (user.get("privacy_consent") or {}).get("reminder_consent")
+                    or not (user.get("reminder_preferences") or {}).get("email")
+                ):
+                    summary["skipped"] += 1
+                    continue
+                event_date = today + timedelta(days=entry["days_before"])
+                payloads.append({
+                    "email": user["email"],
+                    "user_name": user.get("name") or "there",
+                    "date_name": entry.get("name") or "Your special day",
+                    "date_type": entry.get("type"),
+                    "event_date": event_date.strftime("%B %d, %Y"),
+                    "days_before": entry["days_before"],
+                })
+
+            try:
+                summary["queued"] = await self.outbox.enqueue_many("date_reminder", payloads)
+            except Exception:
+                # Release the claims so the next run queues them instead of losing the day
+                await self.reminders.update_many(
+                    {"claim_id": claim_id},
+                    {"$unset": {"last_sent_on": "", "claim_id": ""}}
+                )
+                raise
+
+        metrics.increment("reminders.queued", summary["queued"])
+        logger.info(f"Date reminders for {today.isoformat()}: {summary}")
+        return summary
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.increment("reminders.errors")
+                logger.error(f"Date reminder run failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the background reminder loop"""
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the background reminder loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,224 @@
+import asyncio
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, Iterable
+import logging
+
+from pymongo import UpdateOne
+
+from services.storage_backends import storage_backend
+from services.derivative_service import derivative_service
+from services.mockup_service import mockup_service
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def as_utc(value: Any) -> Optional[datetime]:
+    """Normalise stored datetimes and ISO strings to aware UTC datetimes"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        # Legacy metadata was stamped with naive local time
+        return value.astimezone(timezone.utc)
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return None
+
+
+class PhotoRetentionJob:
+    def __init__(self, photos_collection, users_collection, storage=storage_backend,
+                 rendition_caches=(derivative_service, mockup_service), lease=None):
+        """
+        Delete photos past their retention date in rate-limited batches
+
+        Args:
+            photos_collection: Motor collection holding user_photos records
+            users_collection: Motor collection holding users (for data_retention settings)
+            storage: Storage backend with a bulk delete_many() for up to 100 public IDs
+            rendition_caches: Local caches (thumbnails, mockups) with an async purge(content_hash)
+            lease: Optional JobLease so only one process runs the cleanup
+        """
+        self.photos = photos_collection
+        self.users = users_collection
+        self.storage = storage
+        self.rendition_caches = rendition_caches
+        self.lease = lease
+        self.batch_size = min(int(os.getenv('PHOTO_CLEANUP_BATCH_SIZE', '100')), 100)
+        self.batch_pause_seconds = float(os.getenv('PHOTO_CLEANUP_BATCH_PAUSE_SECONDS', '1.0'))
+        self.max_batches_per_run = int(os.getenv('PHOTO_CLEANUP_MAX_BATCHES', '50'))
+        self.interval_seconds = int(os.getenv('PHOTO_CLEANUP_INTERVAL_SECONDS', '86400'))
+        self._task: Optional[asyncio.Task] = None
+
+    async def backfill_expiry(self) -> int:
+        """
+        Give legacy records an indexed expires_at from metadata.auto_delete_date
+
+        Returns:
+            Number of records updated
+        """
+        updated = 0
+        query = {"expires_at": {"$exists": False}, "metadata.auto_delete_date": {"$exists": True}}
+        while True:
+            docs = await self.photos.find(query, {"_id": 1, "metadata.auto_delete_date": 1}).limit(500).to_list(500)
+            if not docs:
+                return updated
+            await self.photos.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"expires_at": as_utc(doc["metadata"]["auto_delete_date"])}})
+                for doc in docs
+            ], ordered=False)
+            updated += len(docs)
+
+    async def _retention_overrides(self, docs: List[Dict[str, Any]], now: datetime) -> Dict[Any, Optional[datetime]]:
+        """
+        Apply owners' data_retention settings to a batch
+
+        Returns:
+            Mapping of record _id to its new expires_at (None = keep forever)
+            for records that must not be deleted yet
+        """
+        user_ids = list({doc["user_id"] for doc in docs if doc.get("user_id")})
+        users = await self.users.find(
+            {"id": {"$in": user_ids}},
+            {"_id": 0, "id": 1, "data_retention": 1}
+        ).to_list(len(user_ids))
+        retention = {user["id"]: user.get("data_retention") or {} for user in users}
+
+        overrides = {}
+        for doc in docs:
+            settings = retention.get(doc.get("user_id"), {})
+            if settings.get("auto_delete_photos") is False:
+                overrides[doc["_id"]] = None
+            elif doc.get("order_id"):
+                # Order photos follow the account retention period, not the 30-day upload window
+                months = settings.get("retention_period_months", 24)
+                created_at = as_utc(doc.get("created_at")) or now
+                keep_until = created_at + timedelta(days=30 * months)
+                if keep_until > now:
+                    overrides[doc["_id"]] = keep_until
+        return overrides
+
+    async def purge_renditions(self, content_hashes: Iterable[str]) -> int:
+        """
+        Drop cached thumbnails and mockups of deleted photos
+
+        Renditions are content-addressed, so a hash is skipped while any
+        active photo (e.g. the same picture uploaded again) still uses it.
+
+        Returns:
+            Number of cache directories removed
+        """
+        content_hashes = set(content_hashes)
+        if not content_hashes:
+            return 0
+        still_used = set(await self.photos.distinct(
+            "content_hash",
+            {"content_hash": {"$in": list(content_hashes)}, "is_active": True}
+        ))
+        purged = 0
+        for content_hash in content_hashes - still_used:
+            for cache in self.rendition_caches:
+                if await cache.purge(content_hash):
+                    purged += 1
+        return purged
+
+    async def run(self, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """
+        Work through expired photos, oldest first
+
+        Each batch is one bulk storage delete plus one bulk_write. Processed
+        records leave the (is_active, expires_at) index range, so a stopped
+        run simply continues where it left off next time.
+
+        Args:
+            max_batches: Upper bound on batches for this run
+
+        Returns:
+            Summary counts for the run
+        """
+        summary = {"batches": 0, "deleted": 0, "retained": 0, "failed": 0, "renditions_purged": 0}
+        summary["backfilled"] = await self.backfill_expiry()
+        max_batches = max_batches or self.max_batches_per_run
+        failed_ids = []
+
+        while summary["batches"] < max_batches:
+            now = datetime.now(timezone.utc)
+            query = {"is_active": True, "expires_at": {"$lte": now}}
+            if failed_ids:
+                query["_id"] = {"$nin": failed_ids}
+            docs = await self.photos.find(
+                query,
+                {"_id": 1, "user_id": 1, "order_id": 1, "public_id": 1, "content_hash": 1, "created_at": 1}
+            ).sort("expires_at", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                break
+
+            deleted_hashes = []
+            with metrics.timer("photo_cleanup.batch"):
+                overrides = await self._retention_overrides(docs, now)
+                expired = [doc for doc in docs if doc["_id"] not in overrides]
+                public_ids = [doc["public_id"] for doc in expired if doc.get("public_id")]
+                gone = set(await self.storage.delete_many(public_ids))
+
+                operations = [
+                    UpdateOne({"_id": _id}, {"$set": {"expires_at": keep_until}})
+                    for _id, keep_until in overrides.items()
+                ]
+                for doc in expired:
+                    if doc.get("public_id") and doc["public_id"] not in gone:
+                        failed_ids.append(doc["_id"])
+                        summary["failed"] += 1
+                        continue
+                    operations.append(UpdateOne(
+                        {"_id": doc["_id"]},
+                        {"$set": {"is_active": False, "deleted_at": now, "deletion_reason": "retention_expired"}}
+                    ))
+                    if doc.get("content_hash"):
+                        deleted_hashes.append(doc["content_hash"])
+                    summary["deleted"] += 1
+                if operations:
+                    await self.photos.bulk_write(operations, ordered=False)
+                # After the records are inactive, so the still-in-use check does not count them
+                summary["renditions_purged"] += await self.purge_renditions(deleted_hashes)
+
+            summary["retained"] += len(overrides)
+            summary["batches"] += 1
+            # Spread the work out so a large backlog does not compete with live traffic
+            await asyncio.sleep(self.batch_pause_seconds)
+
+        metrics.increment("photo_cleanup.deleted", summary["deleted"])
+        metrics.increment("photo_cleanup.failed", summary["failed"])
+        logger.info(f"Photo retention cleanup finished: {summary}")
+        return summary
+
+    async def _run_forever(self):
+        while True:
+            try:
+                # The lease outlives one interval so the holder keeps it between runs
+                if not self.lease or await self.lease.acquire(self.interval_seconds * 2):
+                    await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.increment("photo_cleanup.errors")
+                logger.error(f"Photo retention cleanup failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the background cleanup loop"""
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the background cleanup loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            if self.lease:
+                await self.lease.release()
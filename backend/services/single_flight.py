@@ -0,0 +1,68 @@
+import asyncio
+from typing import Dict, Hashable, Callable, Awaitable, TypeVar
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        """
+        Coalesce concurrent calls for the same key into one execution
+
+        The first caller for a key starts the work; everyone who asks for the
+        same key while it is running awaits that same call and gets the same
+        result (or exception). Only for idempotent reads: the result object is
+        shared, so callers must not mutate it.
+
+        Args:
+            name: Metric prefix (e.g. "gift_suggestions.flights")
+        """
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception so it is not logged as unhandled when every waiter has gone
+        if not task.cancelled():
+            task.exception()
+
+    def task(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        """
+        Get the call running for the key, starting fn() if there is none
+
+        For callers that need more than the result (e.g. to follow a stream
+        the call produces); await it through asyncio.shield().
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            metrics.increment(f"{self.name}.calls")
+        else:
+            metrics.increment(f"{self.name}.coalesced")
+        return task
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() for the key, or join the call already running for it
+
+        Args:
+            key: Identity of the request (e.g. a normalized cache key)
+            fn: Zero-argument coroutine function doing the actual work
+
+        Returns:
+            The result of the shared call
+        """
+        # A caller that is cancelled (client went away) must not cancel the call for the others
+        return await asyncio.shield(self.task(key, fn))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
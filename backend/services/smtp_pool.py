@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+from email.message import Message
+from typing import Optional, List, Tuple
+import logging
+
+import aiosmtplib
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the session itself is unusable, so a fresh connection may succeed
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    asyncio.TimeoutError,
+)
+
+
+class SMTPConnectionPool:
+    def __init__(self, hostname: str, port: int, username: str, password: str,
+                 start_tls: bool = True, size: Optional[int] = None):
+        """
+        Small pool of long-lived, authenticated SMTP sessions
+
+        Sessions are reused LIFO so a burst of messages keeps hitting the same
+        warm connections. Sessions idle past SMTP_IDLE_TIMEOUT_SECONDS are
+        closed by a background reaper (start()/stop()), those idle past SMTP_HEALTH_CHECK_AFTER_SECONDS get a NOOP
+        before reuse, and a send that fails on a dead session is retried once
+        on a new one.
+
+        Args:
+            hostname: SMTP server host
+            port: SMTP server port
+            username: Login user
+            password: Login password
+            start_tls: Upgrade with STARTTLS after connecting
+            size: Maximum concurrent sessions (SMTP_POOL_SIZE)
+        """
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.size = size or int(os.getenv('SMTP_POOL_SIZE', '3'))
+        self.idle_timeout = float(os.getenv('SMTP_IDLE_TIMEOUT_SECONDS', '60'))
+        self.health_check_after = float(os.getenv('SMTP_HEALTH_CHECK_AFTER_SECONDS', '10'))
+        self.timeout = float(os.getenv('SMTP_TIMEOUT_SECONDS', '30'))
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            username=self.username or None,
+            password=self.password or None,
+            timeout=self.timeout,
+        )
+        with metrics.timer("smtp.connect"):
+            await smtp.connect()
+        metrics.increment("smtp.connections_opened")
+        return smtp
+
+    async def _close(self, smtp: aiosmtplib.SMTP):
+        metrics.increment("smtp.connections_closed")
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        """Take the most recently used healthy session, or open a new one"""
+        while self._idle:
+            smtp, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout or not smtp.is_connected:
+                await self._close(smtp)
+                continue
+            if idle_for > self.health_check_after:
+                try:
+                    await smtp.noop()
+                except (aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+                    metrics.increment("smtp.health_check_failures")
+                    smtp.close()
+                    continue
+            metrics.increment("smtp.connections_reused")
+            return smtp
+        return await self._connect()
+
+    async def _release(self, smtp: aiosmtplib.SMTP):
+        if not smtp.is_connected:
+            return
+        self._idle.append((smtp, time.monotonic()))
+        await self.reap()
+
+    async def reap(self) -> int:
+        """
+        Close sessions idle past the timeout
+
+        Returns:
+            Number of sessions closed
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        # Detach before awaiting, so _acquire never picks a session being closed
+        stale = [smtp for smtp, last_used in self._idle if last_used < cutoff]
+        self._idle = [(smtp, last_used) for smtp, last_used in self._idle if last_used >= cutoff]
+        for smtp in stale:
+            await self._close(smtp)
+        if stale:
+            metrics.increment("smtp.idle_reaped", len(stale))
+        return len(stale)
+
+    async def _run_forever(self):
+        # Without this, an idle pool holds connections until the next send
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 2, 1))
+            try:
+                await self.reap()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"SMTP idle session reaper failed: {str(e)}")
+
+    def start(self):
+        """Start the background idle-session reaper"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the reaper"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def send(self, message: Message):
+        """
+        Send a message over a pooled session
+
+        Raises:
+            aiosmtplib.SMTPException: If the server rejects the message, or no
+                session could be established
+        """
+        async with self._slots:
+            for attempt in range(2):
+                smtp = await self._acquire()
+                try:
+                    with metrics.timer("smtp.send"):
+                        await smtp.send_message(message)
+                except CONNECTION_ERRORS:
+                    smtp.close()
+                    if attempt:
+                        raise
+                    metrics.increment("smtp.reconnects")
+                    continue
+                except aiosmtplib.SMTPResponseException:
+                    # aiosmtplib resets the envelope, so the session stays usable
+                    await self._release(smtp)
+                    raise
+                except Exception:
+                    smtp.close()
+                    raise
+                await self._release(smtp)
+                return
+
+    async def close(self):
+        """Stop the reaper and quit every idle session"""
+        await self.stop()
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            await self._close(smtp)
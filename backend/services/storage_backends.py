@@ -0,0 +1,505 @@
+import asyncio
+import hashlib
+import hmac
+import io
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Union, BinaryIO, Tuple, Iterator
+import logging
+
+import cloudinary.utils
+from PIL import Image, UnidentifiedImageError
+
+from services.blob_store import sniff_extension, CONTENT_TYPES
+from services.cloudinary_service import cloudinary_service
+from services.metrics import metrics
+from services.upload_stream import copy_stream
+
+logger = logging.getLogger(__name__)
+
+# Same sizes as the local derivative pipeline, for backends that can render on the fly
+DERIVATIVE_TRANSFORMATIONS = {
+    "small": {"width": 150, "height": 150, "crop": "fill", "quality": "auto:eco"},
+    "medium": {"width": 300, "height": 300, "crop": "fill", "quality": "auto:good"},
+    "large": {"width": 600, "height": 600, "crop": "limit", "quality": "auto:good"},
+    "xlarge": {"width": 1200, "height": 1200, "crop": "limit", "quality": "auto:best"},
+}
+
+
+class StorageBackend:
+    """
+    Interface every photo storage provider implements
+
+    Public IDs look like users/{user_id}/photos/{name} or
+    users/{user_id}/orders/{order_id}/{name} on every backend.
+    """
+    name = "base"
+    auto_delete_days = 30
+
+    async def put(self, user_id: str, file_data: Union[bytes, BinaryIO], filename: str,
+                  order_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store a photo
+
+        Returns:
+            Dictionary with success, public_id, secure_url, folder, width,
+            height, format, bytes, thumbnails and metadata
+        """
+        raise NotImplementedError
+
+    async def get(self, public_id: str) -> Optional[Path]:
+        """
+        Get a local path for a stored photo
+
+        Returns:
+            Path for backends that keep files on this machine, otherwise None
+            (use sign() for remote access)
+        """
+        return None
+
+    async def delete(self, public_id: str, user_id: str) -> bool:
+        """Delete one of the user's photos"""
+        raise NotImplementedError
+
+    async def delete_many(self, public_ids: List[str]) -> List[str]:
+        """
+        Delete up to 100 photos at once
+
+        Returns:
+            Public IDs that are gone from storage
+        """
+        raise NotImplementedError
+
+    async def list(self, prefix: str = "users/", next_cursor: Optional[str] = None,
+                   max_results: int = 500) -> Dict[str, Any]:
+        """
+        List one page of stored photos
+
+        Returns:
+            Dictionary with "resources" and "next_cursor"
+        """
+        raise NotImplementedError
+
+    async def sign(self, public_id: str, user_id: str, expires_in_hours: int = 4) -> Optional[str]:
+        """Get a time-limited URL for one of the user's photos"""
+        raise NotImplementedError
+
+    def derivatives(self, public_id: str) -> Dict[str, str]:
+        """
+        Get provider-rendered thumbnail URLs
+
+        Returns:
+            Variant name to URL, or an empty dict when thumbnails come from
+            the local derivative pipeline
+        """
+        return {}
+
+    def configure(self):
+        """
+        Check required configuration; the app calls this at startup
+
+        Raises:
+            RuntimeError: If the backend cannot run with the current settings
+        """
+
+    @staticmethod
+    def folder_for(user_id: str, order_id: Optional[str] = None) -> str:
+        return f"users/{user_id}/orders/{order_id}" if order_id else f"users/{user_id}/photos"
+
+    @staticmethod
+    def name_for(filename: str) -> str:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        clean_filename = "".join(c for c in filename.split('.')[0][:20] if c.isalnum() or c in "-_")
+        return f"{timestamp}_{str(uuid.uuid4())[:8]}_{clean_filename}"
+
+
+class CloudinaryStorageBackend(StorageBackend):
+    name = "cloudinary"
+
+    def __init__(self, service=cloudinary_service):
+        """Photo storage on Cloudinary, via the executor-backed CloudinaryService"""
+        self.service = service
+        self.auto_delete_days = service.auto_delete_days
+
+    async def put(self, user_id, file_data, filename, order_id=None):
+        return await self.service.upload_user_photo(
+            user_id=user_id,
+            file_data=file_data,
+            filename=filename,
+            order_id=order_id
+        )
+
+    async def delete(self, public_id, user_id):
+        return await self.service.delete_user_photo(public_id, user_id)
+
+    async def delete_many(self, public_ids):
+        return await self.service.delete_photos(public_ids)
+
+    async def list(self, prefix="users/", next_cursor=None, max_results=500):
+        return await self.service.list_resources(prefix=prefix, next_cursor=next_cursor, max_results=max_results)
+
+    async def sign(self, public_id, user_id, expires_in_hours=4):
+        return await self.service.generate_signed_url(public_id, user_id, expires_in_hours)
+
+    def derivatives(self, public_id):
+        return {
+            name: cloudinary.utils.cloudinary_url(public_id, transformation=[transformation], secure=True)[0]
+            for name, transformation in DERIVATIVE_TRANSFORMATIONS.items()
+        }
+
+
+class LocalStorageBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self):
+        """
+        Photo storage on the local filesystem, served through signed /api/storage URLs
+
+        Files are served with FileResponse, which uses the ASGI pathsend
+        extension (sendfile) on servers that offer it. Behind nginx, set
+        PHOTO_STORAGE_ACCEL_REDIRECT to an internal location aliased to
+        PHOTO_STORAGE_DIR to hand the transfer to nginx instead.
+
+        Every worker must share STORAGE_SIGNING_SECRET. Only with
+        STORAGE_SIGNING_DEV_MODE=true may it be missing; a random secret is
+        then used and issued URLs stop working on restart. configure() checks
+        this at startup.
+        """
+        self.root = Path(os.getenv('PHOTO_STORAGE_DIR', Path(__file__).parent.parent / 'photo_storage')).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = os.getenv('PHOTO_STORAGE_BASE_URL', '/api/storage').rstrip('/')
+        # Internal nginx location aliased to the storage root; nginx then sends the file itself
+        self.accel_redirect_prefix = os.getenv('PHOTO_STORAGE_ACCEL_REDIRECT', '').rstrip('/')
+        self.signing_secret = os.getenv('STORAGE_SIGNING_SECRET')
+
+    def configure(self):
+        if self.signing_secret:
+            return
+        if os.getenv('STORAGE_SIGNING_DEV_MODE', 'false').lower() != 'true':
+            raise RuntimeError("STORAGE_SIGNING_SECRET is not set (set STORAGE_SIGNING_DEV_MODE=true to run without it locally)")
+        logger.warning("STORAGE_SIGNING_SECRET is not set; storage URLs are only valid in this process")
+        self.signing_secret = os.urandom(32).hex()
+
+    def path_for(self, public_id: str) -> Optional[Path]:
+        """Resolve a public ID inside the storage root, rejecting traversal"""
+        if not public_id.startswith("users/") or ".." in public_id.split("/"):
+            return None
+        path = (self.root / public_id).resolve()
+        return path if self.root in path.parents else None
+
+    def _write(self, path: Path, file_data: Union[bytes, BinaryIO]) -> Dict[str, Any]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as out:
+            if isinstance(file_data, (bytes, bytearray)):
+                out.write(file_data)
+            else:
+                copy_stream(file_data, out)
+        os.replace(tmp_path, path)
+
+        # Pillow only reads the header here
+        try:
+            with Image.open(path) as image:
+                width, height = image.size
+                image_format = (image.format or "").lower().replace("jpeg", "jpg")
+        except UnidentifiedImageError:
+            # e.g. HEIC without pillow-heif; the upload path has already checked the file type
+            with open(path, "rb") as f:
+                width, height, image_format = None, None, sniff_extension(f.read(16))
+        return {"width": width, "height": height, "format": image_format, "bytes": path.stat().st_size}
+
+    async def put(self, user_id, file_data, filename, order_id=None):
+        folder = self.folder_for(user_id, order_id)
+        public_id = f"{folder}/{self.name_for(filename)}"
+        try:
+            started = time.perf_counter()
+            info = await asyncio.get_running_loop().run_in_executor(
+                None, self._write, self.path_for(public_id), file_data
+            )
+            metrics.observe("local_storage.put", time.perf_counter() - started)
+            logger.info(f"Photo stored locally for user {user_id}: {public_id}")
+            return {
+                "success": True,
+                "public_id": public_id,
+                "secure_url": await self.sign(public_id, user_id),
+                "folder": folder,
+                **info,
+                "thumbnails": {},
+                "metadata": {
+                    "user_id": user_id,
+                    "order_id": order_id,
+                    "upload_date": datetime.now().isoformat(),
+                    "auto_delete_date": (datetime.now() + timedelta(days=self.auto_delete_days)).isoformat()
+                }
+            }
+        except Exception as e:
+            logger.error(f"Failed to store photo locally for user {user_id}: {str(e)}")
+            try:
+                self.path_for(public_id).unlink()
+            except (FileNotFoundError, AttributeError):
+                pass
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "Failed to upload photo. Please try again."
+            }
+
+    async def get(self, public_id):
+        path = self.path_for(public_id)
+        return path if path and path.is_file() else None
+
+    def content_type(self, path: Path) -> str:
+        """Stored files have no extension, so sniff the type from the header"""
+        with open(path, "rb") as f:
+            return CONTENT_TYPES[sniff_extension(f.read(16))]
+
+    async def delete(self, public_id, user_id):
+        if not public_id.startswith(f"users/{user_id}/"):
+            logger.warning(f"Unauthorized delete attempt: user {user_id} tried to delete {public_id}")
+            return False
+        return bool(await self.delete_many([public_id]))
+
+    async def delete_many(self, public_ids):
+        gone = []
+        for public_id in public_ids:
+            path = self.path_for(public_id)
+            if not path:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            gone.append(public_id)
+        return gone
+
+    def _walk(self, directory: Path, parts: Tuple[str, ...], prefix: str, after: Tuple[str, ...]) -> Iterator[Tuple[str, os.DirEntry]]:
+        """
+        Yield (public_id, entry) for files below a directory in path-part order, after a cursor
+
+        Subtrees that lie entirely before the cursor or outside the prefix are
+        never opened, so each page only touches the directories it returns from.
+        """
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            entry_parts = parts + (entry.name,)
+            public_id = "/".join(entry_parts)
+            if entry.is_dir(follow_symlinks=False):
+                folder = f"{public_id}/"
+                if not (folder.startswith(prefix) or prefix.startswith(folder)):
+                    continue
+                if entry_parts < after[:len(entry_parts)]:
+                    continue
+                yield from self._walk(Path(entry.path), entry_parts, prefix, after)
+            elif entry_parts > after and public_id.startswith(prefix):
+                yield public_id, entry
+
+    def _list_page(self, prefix: str, after: Optional[str], max_results: int) -> Dict[str, Any]:
+        resources = []
+        more = False
+        after_parts = tuple(after.split("/")) if after else ()
+        for public_id, entry in self._walk(self.root, (), prefix, after_parts):
+            if len(resources) == max_results:
+                more = True
+                break
+            stat = entry.stat()
+            resources.append({
+                "public_id": public_id,
+                "bytes": stat.st_size,
+                "folder": public_id.rsplit("/", 1)[0],
+                "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+        return {"resources": resources, "next_cursor": resources[-1]["public_id"] if more else None}
+
+    async def list(self, prefix="users/", next_cursor=None, max_results=500):
+        # The cursor is the last public ID of the previous page
+        return await asyncio.get_running_loop().run_in_executor(None, self._list_page, prefix, next_cursor, max_results)
+
+    def signature(self, public_id: str, expires_at: int) -> str:
+        self.configure()
+        return hmac.new(self.signing_secret.encode(), f"{public_id}:{expires_at}".encode(), hashlib.sha256).hexdigest()
+
+    def verify(self, public_id: str, expires_at: int, signature: str) -> bool:
+        """Check a signed storage URL"""
+        return expires_at >= time.time() and hmac.compare_digest(self.signature(public_id, expires_at), signature)
+
+    async def sign(self, public_id, user_id, expires_in_hours=4):
+        if not public_id.startswith(f"users/{user_id}/"):
+            logger.warning(f"Unauthorized access attempt: user {user_id} tried to access {public_id}")
+            return None
+        # Same expiry bucketing as the Cloudinary signer, so URLs stay cacheable
+        lifetime = expires_in_hours * 3600
+        refresh_every = max(int(lifetime * 0.75), 1)
+        expires_at = int(time.time()) // refresh_every * refresh_every + lifetime
+        return f"{self.base_url}/{public_id}?expires={expires_at}&signature={self.signature(public_id, expires_at)}"
+
+
+class S3StorageBackend(StorageBackend):
+    name = "s3"
+
+    def __init__(self):
+        """
+        Photo storage in an S3-compatible bucket (AWS S3, MinIO, R2, ...)
+
+        Configured with S3_BUCKET and optionally S3_ENDPOINT_URL and S3_REGION;
+        credentials come from the usual AWS environment variables or profile.
+        Thumbnails come from the local derivative pipeline.
+        """
+        # Only S3 deployments pay for importing boto3
+        import boto3
+
+        self.bucket = os.getenv('S3_BUCKET')
+        # boto3 clients are thread-safe, so one client serves the whole executor
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+            region_name=os.getenv('S3_REGION') or None
+        )
+
+    def configure(self):
+        if not self.bucket:
+            raise RuntimeError("S3_BUCKET is not set (required for PHOTO_STORAGE_BACKEND=s3)")
+
+    @staticmethod
+    def is_key(public_id: str) -> bool:
+        return public_id.startswith("users/") and ".." not in public_id.split("/")
+
+    def _upload(self, key: str, file_data: Union[bytes, BinaryIO]) -> Dict[str, Any]:
+        source = io.BytesIO(file_data) if isinstance(file_data, (bytes, bytearray)) else file_data
+        source.seek(0)
+        header = source.read(16)
+        source.seek(0)
+        # Pillow only reads the header here
+        try:
+            with Image.open(source) as image:
+                width, height = image.size
+                image_format = (image.format or "").lower().replace("jpeg", "jpg")
+        except UnidentifiedImageError:
+            width, height, image_format = None, None, sniff_extension(header)
+        size = source.seek(0, os.SEEK_END)
+        source.seek(0)
+        self.client.upload_fileobj(source, self.bucket, key,
+                                   ExtraArgs={"ContentType": CONTENT_TYPES[sniff_extension(header)]})
+        source.seek(0)
+        return {"width": width, "height": height, "format": image_format, "bytes": size}
+
+    async def put(self, user_id, file_data, filename, order_id=None):
+        folder = self.folder_for(user_id, order_id)
+        public_id = f"{folder}/{self.name_for(filename)}"
+        try:
+            started = time.perf_counter()
+            info = await asyncio.get_running_loop().run_in_executor(None, self._upload, public_id, file_data)
+            metrics.observe("s3_storage.put", time.perf_counter() - started)
+            logger.info(f"Photo stored in S3 for user {user_id}: {public_id}")
+            return {
+                "success": True,
+                "public_id": public_id,
+                "secure_url": await self.sign(public_id, user_id),
+                "folder": folder,
+                **info,
+                "thumbnails": {},
+                "metadata": {
+                    "user_id": user_id,
+                    "order_id": order_id,
+                    "upload_date": datetime.now().isoformat(),
+                    "auto_delete_date": (datetime.now() + timedelta(days=self.auto_delete_days)).isoformat()
+                }
+            }
+        except Exception as e:
+            logger.error(f"Failed to store photo in S3 for user {user_id}: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "Failed to upload photo. Please try again."
+            }
+
+    async def delete(self, public_id, user_id):
+        if not public_id.startswith(f"users/{user_id}/"):
+            logger.warning(f"Unauthorized delete attempt: user {user_id} tried to delete {public_id}")
+            return False
+        return bool(await self.delete_many([public_id]))
+
+    def _delete_objects(self, keys: List[str]) -> List[str]:
+        response = self.client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+        failed = {error["Key"] for error in response.get("Errors", [])}
+        for error in response.get("Errors", []):
+            logger.error(f"Failed to delete {error['Key']} from S3: {error.get('Message')}")
+        return [key for key in keys if key not in failed]
+
+    async def delete_many(self, public_ids):
+        keys = [public_id for public_id in public_ids if self.is_key(public_id)]
+        if not keys:
+            return []
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._delete_objects, keys)
+        except Exception as e:
+            logger.error(f"Failed to delete photos from S3: {str(e)}")
+            return []
+
+    def _list_page(self, prefix: str, next_cursor: Optional[str], max_results: int) -> Dict[str, Any]:
+        params = {"Bucket": self.bucket, "Prefix": prefix, "MaxKeys": max_results}
+        if next_cursor:
+            params["ContinuationToken"] = next_cursor
+        response = self.client.list_objects_v2(**params)
+        resources = [
+            {
+                "public_id": item["Key"],
+                "bytes": item["Size"],
+                "folder": item["Key"].rsplit("/", 1)[0],
+                "created_at": item["LastModified"].isoformat()
+            }
+            for item in response.get("Contents", [])
+        ]
+        return {"resources": resources, "next_cursor": response.get("NextContinuationToken") if response.get("IsTruncated") else None}
+
+    async def list(self, prefix="users/", next_cursor=None, max_results=500):
+        return await asyncio.get_running_loop().run_in_executor(None, self._list_page, prefix, next_cursor, max_results)
+
+    async def sign(self, public_id, user_id, expires_in_hours=4):
+        if not public_id.startswith(f"users/{user_id}/") or not self.is_key(public_id):
+            logger.warning(f"Unauthorized access attempt: user {user_id} tried to access {public_id}")
+            return None
+        # Presigning is a local HMAC computation, no request to S3
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": public_id},
+            ExpiresIn=expires_in_hours * 3600
+        )
+
+
+STORAGE_BACKENDS = {
+    "cloudinary": CloudinaryStorageBackend,
+    "local": LocalStorageBackend,
+    "s3": S3StorageBackend,
+}
+
+
+def get_storage_backend(name: Optional[str] = None) -> StorageBackend:
+    """
+    Build the storage backend selected by PHOTO_STORAGE_BACKEND
+
+    Args:
+        name: Backend name overriding the environment ("cloudinary", "local" or "s3")
+
+    Returns:
+        Configured storage backend
+    """
+    name = (name or os.getenv('PHOTO_STORAGE_BACKEND', 'cloudinary')).lower()
+    if name not in STORAGE_BACKENDS:
+        # Fail at startup rather than on every gallery load and background pass
+        raise ValueError(f"Unknown photo storage backend: {name} (use one of: {', '.join(STORAGE_BACKENDS)})")
+    logger.info(f"Using {name} photo storage backend")
+    return STORAGE_BACKENDS[name]()
+
+# Global instance
+storage_backend = get_storage_backend()
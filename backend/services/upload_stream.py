@@ -0,0 +1,77 @@
+import hashlib
+from typing import BinaryIO, Optional
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class UploadTooLargeError(ValueError):
+    def __init__(self, max_bytes: int):
+        """Raised mid-stream as soon as an upload passes its size limit"""
+        super().__init__(f"File size must be less than {max_bytes // (1024 * 1024)}MB")
+        self.max_bytes = max_bytes
+
+
+class HashingReader:
+    def __init__(self, source: BinaryIO, max_bytes: Optional[int] = None):
+        """
+        Read-only view over a caller-owned file that hashes and counts bytes as they are read
+
+        Consumers (disk copies, storage SDKs) pull the upload through this in
+        chunks, so the SHA-256 and the size limit are applied on the fly
+        without holding the whole file in memory. close() is a no-op because
+        the caller still owns the underlying file.
+
+        Args:
+            source: Readable, seekable file object positioned anywhere
+            max_bytes: Raise UploadTooLargeError once more than this has been read
+        """
+        self.source = source
+        self.max_bytes = max_bytes
+        self.name = getattr(source, "name", None)
+        self.rewind()
+
+    def rewind(self):
+        """Seek to the start and reset the running hash"""
+        self.source.seek(0)
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        block = self.source.read(size)
+        self.size += len(block)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+        self.hasher.update(block)
+        return block
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.source.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.source.tell()
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def copy_stream(source: BinaryIO, destination: BinaryIO, max_bytes: Optional[int] = None) -> HashingReader:
+    """
+    Copy a file object into another in fixed-size chunks
+
+    Returns:
+        The HashingReader used, carrying hexdigest() and size of what was copied
+    """
+    reader = HashingReader(source, max_bytes)
+    for block in iter(lambda: reader.read(STREAM_CHUNK_SIZE), b""):
+        destination.write(block)
+    source.seek(0)
+    return reader
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Fake Cloudinary server settings
+FAKE_HOST = "127.0.0.1"
+FAKE_PORT = 8765
+UPLOAD_DELAY_SECONDS = 0.3
+CONCURRENT_UPLOADS = 16
+
+os.environ["CLOUDINARY_UPLOAD_PREFIX"] = f"http://{FAKE_HOST}:{FAKE_PORT}"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "backend"))
+
+import cloudinary.uploader  # noqa: E402
+from services.cloudinary_service import cloudinary_service  # noqa: E402
+from services.metrics import metrics  # noqa: E402
+
+
+class FakeCloudinaryHandler(BaseHTTPRequestHandler):
+    """Answers every upload after a fixed delay, like a slow Cloudinary round trip"""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        time.sleep(UPLOAD_DELAY_SECONDS)
+        body = json.dumps({
+            "public_id": f"bench/{time.time_ns()}",
+            "secure_url": "https://res.cloudinary.com/demo/image/upload/sample.jpg",
+            "width": 2000,
+            "height": 2000,
+            "format": "jpg",
+            "bytes": length,
+            "eager": [{"secure_url": "https://res.cloudinary.com/demo/image/upload/sample.jpg"}] * 4
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def measure_other_endpoint(stop: asyncio.Event) -> list:
+    """Simulate a cheap endpoint that should answer in ~10ms and record its latency"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def run_scenario(name: str, upload) -> None:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(measure_other_endpoint(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(i) for i in range(CONCURRENT_UPLOADS)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    latencies = await probe
+
+    print(f"\n📊 {name}")
+    print(f"   {CONCURRENT_UPLOADS} uploads finished in {elapsed:.2f}s")
+    print(f"   Other endpoint latency: median {statistics.median(latencies):.1f}ms, "
+          f"max {max(latencies):.1f}ms over {len(latencies)} requests")
+
+
+async def main():
+    server = ThreadingHTTPServer((FAKE_HOST, FAKE_PORT), FakeCloudinaryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    payload = b"\xff\xd8" + os.urandom(256 * 1024)
+
+    print("🚀 CLOUDINARY EVENT LOOP BENCHMARK")
+    print("=" * 60)
+
+    async def blocking_upload(i):
+        # What the service used to do: call the SDK straight from the coroutine
+        cloudinary.uploader.upload(payload, public_id=f"blocking_{i}")
+
+    async def executor_upload(i):
+        result = await cloudinary_service.upload_user_photo("bench-user", payload, f"photo_{i}.jpg")
+        assert result["success"], result
+
+    await run_scenario("Direct SDK calls (blocking)", blocking_upload)
+    await run_scenario(f"Executor ({cloudinary_service.max_workers} workers)", executor_upload)
+
+    upload_stats = metrics.snapshot()["latency"].get("cloudinary.upload", {})
+    print(f"\n⏱️  Recorded cloudinary.upload latency: {upload_stats}")
+
+    server.shutdown()
+    cloudinary_service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
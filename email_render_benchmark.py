@@ -0,0 +1,86 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from jinja2 import Environment, BaseLoader
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "backend"))
+
+from services.email_service import EMAIL_TEMPLATES, HostingerEmailService  # noqa: E402
+
+ROUNDS = 2000
+
+CONTEXTS = {
+    "order_confirmation": {
+        "customer_name": "Priya Raman",
+        "customer_email": "priya@example.com",
+        "order_id": "ORD-20240601-0042",
+        "order_date": "June 01, 2024",
+        "total_amount": 2499,
+        "payment_method": "UPI",
+        "delivery_date": "June 06, 2024",
+        "delivery_address": "12 Race Course Road, Coimbatore",
+        "items": [{"name": f"Wooden Frame 12x16 #{i}", "quantity": 1, "price": 799} for i in range(3)]
+    },
+    "shipping_notification": {
+        "customer_name": "Priya Raman",
+        "order_id": "ORD-20240601-0042",
+        "courier_name": "Blue Dart",
+        "tracking_number": "BD123456789IN",
+        "expected_delivery": "June 06, 2024",
+        "tracking_url": "https://example.com/track?id=BD123456789IN&lang=en"
+    },
+    "admin_notification": {
+        "notification_title": "New order received",
+        "notification_message": "A new order needs processing",
+        "notification_type": "new_order",
+        "order_id": "ORD-20240601-0042",
+        "customer_name": "Priya Raman",
+        "amount": 2499,
+        "payment_method": "UPI",
+        "order_time": "10:42"
+    },
+    "welcome": {"user_name": "Priya Raman", "email": "priya@example.com"}
+}
+
+
+def time_renders(render) -> list:
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return timings
+
+
+def report(label: str, timings: list):
+    timings = sorted(timings)
+    print(f"      {label:<28} median {statistics.median(timings):8.1f}µs   p99 {timings[int(len(timings) * 0.99)]:8.1f}µs")
+
+
+def main():
+    print("✉️  EMAIL TEMPLATE RENDER BENCHMARK")
+    print("=" * 60)
+
+    # Previous behaviour: parse and compile the template source on every send
+    legacy_env = Environment(loader=BaseLoader())
+    service = HostingerEmailService()
+
+    for name, context in CONTEXTS.items():
+        print(f"\n📧 {name}")
+        report("from_string per send", time_renders(lambda: legacy_env.from_string(EMAIL_TEMPLATES[name]).render(**context)))
+        report("Precompiled registry", time_renders(lambda: service.render(name, context)))
+
+    # Service start-up cost, which the bytecode cache reduces on restarts
+    os.environ["EMAIL_TEMPLATE_CACHE_DIR"] = tempfile.mkdtemp(prefix="email_bytecode_")
+    print("\n🚀 Service init (compiles every template)")
+    for label in ("cold bytecode cache", "warm bytecode cache"):
+        started = time.perf_counter()
+        HostingerEmailService()
+        print(f"      {label:<28} {(time.perf_counter() - started) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1454,7 +1454,7 @@ const PhotoCustomizer = () => {
       description: `${sizes[selectedSize].name} with ${borderThickness}" border`,
       base_price: calculatePrice(),
       category: 'frames',
-      image_url: selectedImage.image_url || 'https://images.unsplash.com/photo-1513519245088-0e12902e5a38?auto=format&fit=crop&w=400&h=300',
+      image_url: selectedImage.image_url ? `${BACKEND_URL}${selectedImage.image_url}` : 'https://images.unsplash.com/photo-1513519245088-0e12902e5a38?auto=format&fit=crop&w=400&h=300',
       customOptions: {
         frameStyle: frameStyles[selectedFrame].name,
         size: sizes[selectedSize].name,
@@ -1600,7 +1600,7 @@ const PhotoCustomizer = () => {
                         }}
                       >
                         <img 
-                          src={`data:image/jpeg;base64,${selectedImage.image_data}`}
+                          src={`${BACKEND_URL}${selectedImage.image_url}`}
                           alt="Your photo preview in custom frame"
                           className="w-full h-full object-cover rounded shadow-lg"
                         />
@@ -24,6 +24,9 @@ import {
 
 const backendUrl = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
 
+// Local storage and thumbnail URLs are relative to the backend
+const resolveUrl = (url) => (url && url.startsWith('/') ? `${backendUrl}${url}` : url);
+
 export const CloudinaryPhotoUpload = ({ userId = 'user_123', orderId = null, onUploadSuccess = null, showGallery = true }) => {
   const [uploading, setUploading] = useState(false);
   const [photos, setPhotos] = useState([]);
@@ -170,7 +173,7 @@ export const CloudinaryPhotoUpload = ({ userId = 'user_123', orderId = null, onU
       );
 
       if (response.data.success) {
-        setMockupUrl(response.data.mockup_url);
+        setMockupUrl(resolveUrl(response.data.mockup_url));
         setShowMockupDialog(true);
         toast.success('✨ Mockup generated successfully!');
       } else {
@@ -302,11 +305,11 @@ export const CloudinaryPhotoUpload = ({ userId = 'user_123', orderId = null, onU
                   <div key={photo.photo_id} className="group relative">
                     <div className="aspect-square overflow-hidden rounded-lg border bg-gray-100">
                       <img
-                        src={photo.thumbnails?.medium || photo.secure_url}
+                        src={resolveUrl(photo.thumbnails?.medium || photo.secure_url)}
                         alt="Uploaded photo"
                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-200"
                         onError={(e) => {
-                          e.target.src = photo.secure_url; // Fallback to original if thumbnail fails
+                          e.target.src = resolveUrl(photo.secure_url); // Fallback to original if thumbnail fails
                         }}
                       />
                     </div>
@@ -317,7 +320,7 @@ export const CloudinaryPhotoUpload = ({ userId = 'user_123', orderId = null, onU
                       <Button
                         size="sm"
                         variant="secondary"
-                        onClick={() => window.open(photo.secure_url, '_blank')}
+                        onClick={() => window.open(resolveUrl(photo.secure_url), '_blank')}
                         className="bg-white bg-opacity-90 text-black hover:bg-opacity-100"
                       >
                         <Eye className="w-4 h-4" />
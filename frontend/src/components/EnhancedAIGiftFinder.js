@@ -1,5 +1,4 @@
 import React, { useState, useEffect } from "react";
-import axios from "axios";
 import { Button } from "./ui/button";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "./ui/card";
 import { Badge } from "./ui/badge";
@@ -250,46 +249,102 @@ export const EnhancedAIGiftFinder = () => {
       }
     }, 600);
 
+    // Catalog products ranked by the backend, sent in the stream's "start" event
+    let catalogSuggestions = [];
+    const toCatalogSuggestion = (recommendation) => ({
+      product: {
+        id: recommendation.product_id,
+        name: recommendation.name,
+        description: 'Picked from our catalog for your answers',
+        base_price: recommendation.base_price,
+        image_url: recommendation.image_url,
+        category: recommendation.category
+      },
+      reasoning: recommendation.reasons.length > 0
+        ? recommendation.reasons.join('. ')
+        : 'Ranked against your quiz answers from our product catalog',
+      confidence: recommendation.confidence,
+      aiTag: '🛍️ From Our Catalog'
+    });
+
+    const showLlmResponse = (stringResponse) => {
+      // Convert string response to structured format for display
+      setSuggestions([
+        {
+          product: {
+            id: 'ai-llm-suggestion-1',
+            name: 'AI Recommended Gift Set',
+            description: 'Personalized gifts curated by our AI based on your preferences',
+            base_price: 899,
+            image_url: 'https://images.unsplash.com/photo-1513519245088-0e12902e5a38?auto=format&fit=crop&w=400&h=300',
+            category: 'ai-curated'
+          },
+          reasoning: 'Our AI analyzed your preferences and suggests these personalized options',
+          confidence: 92,
+          aiTag: '🤖 AI Curated Selection',
+          llmResponse: stringResponse
+        },
+        ...catalogSuggestions
+      ]);
+    };
+
     try {
-      // Try backend AI first
-      const response = await axios.post(`${API}/gift-suggestions`, {
-        answers: userAnswers,
-        contextual: true,
-        aiEnhanced: true,
-        previewPhoto: previewPhoto ? {
-          url: previewPhoto.url,
-          dimensions: previewPhoto.dimensions,
-          analysis: previewPhoto.analysis
-        } : null
+      // Try backend AI first, rendering the text as it streams in
+      const response = await fetch(`${API}/gift-suggestions/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          answers: userAnswers,
+          contextual: true,
+          aiEnhanced: true,
+          previewPhoto: previewPhoto ? {
+            url: previewPhoto.url,
+            dimensions: previewPhoto.dimensions,
+            analysis: previewPhoto.analysis
+          } : null
+        })
       });
-      
-      if (response.data.suggestions) {
-        // Check if suggestions is a string (LLM response) or array (structured)
-        if (typeof response.data.suggestions === 'string') {
-          // Convert string response to structured format for display
-          const stringResponse = response.data.suggestions;
-          const mockStructuredSuggestions = [
-            {
-              product: {
-                id: 'ai-llm-suggestion-1',
-                name: 'AI Recommended Gift Set',
-                description: 'Personalized gifts curated by our AI based on your preferences',
-                base_price: 899,
-                image_url: 'https://images.unsplash.com/photo-1513519245088-0e12902e5a38?auto=format&fit=crop&w=400&h=300',
-                category: 'ai-curated'
-              },
-              reasoning: 'Our AI analyzed your preferences and suggests these personalized options',
-              confidence: 92,
-              aiTag: '🤖 AI Curated Selection',
-              llmResponse: stringResponse
+      if (!response.ok || !response.body) {
+        throw new Error(`Suggestion stream failed with status ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let stringResponse = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          const lines = rawEvent.split('\n');
+          const eventName = (lines.find(line => line.startsWith('event: ')) || '').slice(7);
+          const dataLine = lines.find(line => line.startsWith('data: '));
+          if (!dataLine) continue;
+          if (eventName === 'start') {
+            const { recommendations = [] } = JSON.parse(dataLine.slice(6));
+            catalogSuggestions = recommendations.map(toCatalogSuggestion);
+            if (catalogSuggestions.length > 0) {
+              // Show the products straight away; the AI text joins them as it streams in
+              clearInterval(thinkingInterval);
+              setIsLoading(false);
+              setSuggestions(catalogSuggestions);
             }
-          ];
-          setSuggestions(mockStructuredSuggestions);
-        } else {
-          // Handle array of structured suggestions
-          setSuggestions(response.data.suggestions);
+            continue;
+          }
+          if (eventName !== 'token' && eventName !== 'replace') continue;
+          const data = JSON.parse(dataLine.slice(6));
+          // "replace" swaps partial model output for the server's fallback text
+          stringResponse = eventName === 'replace' ? data.text : stringResponse + data.text;
+          clearInterval(thinkingInterval);
+          setIsLoading(false);
+          showLlmResponse(stringResponse);
         }
-      } else {
+      }
+
+      if (!stringResponse && catalogSuggestions.length === 0) {
         throw new Error('No backend suggestions');
       }
     } catch (error) {
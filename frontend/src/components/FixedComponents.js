@@ -330,7 +330,7 @@ export const EnhancedPhotoCustomizer = () => {
                         }}
                       >
                         <img 
-                          src={`data:image/jpeg;base64,${selectedImage.image_data}`}
+                          src={`${BACKEND_URL}${selectedImage.image_url}`}
                           alt="Your photo preview in custom frame"
                           className="w-full h-full object-cover rounded shadow-lg"
                         />
@@ -26,6 +26,9 @@ import {
 
 const API_BASE = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
 
+// Review photos are served from the backend blob store (/api/blobs/...) or are legacy data URLs
+const resolveUrl = (url) => (url && url.startsWith('/') ? `${API_BASE}${url}` : url);
+
 export const FixedReviewSystem = () => {
   const [reviews, setReviews] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -600,12 +603,12 @@ export const FixedReviewSystem = () => {
                     {review.photos.map((photo, index) => (
                       <img
                         key={index}
-                        src={photo}
+                        src={resolveUrl(photo)}
                         alt={`Review photo ${index + 1}`}
                         className="w-full h-20 object-cover rounded cursor-pointer hover:opacity-80 transition-opacity"
                         onClick={() => {
                           // Open photo in modal/lightbox
-                          window.open(photo, '_blank');
+                          window.open(resolveUrl(photo), '_blank');
                         }}
                       />
                     ))}
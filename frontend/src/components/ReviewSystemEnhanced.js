@@ -27,6 +27,9 @@ import {
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Review photos are served from the backend blob store (/api/blobs/...) or are legacy data URLs
+const resolveUrl = (url) => (url && url.startsWith('/') ? `${BACKEND_URL}${url}` : url);
+
 export const ReviewSystemEnhanced = () => {
   const [reviews, setReviews] = useState([]);
   const [reviewStats, setReviewStats] = useState({
@@ -389,7 +392,7 @@ export const ReviewSystemEnhanced = () => {
                           {review.photos.slice(0, 2).map((photo, index) => (
                             <img 
                               key={index}
-                              src={photo} 
+                              src={resolveUrl(photo)} 
                               alt={`Review ${index + 1}`}
                               className="w-12 h-12 object-cover rounded-md shadow-sm"
                             />
@@ -0,0 +1,88 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "backend"))
+
+from services.gift_recommender import GiftRecommender, encode_quiz  # noqa: E402
+
+CATALOG_SIZES = (100, 1000, 10000)
+QUERIES = 500
+TOP_K = 4
+
+CATEGORIES = ("frames", "acrylic", "mugs", "t-shirts", "corporate")
+WORDS = ("wooden", "acrylic", "led", "photo", "heart", "couple", "coffee", "mug", "premium", "modern",
+         "classic", "creative", "family", "branding", "office", "handcrafted", "crystal", "colorful")
+
+QUIZZES = [
+    {"occasion": "anniversary", "recipient": "romantic_partner", "budget": "premium",
+     "interests": [], "style_preference": "modern_trendy"},
+    {"occasion": "corporate", "recipient": "colleague", "budget": "mid_range", "interests": ["Professional"]},
+    {"occasion": "Birthday", "recipient": "Friend", "budget": "₹200-500", "interests": ["coffee", "art"]},
+    {"occasion": "wedding", "recipient": "Sister", "budget": "luxury", "interests": ["photography", "classic"]},
+]
+
+
+def make_catalog(size: int):
+    rng = random.Random(size)
+    return [
+        {
+            "id": f"product-{i}",
+            "name": f"Product {i}",
+            "description": " ".join(rng.sample(WORDS, 4)),
+            "category": rng.choice(CATEGORIES),
+            "base_price": float(rng.randint(150, 4000)),
+            "stock_quantity": rng.randint(0, 50),
+        }
+        for i in range(size)
+    ]
+
+
+def rank_per_product(recommender: GiftRecommender, quiz, top_k: int):
+    """Baseline: score one product at a time in Python, then sort"""
+    quiz_vector = encode_quiz(quiz).tolist()
+    scored = []
+    for row, product in enumerate(recommender._catalog):
+        product_vector = recommender._matrix[row].tolist()
+        scored.append((sum(p * q for p, q in zip(product_vector, quiz_vector)), product["id"]))
+    scored.sort(key=lambda item: -item[0])
+    return [product_id for _, product_id in scored[:top_k]]
+
+
+def main():
+    print("🎁 GIFT RECOMMENDER BENCHMARK")
+    print("=" * 60)
+    print(f"{QUERIES} quizzes per catalog size, top {TOP_K}\n")
+
+    for size in CATALOG_SIZES:
+        recommender = GiftRecommender(None)
+        started = time.perf_counter()
+        recommender.build(make_catalog(size))
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for i in range(QUERIES):
+            vectorized = recommender.rank(QUIZZES[i % len(QUIZZES)], TOP_K)
+        vectorized_ms = (time.perf_counter() - started) * 1000 / QUERIES
+
+        started = time.perf_counter()
+        for i in range(QUERIES):
+            baseline = rank_per_product(recommender, QUIZZES[i % len(QUIZZES)], TOP_K)
+        baseline_ms = (time.perf_counter() - started) * 1000 / QUERIES
+
+        same_scores = np.allclose(
+            [item["score"] for item in vectorized],
+            sorted((recommender._matrix @ encode_quiz(QUIZZES[(QUERIES - 1) % len(QUIZZES)])).tolist(), reverse=True)[:TOP_K],
+            atol=1e-3
+        )
+        print(f"   {len(recommender._catalog):>6} products in stock (encoded in {build_ms:7.1f}ms)")
+        print(f"      Per-product Python loop   {baseline_ms:8.3f} ms/query")
+        print(f"      NumPy matrix product      {vectorized_ms:8.3f} ms/query   "
+              f"({baseline_ms / vectorized_ms:5.1f}x, top-k matches: {same_scores and len(baseline) == len(vectorized)})\n")
+
+
+if __name__ == "__main__":
+    main()
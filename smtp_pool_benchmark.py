@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+import logging
+import time
+from email.mime.text import MIMEText
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+SMTP_PORT = 8025
+# Simulated network round trip for each greeting/EHLO, like a remote SMTP server
+HANDSHAKE_DELAY_SECONDS = 0.02
+MESSAGES = 200
+CONCURRENCY = 10
+
+# aiosmtpd logs a deprecation warning for every AUTH
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+os.environ.update({
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": str(SMTP_PORT),
+    "SMTP_START_TLS": "false",
+    "EMAIL_PASSWORD": "benchmark",
+})
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "backend"))
+
+from services.email_service import HostingerEmailService  # noqa: E402
+from services.metrics import metrics  # noqa: E402
+
+
+class SlowHandshakeHandler:
+    """Accepts every message, but makes each new session pay a handshake delay"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(HANDSHAKE_DELAY_SECONDS)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def accept_any_login(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def build_message(i: int) -> MIMEText:
+    message = MIMEText(f"<p>Order #{i} confirmed</p>", "html")
+    message["Subject"] = f"Order Confirmed - #{i}"
+    message["From"] = "admin@memoriesngifts.com"
+    message["To"] = f"customer{i}@example.com"
+    return message
+
+
+async def run_scenario(name: str, send) -> None:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def send_one(i):
+        async with semaphore:
+            await send(build_message(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send_one(i) for i in range(MESSAGES)))
+    elapsed = time.perf_counter() - started
+    print(f"   {name:<36} {elapsed:6.2f}s   {MESSAGES / elapsed:7.1f} msgs/sec")
+
+
+async def main():
+    handler = SlowHandshakeHandler()
+    controller = Controller(
+        handler,
+        hostname="127.0.0.1",
+        port=SMTP_PORT,
+        authenticator=accept_any_login,
+        auth_require_tls=False
+    )
+    controller.start()
+
+    print("📨 SMTP CONNECTION POOL BENCHMARK")
+    print("=" * 60)
+    print(f"{MESSAGES} messages, {CONCURRENCY} concurrent senders, {HANDSHAKE_DELAY_SECONDS * 1000:.0f}ms handshake\n")
+
+    async def connection_per_message(message):
+        # Previous behaviour: connect + EHLO + AUTH for every email
+        await aiosmtplib.send(
+            message,
+            hostname="127.0.0.1",
+            port=SMTP_PORT,
+            start_tls=False,
+            username="admin@memoriesngifts.com",
+            password="benchmark",
+        )
+
+    service = HostingerEmailService()
+    try:
+        await run_scenario("aiosmtplib.send per message", connection_per_message)
+        await run_scenario(f"Pooled sessions (size {service.smtp_pool.size})", service.smtp_pool.send)
+    finally:
+        await service.shutdown()
+        controller.stop()
+
+    snapshot = metrics.snapshot()["counters"]
+    print(f"\n   Pool opened {snapshot.get('smtp.connections_opened', 0)} connections, "
+          f"reused them {snapshot.get('smtp.connections_reused', 0)} times")
+    print(f"   Server received {handler.received} messages")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The services are imported the way server.py imports them ("from services...")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
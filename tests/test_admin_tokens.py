@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from services import admin_tokens
+from services.admin_tokens import AdminTokenSigner, TokenRevocationList, InvalidAdminTokenError, is_signed_token
+
+ADMIN = {"id": "admin-1", "email": "admin@example.com", "name": "Admin", "permissions": ["orders", "admins"]}
+
+
+@pytest.fixture
+def signer():
+    return AdminTokenSigner(secret="test-secret")
+
+
+def test_issued_token_verifies(signer):
+    token, payload = signer.issue(ADMIN)
+    assert is_signed_token(token)
+    verified = signer.verify(token)
+    assert verified == payload
+    assert verified["sub"] == "admin-1"
+    assert verified["perm"] == ["orders", "admins"]
+    assert verified["exp"] - verified["iat"] == signer.ttl_seconds
+
+
+def test_every_token_has_its_own_id(signer):
+    assert signer.issue(ADMIN)[1]["jti"] != signer.issue(ADMIN)[1]["jti"]
+
+
+def test_tampered_payload_is_rejected(signer):
+    token, _ = signer.issue(ADMIN)
+    version, body, signature = token.split(".")
+    other, _ = signer.issue({**ADMIN, "permissions": ["orders", "admins", "settings"]})
+    with pytest.raises(InvalidAdminTokenError):
+        signer.verify(f"{version}.{other.split('.')[1]}.{signature}")
+
+
+def test_token_from_another_secret_is_rejected(signer):
+    token, _ = AdminTokenSigner(secret="other-secret").issue(ADMIN)
+    with pytest.raises(InvalidAdminTokenError):
+        signer.verify(token)
+
+
+@pytest.mark.parametrize("token", ["", "v1.abc", "v2.e30.c2ln", "v1.!!!.???", "opaque-session-token"])
+def test_malformed_tokens_are_rejected(signer, token):
+    with pytest.raises(InvalidAdminTokenError):
+        signer.verify(token)
+
+
+def test_expired_token_is_rejected(signer, monkeypatch):
+    token, payload = signer.issue(ADMIN)
+    monkeypatch.setattr(admin_tokens.time, "time", lambda: payload["exp"])
+    with pytest.raises(InvalidAdminTokenError, match="expired"):
+        signer.verify(token)
+
+
+def test_missing_secret_fails_at_configure_outside_dev_mode(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN_SECRET", raising=False)
+    monkeypatch.delenv("ADMIN_TOKEN_DEV_MODE", raising=False)
+    signer = AdminTokenSigner()
+    with pytest.raises(RuntimeError):
+        signer.configure()
+
+    monkeypatch.setenv("ADMIN_TOKEN_DEV_MODE", "true")
+    signer.configure()
+    token, _ = signer.issue(ADMIN)
+    assert signer.verify(token)["sub"] == "admin-1"
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for TokenRevocationList"""
+
+    def __init__(self):
+        self.documents = []
+
+    async def update_one(self, query, update, upsert=False):
+        for document in self.documents:
+            if all(document.get(key) == value for key, value in query.items()):
+                document.update(update["$set"])
+                return
+        self.documents.append({**query, **update["$set"]})
+
+    def find(self, query, projection=None):
+        async def cursor():
+            for document in list(self.documents):
+                yield dict(document)
+        return cursor()
+
+
+def test_revoking_one_token_leaves_the_others(signer):
+    revocations = TokenRevocationList(FakeCollection(), signer.ttl_seconds)
+    _, first = signer.issue(ADMIN)
+    _, second = signer.issue(ADMIN)
+    asyncio.run(revocations.revoke(first))
+    assert revocations.is_revoked(first)
+    assert not revocations.is_revoked(second)
+
+
+def test_revoking_an_admin_covers_tokens_issued_until_then(signer):
+    revocations = TokenRevocationList(FakeCollection(), signer.ttl_seconds)
+    _, earlier = signer.issue(ADMIN)
+    asyncio.run(revocations.revoke_admin("admin-1"))
+    assert revocations.is_revoked(earlier)
+    assert not revocations.is_revoked({**earlier, "jti": "later", "iat": time.time() + 5})
+    assert not revocations.is_revoked({**earlier, "sub": "admin-2"})
+
+
+def test_revocations_are_shared_through_the_collection(signer):
+    collection = FakeCollection()
+    _, payload = signer.issue(ADMIN)
+    asyncio.run(TokenRevocationList(collection, signer.ttl_seconds).revoke(payload))
+    asyncio.run(TokenRevocationList(collection, signer.ttl_seconds).revoke_admin("admin-2"))
+
+    other_worker = TokenRevocationList(collection, signer.ttl_seconds)
+    assert not other_worker.is_revoked(payload)
+    asyncio.run(other_worker.refresh())
+    assert other_worker.is_revoked(payload)
+    assert other_worker.is_revoked({**payload, "jti": "x", "sub": "admin-2"})
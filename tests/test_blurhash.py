@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from services.blurhash import encode_blurhash, components_for, SAMPLE_SIZE
+
+reference = pytest.importorskip("blurhash")
+
+
+def noise_image(width, height, seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height))
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(width * height)])
+    return image
+
+
+def gradient_image(width, height):
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    y = np.linspace(0, 255, height, dtype=np.uint8)
+    pixels = np.stack([np.tile(x, (height, 1)), np.tile(y[:, None], (1, width)), np.full((height, width), 96, np.uint8)], axis=2)
+    return Image.fromarray(pixels, "RGB")
+
+
+@pytest.mark.parametrize("image, components", [
+    (gradient_image(SAMPLE_SIZE, 24), (4, 3)),
+    (gradient_image(20, SAMPLE_SIZE), (3, 4)),
+    (noise_image(16, 16, seed=1), (4, 4)),
+    (noise_image(SAMPLE_SIZE, SAMPLE_SIZE, seed=2), (9, 9)),
+    (Image.new("RGB", (8, 8), (200, 30, 60)), (1, 1)),
+])
+def test_matches_the_reference_encoder(image, components):
+    # Images no larger than the sample size are encoded without downsampling
+    expected = reference.encode(np.asarray(image), *components)
+    assert encode_blurhash(image, *components) == expected
+
+
+def test_large_images_stay_close_to_the_full_resolution_hash():
+    image = gradient_image(640, 480)
+    expected = reference.encode(np.asarray(image), 4, 3)
+    actual = encode_blurhash(image, 4, 3)
+    assert len(actual) == len(expected)
+    # Same size flag and a DC (average colour) term within rounding of the sample
+    assert actual[0] == expected[0]
+    assert actual[2:6] == expected[2:6]
+
+
+def test_components_follow_the_aspect_ratio():
+    assert components_for(1200, 800) == (4, 3)
+    assert components_for(800, 1200) == (3, 4)
+
+
+def test_non_rgb_images_are_converted():
+    image = gradient_image(SAMPLE_SIZE, SAMPLE_SIZE).convert("RGBA")
+    assert encode_blurhash(image, 4, 4) == encode_blurhash(image.convert("RGB"), 4, 4)
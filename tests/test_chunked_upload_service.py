@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from services.chunked_upload_service import ChunkedUploadService, ChunkedUploadError
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_SPOOL_DIR", str(tmp_path))
+    return ChunkedUploadService()
+
+
+async def chunks(*pieces):
+    for piece in pieces:
+        yield piece
+
+
+def start(service, sha256=None):
+    return asyncio.run(service.init_upload("user-1", "photo.jpg", "image/jpeg", len(DATA), sha256=sha256))
+
+
+def test_init_rejects_non_images_and_bad_sizes(service):
+    with pytest.raises(ChunkedUploadError):
+        asyncio.run(service.init_upload("user-1", "notes.txt", "text/plain", 10))
+    with pytest.raises(ChunkedUploadError):
+        asyncio.run(service.init_upload("user-1", "photo.jpg", "image/jpeg", service.max_upload_size + 1))
+
+
+def test_sessions_belong_to_their_user(service):
+    manifest = start(service)
+    with pytest.raises(ChunkedUploadError) as error:
+        asyncio.run(service.get_session(manifest["upload_id"], "user-2"))
+    assert error.value.status_code == 404
+
+
+def test_chunks_advance_the_offset(service):
+    upload_id = start(service)["upload_id"]
+    first = asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA[:4000])))
+    assert first["offset"] == 4000
+    second = asyncio.run(service.append_chunk(upload_id, "user-1", 4000, chunks(DATA[4000:7000], DATA[7000:])))
+    assert second["offset"] == len(DATA)
+    assert asyncio.run(service.get_session(upload_id, "user-1"))["offset"] == len(DATA)
+
+
+def test_wrong_offset_reports_the_server_offset(service):
+    upload_id = start(service)["upload_id"]
+    asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA[:1000])))
+    with pytest.raises(ChunkedUploadError) as error:
+        asyncio.run(service.append_chunk(upload_id, "user-1", 500, chunks(DATA[500:1500])))
+    assert error.value.status_code == 409
+    assert error.value.offset == 1000
+
+
+def test_bad_chunk_checksum_keeps_the_old_offset(service):
+    upload_id = start(service)["upload_id"]
+    with pytest.raises(ChunkedUploadError):
+        asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA[:1000]), checksum="0" * 64))
+    assert asyncio.run(service.get_session(upload_id, "user-1"))["offset"] == 0
+
+    checksum = hashlib.sha256(DATA[:1000]).hexdigest()
+    manifest = asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA[:1000]), checksum=checksum))
+    assert manifest["offset"] == 1000
+
+
+def test_chunk_past_the_declared_size_is_rejected(service):
+    upload_id = start(service)["upload_id"]
+    with pytest.raises(ChunkedUploadError) as error:
+        asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA, b"extra")))
+    assert error.value.status_code == 413
+    assert asyncio.run(service.get_session(upload_id, "user-1"))["offset"] == 0
+
+
+def test_complete_needs_every_byte(service):
+    upload_id = start(service)["upload_id"]
+    asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA[:100])))
+
+    async def store(manifest):
+        return {"photo_id": "photo-1"}
+
+    with pytest.raises(ChunkedUploadError) as error:
+        asyncio.run(service.complete(upload_id, "user-1", store))
+    assert error.value.status_code == 409
+    assert error.value.offset == 100
+
+
+def test_complete_checks_the_file_checksum(service):
+    upload_id = start(service, sha256="f" * 64)["upload_id"]
+    asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA)))
+
+    async def store(manifest):
+        return {"photo_id": "photo-1"}
+
+    with pytest.raises(ChunkedUploadError) as error:
+        asyncio.run(service.complete(upload_id, "user-1", store))
+    assert error.value.status_code == 422
+
+
+def test_concurrent_completes_on_two_workers_store_once(service):
+    # A second instance over the same spool stands in for another worker process
+    other_worker = ChunkedUploadService()
+    upload_id = start(service, sha256=hashlib.sha256(DATA).hexdigest())["upload_id"]
+    asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA)))
+    stored = []
+
+    async def store(manifest):
+        with open(manifest["data_path"], "rb") as spool:
+            stored.append(spool.read())
+        await asyncio.sleep(0.3)
+        return {"photo_id": "photo-1"}
+
+    async def main():
+        return await asyncio.gather(*(
+            worker.complete(upload_id, "user-1", store) for worker in (service, other_worker, service, other_worker)
+        ))
+
+    results = asyncio.run(main())
+    assert stored == [DATA]
+    assert results == [{"photo_id": "photo-1"}] * 4
+    # Repeated later, the result is remembered
+    assert asyncio.run(other_worker.complete(upload_id, "user-1", store)) == {"photo_id": "photo-1"}
+    assert len(stored) == 1
+
+
+def test_failed_store_can_be_retried(service):
+    upload_id = start(service)["upload_id"]
+    asyncio.run(service.append_chunk(upload_id, "user-1", 0, chunks(DATA)))
+
+    async def broken(manifest):
+        raise RuntimeError("storage down")
+
+    async def store(manifest):
+        return {"photo_id": "photo-1"}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.complete(upload_id, "user-1", broken))
+    assert asyncio.run(service.complete(upload_id, "user-1", store)) == {"photo_id": "photo-1"}
+
+
+def test_discard_removes_the_session(service):
+    upload_id = start(service)["upload_id"]
+    asyncio.run(service.discard(upload_id))
+    with pytest.raises(ChunkedUploadError):
+        asyncio.run(service.get_session(upload_id, "user-1"))
+    assert list(service.spool_dir.iterdir()) == []
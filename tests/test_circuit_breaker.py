@@ -0,0 +1,73 @@
+import time
+
+from services.circuit_breaker import CircuitBreaker
+
+
+def failing_breaker(**kwargs):
+    breaker = CircuitBreaker("test.breaker", error_rate_threshold=0.5, window=10, min_calls=4, **kwargs)
+    for _ in range(4):
+        breaker.record_failure()
+    return breaker
+
+
+def test_stays_closed_until_min_calls():
+    breaker = CircuitBreaker("test.breaker", error_rate_threshold=0.5, window=10, min_calls=4)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_opens_at_the_error_rate_threshold():
+    breaker = CircuitBreaker("test.breaker", error_rate_threshold=0.5, window=10, min_calls=4)
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_old_outcomes_leave_the_window():
+    breaker = CircuitBreaker("test.breaker", error_rate_threshold=0.5, window=4, min_calls=4)
+    for _ in range(3):
+        breaker.record_failure()
+    for _ in range(4):
+        breaker.record_success()
+    assert breaker.error_rate == 0.0
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = failing_breaker(reset_seconds=0.01)
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = failing_breaker(reset_seconds=0.01)
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.error_rate == 0.0
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker = failing_breaker(reset_seconds=0.05)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_released_probe_can_be_retried():
+    breaker = failing_breaker(reset_seconds=0.01)
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from services import cloudinary_service as cloudinary_module
+from services.cloudinary_service import CloudinaryService
+
+REFRESH_EVERY = int(4 * 3600 * 0.75)
+# Start of an expiry bucket for 4-hour URLs
+START = 1_800_000_000 // REFRESH_EVERY * REFRESH_EVERY
+
+
+@pytest.fixture
+def service():
+    service = CloudinaryService()
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [START]
+    monkeypatch.setattr(cloudinary_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def signed(monkeypatch):
+    calls = []
+
+    def fake_cloudinary_url(public_id, **options):
+        calls.append(options["expires_at"])
+        return f"https://res.cloudinary.com/{public_id}?expires={options['expires_at']}&n={len(calls)}", options
+
+    monkeypatch.setattr(cloudinary_module.cloudinary.utils, "cloudinary_url", fake_cloudinary_url)
+    return calls
+
+
+def sign(service, public_id="users/u1/photos/a", hours=4):
+    return asyncio.run(service.generate_signed_url(public_id, "u1", hours))
+
+
+def test_url_is_reused_within_a_bucket(service, clock, signed):
+    first = sign(service)
+    clock[0] += REFRESH_EVERY - 1
+    assert sign(service) == first
+    assert len(signed) == 1
+
+
+def test_url_keeps_at_least_a_quarter_of_its_lifetime(service, clock, signed):
+    lifetime = 4 * 3600
+    for offset in (0, 5000, 10799, 10800, 20000):
+        clock[0] = START + offset
+        sign(service)
+        assert signed[-1] - clock[0] >= lifetime // 4
+
+
+def test_new_url_once_the_bucket_rolls_over(service, clock, signed):
+    first = sign(service)
+    clock[0] += REFRESH_EVERY
+    second = sign(service)
+    assert second != first
+    assert signed[1] - signed[0] == REFRESH_EVERY
+
+
+def test_lifetimes_and_photos_are_cached_separately(service, clock, signed):
+    sign(service, hours=4)
+    sign(service, hours=1)
+    sign(service, public_id="users/u1/photos/b")
+    assert len(signed) == 3
+
+
+def test_other_users_photos_are_not_signed(service, clock, signed):
+    assert asyncio.run(service.generate_signed_url("users/u2/photos/a", "u1")) is None
+    assert signed == []
@@ -0,0 +1,161 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from pymongo import ReturnDocument
+
+from services.email_outbox import EmailOutbox
+from services.retention_service import as_utc
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class LeaseCollection:
+    """
+    mongomock re-applies the query to the updated document for
+    ReturnDocument.AFTER (and so returns None once the lease moves
+    available_at into the future); fetch the updated document by _id instead
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=ReturnDocument.BEFORE, **kwargs):
+        before = await self._collection.find_one_and_update(query, update, return_document=ReturnDocument.BEFORE, **kwargs)
+        if before is None or return_document is not ReturnDocument.AFTER:
+            return before
+        return await self._collection.find_one({"_id": before["_id"]}, projection)
+
+
+class FakeSender:
+    def __init__(self):
+        self.results = []
+        self.sent = []
+
+    async def send(self, payload, strict=False):
+        outcome = self.results.pop(0) if self.results else True
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome:
+            self.sent.append(payload)
+        return outcome
+
+    send_order_confirmation = send_shipping_notification = send_admin_notification = send
+    send_welcome_email = send_date_reminder = send
+
+
+@pytest.fixture
+def sender():
+    return FakeSender()
+
+
+@pytest.fixture
+def outbox(sender, monkeypatch):
+    monkeypatch.setenv("EMAIL_OUTBOX_LEASE_SECONDS", "120")
+    monkeypatch.setenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "3")
+    monkeypatch.setenv("EMAIL_OUTBOX_RETRY_BASE_SECONDS", "30")
+    monkeypatch.setenv("EMAIL_OUTBOX_RETRY_MAX_SECONDS", "100")
+    collection = mongomock_motor.AsyncMongoMockClient()["test"].email_outbox
+    return EmailOutbox(LeaseCollection(collection), sender=sender)
+
+
+def stored(outbox, message_id):
+    return asyncio.run(outbox.collection.find_one({"id": message_id}, {"_id": 0}))
+
+
+def expire_lease(outbox, message_id):
+    asyncio.run(outbox.collection.update_one(
+        {"id": message_id}, {"$set": {"available_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+    ))
+
+
+def test_claim_leases_the_message(outbox):
+    message = asyncio.run(outbox.enqueue("welcome", {"email": "a@example.com"}))
+    claimed = asyncio.run(outbox.claim())
+    assert claimed["id"] == message["id"]
+    assert claimed["status"] == "sending"
+    assert claimed["attempts"] == 1
+    assert claimed["lease_owner"] == outbox.owner
+    lease_left = (as_utc(claimed["available_at"]) - datetime.now(timezone.utc)).total_seconds()
+    assert 100 < lease_left <= 120
+    # Leased messages are not handed out twice
+    assert asyncio.run(outbox.claim()) is None
+
+
+def test_delayed_messages_wait_until_due(outbox):
+    asyncio.run(outbox.enqueue("welcome", {"email": "a@example.com"}, delay_seconds=60))
+    assert asyncio.run(outbox.claim()) is None
+
+
+def test_unknown_kind_is_rejected(outbox):
+    with pytest.raises(ValueError):
+        asyncio.run(outbox.enqueue("newsletter", {}))
+
+
+def test_expired_lease_is_claimed_again_and_the_old_holder_cannot_settle(outbox, sender):
+    message = asyncio.run(outbox.enqueue("welcome", {"email": "a@example.com"}))
+    first = asyncio.run(outbox.claim())
+    expire_lease(outbox, message["id"])
+    second = asyncio.run(outbox.claim())
+    assert second["attempts"] == 2
+    assert second["lease_id"] != first["lease_id"]
+
+    asyncio.run(outbox.deliver(first))
+    assert stored(outbox, message["id"])["status"] == "sending"
+    asyncio.run(outbox.deliver(second))
+    assert stored(outbox, message["id"])["status"] == "sent"
+
+
+def test_successful_delivery_finishes_the_message_and_runs_the_hook(outbox, sender):
+    delivered = []
+
+    async def hook(message):
+        delivered.append(message["id"])
+
+    outbox.on_sent("welcome", hook)
+    message = asyncio.run(outbox.enqueue("welcome", {"email": "a@example.com"}))
+    assert asyncio.run(outbox.deliver(asyncio.run(outbox.claim())))
+    row = stored(outbox, message["id"])
+    assert row["status"] == "sent"
+    assert row["finished_at"]
+    assert "lease_id" not in row
+    assert delivered == [message["id"]]
+    assert sender.sent == [{"email": "a@example.com"}]
+
+
+def test_failed_delivery_backs_off_exponentially(outbox, sender):
+    sender.results = [ConnectionError("smtp down"), False]
+    message = asyncio.run(outbox.enqueue("welcome", {"email": "a@example.com"}))
+
+    asyncio.run(outbox.deliver(asyncio.run(outbox.claim())))
+    row = stored(outbox, message["id"])
+    assert row["status"] == "pending"
+    assert row["last_error"] == "ConnectionError: smtp down"
+    delay = (as_utc(row["available_at"]) - datetime.now(timezone.utc)).total_seconds()
+    assert 25 < delay <= 30
+
+    expire_lease(outbox, message["id"])
+    asyncio.run(outbox.deliver(asyncio.run(outbox.claim())))
+    row = stored(outbox, message["id"])
+    assert row["last_error"] == "Sender reported failure"
+    delay = (as_utc(row["available_at"]) - datetime.now(timezone.utc)).total_seconds()
+    assert 55 < delay <= 60
+
+
+def test_backoff_is_capped(outbox):
+    assert [outbox._retry_delay(attempts) for attempts in (1, 2, 3, 4, 10)] == [30, 60, 100, 100, 100]
+
+
+def test_message_fails_after_the_last_attempt(outbox, sender):
+    sender.results = [False, False, False]
+    message = asyncio.run(outbox.enqueue("welcome", {"email": "a@example.com"}))
+    for _ in range(3):
+        expire_lease(outbox, message["id"])
+        asyncio.run(outbox.deliver(asyncio.run(outbox.claim())))
+    row = stored(outbox, message["id"])
+    assert row["status"] == "failed"
+    assert row["attempts"] == 3
+    assert asyncio.run(outbox.claim()) is None
@@ -0,0 +1,92 @@
+import pytest
+
+from services.gift_recommender import GiftRecommender, RECIPIENT_KEYWORDS, OCCASION_KEYWORDS, _match, budget_band
+
+CATALOG = [
+    {"id": "frame-wood", "name": "Classic Wooden Frame", "category": "frames", "base_price": 899,
+     "description": "Handcrafted teak photo frame for family memories"},
+    {"id": "mug-photo", "name": "Photo Mug", "category": "mugs", "base_price": 349,
+     "description": "Coffee mug printed with your picture"},
+    {"id": "acrylic-led", "name": "LED Acrylic Block", "category": "acrylic", "base_price": 2499,
+     "description": "Modern crystal-clear acrylic with LED base"},
+    {"id": "corporate-set", "name": "Office Gift Set", "category": "corporate", "base_price": 1499,
+     "description": "Branding kit for business clients"},
+    {"id": "unpriced-tee", "name": "Custom T-Shirt", "category": "t-shirts", "base_price": None,
+     "description": "Printed cotton t-shirt"},
+    {"id": "sold-out", "name": "Sold Out Frame", "category": "frames", "base_price": 500, "stock_quantity": 0},
+    {"id": "inactive", "name": "Old Frame", "category": "frames", "base_price": 500, "is_active": False},
+]
+
+
+@pytest.fixture
+def recommender():
+    recommender = GiftRecommender(products_collection=None)
+    recommender.build(CATALOG)
+    return recommender
+
+
+def ids(recommendations):
+    return [item["product_id"] for item in recommendations]
+
+
+def test_unavailable_products_are_not_ranked(recommender):
+    ranked = recommender.rank({"occasion": "birthday"}, top_k=10)
+    assert "sold-out" not in ids(ranked)
+    assert "inactive" not in ids(ranked)
+    assert len(ranked) == 5
+
+
+def test_best_match_comes_first_with_reasons(recommender):
+    ranked = recommender.rank({
+        "occasion": "anniversary", "recipient": "family_parent", "budget": "mid_range", "interests": ["family", "classic"],
+    })
+    best = ranked[0]
+    assert best["product_id"] == "frame-wood"
+    assert best["confidence"] == 100
+    assert "A good fit for a parent" in best["reasons"]
+    assert "₹899 is within your budget" in best["reasons"]
+    assert [item["score"] for item in ranked] == sorted((item["score"] for item in ranked), reverse=True)
+
+
+def test_corporate_answers_pick_the_corporate_set(recommender):
+    ranked = recommender.rank({"occasion": "Office party", "relationship": "my boss", "budget": "1000-2000"}, top_k=1)
+    assert ids(ranked) == ["corporate-set"]
+
+
+def test_product_without_a_price_is_ranked_without_a_budget_reason(recommender):
+    ranked = recommender.rank({"occasion": "birthday", "recipient": "close_friend", "budget": "budget_conscious"}, top_k=10)
+    unpriced = next(item for item in ranked if item["product_id"] == "unpriced-tee")
+    assert unpriced["base_price"] is None
+    assert not any("budget" in reason for reason in unpriced["reasons"])
+
+
+def test_ties_keep_catalog_order_and_top_k_is_respected(recommender):
+    assert len(recommender.rank({}, top_k=2)) == 2
+    assert ids(recommender.rank({}, top_k=10)) == ids(recommender.rank({}, top_k=10))
+    assert recommender.rank({}, top_k=0) == []
+
+
+def test_empty_catalog_ranks_nothing():
+    assert GiftRecommender(products_collection=None).rank({"occasion": "birthday"}) == []
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("my son", "child"),
+    ("a person from work", None),
+    ("Grandmother", "family_parent"),
+    ("best friends", "close_friend"),
+])
+def test_recipient_keywords_match_whole_words(answer, expected):
+    assert _match(answer, RECIPIENT_KEYWORDS) == expected
+
+
+def test_occasion_keywords_match_whole_words():
+    assert _match("for example", OCCASION_KEYWORDS) is None
+    assert _match("after exams", OCCASION_KEYWORDS) == "graduation"
+
+
+@pytest.mark.parametrize("answer, band", [
+    ("budget_conscious", 0), ("Luxury", 3), ("500-1000", 1), ("under 2,000", 2), ("low", 0), ("", 1),
+])
+def test_budget_answers_map_onto_bands(answer, band):
+    assert budget_band(answer) == band
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("litellm")
+pytest.importorskip("emergentintegrations")
+
+from services.gift_suggestion_service import normalize_answers, answers_key  # noqa: E402
+
+QUIZ = {
+    "recipient": "Mom",
+    "occasion": "Birthday",
+    "age_group": "50+",
+    "budget": "mid_range",
+    "relationship": "Family",
+    "interests": ["Photography", "gardening"],
+}
+
+
+def test_case_spacing_and_interest_order_do_not_matter():
+    variant = {
+        "recipient": "  mom ",
+        "occasion": "BIRTHDAY",
+        "age_group": "50+",
+        "budget": "mid_range",
+        "relationship": "family",
+        "interests": ["Gardening", "photography ", "PHOTOGRAPHY", ""],
+    }
+    assert normalize_answers(variant) == normalize_answers(QUIZ)
+    assert answers_key(normalize_answers(variant)) == answers_key(normalize_answers(QUIZ))
+
+
+def test_normalized_answers_are_folded_and_sorted():
+    assert normalize_answers(QUIZ) == {
+        "recipient": "mom",
+        "occasion": "birthday",
+        "age_group": "50+",
+        "budget": "mid_range",
+        "relationship": "family",
+        "interests": ["gardening", "photography"],
+    }
+
+
+def test_missing_answers_normalize_to_empty_values():
+    normalized = normalize_answers({"recipient": "Friend", "interests": None})
+    assert normalized["occasion"] == ""
+    assert normalized["interests"] == []
+
+
+def test_different_answers_get_different_keys():
+    other = normalize_answers({**QUIZ, "budget": "premium"})
+    assert answers_key(other) != answers_key(normalize_answers(QUIZ))
+
+
+def test_enhanced_flag_is_part_of_the_key():
+    normalized = normalize_answers(QUIZ)
+    assert answers_key(normalized, enhanced=True) != answers_key(normalized, enhanced=False)
+    assert answers_key(normalized) == answers_key(dict(normalized))
+    assert len(answers_key(normalized)) == 64
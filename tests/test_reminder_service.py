@@ -0,0 +1,105 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from services.reminder_service import ReminderService
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class FakeOutbox:
+    def __init__(self, fail=False):
+        self.queued = []
+        self.fail = fail
+
+    async def enqueue_many(self, template, payloads):
+        if self.fail:
+            raise RuntimeError("outbox unavailable")
+        self.queued.extend(payloads)
+        return len(payloads)
+
+
+def user(user_id, important_dates, consent=True):
+    return {
+        "id": user_id,
+        "name": user_id.title(),
+        "email": f"{user_id}@example.com",
+        "privacy_consent": {"reminder_consent": consent},
+        "reminder_preferences": {"email": True},
+        "important_dates": important_dates,
+    }
+
+
+def important_date(date_id, day, days_before):
+    return {"id": date_id, "name": date_id, "type": "birthday", "date": day, "reminder_days_before": days_before}
+
+
+@pytest.fixture
+def service():
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    service = ReminderService(db.date_reminders, db.users, FakeOutbox())
+
+    async def seed():
+        await db.users.insert_many([
+            user("asha", [
+                important_date("mom", "1960-03-10", [7, 1]),
+                important_date("leap", "2000-02-29", [0, 1]),
+            ]),
+            user("ravi", [important_date("anniversary", "2015-03-10", [7])], consent=False),
+        ])
+        await service.rebuild()
+
+    asyncio.run(seed())
+    return service
+
+
+def due_ids(service, today):
+    return sorted(entry["id"] for entry in asyncio.run(service.due_entries(today)))
+
+
+def test_entries_are_due_days_before_the_event(service):
+    assert due_ids(service, date(2025, 3, 3)) == ["anniversary:7", "mom:7"]
+    assert due_ids(service, date(2025, 3, 9)) == ["mom:1"]
+    assert due_ids(service, date(2025, 3, 5)) == []
+
+
+def test_feb_29_is_reminded_on_feb_28_in_common_years(service):
+    assert due_ids(service, date(2025, 2, 28)) == ["leap:0"]
+    assert due_ids(service, date(2025, 2, 27)) == ["leap:1"]
+
+
+def test_feb_29_keeps_its_own_day_in_leap_years(service):
+    assert due_ids(service, date(2024, 2, 28)) == ["leap:1"]
+    assert due_ids(service, date(2024, 2, 29)) == ["leap:0"]
+
+
+def test_offsets_outside_the_limit_are_not_indexed(service):
+    entries = service._entries("asha", important_date("far", "2000-01-01", [61, -1, "x", 60]))
+    assert [entry["days_before"] for entry in entries] == [60]
+
+
+def test_run_queues_consenting_users_and_claims_the_day(service):
+    summary = asyncio.run(service.run(date(2025, 3, 3)))
+    assert summary == {"due": 2, "queued": 1, "skipped": 1}
+    assert [payload["email"] for payload in service.outbox.queued] == ["asha@example.com"]
+    assert service.outbox.queued[0]["event_date"] == "March 10, 2025"
+    # Claimed entries are not due again the same day
+    assert asyncio.run(service.run(date(2025, 3, 3)))["due"] == 0
+
+
+def test_concurrent_runs_queue_each_reminder_once(service):
+    async def main():
+        return await asyncio.gather(*(service.run(date(2025, 3, 3)) for _ in range(3)))
+
+    summaries = asyncio.run(main())
+    assert sum(summary["queued"] for summary in summaries) == 1
+    assert len(service.outbox.queued) == 1
+
+
+def test_failed_enqueue_releases_the_claims(service):
+    service.outbox.fail = True
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.run(date(2025, 3, 3)))
+    service.outbox.fail = False
+    assert asyncio.run(service.run(date(2025, 3, 3)))["queued"] == 1
@@ -0,0 +1,61 @@
+import hashlib
+import io
+
+import pytest
+
+from services.upload_stream import HashingReader, UploadTooLargeError, copy_stream
+
+
+def test_hashes_and_counts_what_is_read():
+    data = b"photo bytes" * 1000
+    reader = HashingReader(io.BytesIO(data))
+    while reader.read(4096):
+        pass
+    assert reader.size == len(data)
+    assert reader.hexdigest() == hashlib.sha256(data).hexdigest()
+
+
+def test_starts_from_the_beginning_and_rewinds():
+    source = io.BytesIO(b"abcdef")
+    source.seek(3)
+    reader = HashingReader(source)
+    assert reader.read() == b"abcdef"
+    reader.rewind()
+    assert reader.size == 0
+    assert reader.read(2) == b"ab"
+    assert reader.hexdigest() == hashlib.sha256(b"ab").hexdigest()
+
+
+def test_raises_once_past_the_limit():
+    reader = HashingReader(io.BytesIO(b"x" * 10), max_bytes=8)
+    assert reader.read(8) == b"x" * 8
+    with pytest.raises(UploadTooLargeError) as error:
+        reader.read(8)
+    assert error.value.max_bytes == 8
+
+
+def test_too_large_error_is_a_value_error_with_the_limit_in_megabytes():
+    error = UploadTooLargeError(25 * 1024 * 1024)
+    assert isinstance(error, ValueError)
+    assert "25MB" in str(error)
+
+
+def test_close_leaves_the_source_open():
+    source = io.BytesIO(b"data")
+    with HashingReader(source) as reader:
+        reader.read()
+    assert not source.closed
+
+
+def test_copy_stream_copies_hashes_and_rewinds_the_source():
+    data = b"y" * (3 * 1024 * 1024 + 5)
+    source, destination = io.BytesIO(data), io.BytesIO()
+    reader = copy_stream(source, destination)
+    assert destination.getvalue() == data
+    assert reader.hexdigest() == hashlib.sha256(data).hexdigest()
+    assert source.tell() == 0
+
+
+def test_copy_stream_enforces_the_limit():
+    with pytest.raises(UploadTooLargeError):
+        copy_stream(io.BytesIO(b"z" * 100), io.BytesIO(), max_bytes=50)